@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+
+from metrics import ALIGNMENT_CACHE_HITS, ALIGNMENT_CACHE_MISSES
+
+# Location of the default cache, shared by every process on the machine
+CACHE_PATH = os.environ.get(
+    "ALIGNMENT_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "filesplitter_alignment_cache.sqlite3")
+)
+
+# Entries beyond this count are evicted, least recently used first
+MAX_ENTRIES = int(os.environ.get("ALIGNMENT_CACHE_MAX_ENTRIES", 1000000))
+
+# Entries not used for this many seconds are evicted
+MAX_AGE = float(os.environ.get("ALIGNMENT_CACHE_MAX_AGE_DAYS", 90)) * 24 * 3600
+
+# SQLite limits the number of parameters of one statement
+_QUERY_CHUNK_SIZE = 500
+
+_KEY_SEPARATOR = "\x1f"
+
+
+def make_key(source_text, target_text, source_lang, target_lang, checker, version, model=""):
+    """
+    Build the cache key of one sentence pair verdict.
+
+    Args:
+        source_text (str): The source language text
+        target_text (str): The target language text
+        source_lang (str): The source language
+        target_lang (str): The target language
+        checker (str): Name of the checker that produced the verdict
+        version (str): Version of the checker, bumped whenever its scoring changes
+        model (str): Model used by the checker, if any
+
+    Returns:
+        str: Hex SHA-256 digest identifying the verdict
+    """
+    parts = (checker, str(version), model, source_lang, target_lang, source_text, target_text)
+    return hashlib.sha256(_KEY_SEPARATOR.join(parts).encode("utf-8")).hexdigest()
+
+
+class AlignmentCache:
+    """
+    Persistent, content-addressed store of alignment verdicts backed by SQLite.
+
+    Verdicts are the result dicts of the alignment checkers, keyed by make_key().
+    Entries unused for max_age seconds are dropped, and the least recently used
+    entries are dropped once there are more than max_entries. Hits and misses
+    are counted per instance, and in the process-wide metrics.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, max_age=MAX_AGE):
+        """
+        Args:
+            path (str): Path of the SQLite database file (created if missing)
+            max_entries (int): Maximum number of cached verdicts
+            max_age (float): Seconds after which an unused verdict is evicted
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS verdicts_accessed ON verdicts (accessed)")
+
+    def __repr__(self):
+        return f"AlignmentCache(path={self.path!r}, hits={self.hits}, misses={self.misses})"
+
+    def _connect(self):
+        # One short-lived connection per operation keeps the cache usable from any thread
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_many(self, keys):
+        """
+        Look up verdicts and mark the found ones as recently used.
+
+        Args:
+            keys (list): Cache keys from make_key()
+
+        Returns:
+            dict: key -> result dict, for the keys that were found
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+
+        try:
+            with self._connect() as connection:
+                for start in range(0, len(keys), _QUERY_CHUNK_SIZE):
+                    chunk = keys[start:start + _QUERY_CHUNK_SIZE]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = connection.execute(
+                        f"SELECT key, result FROM verdicts WHERE key IN ({placeholders}) AND accessed >= ?",
+                        chunk + [now - self.max_age]
+                    ).fetchall()
+                    found.update((key, json.loads(result)) for key, result in rows)
+
+                found_keys = list(found)
+                for start in range(0, len(found_keys), _QUERY_CHUNK_SIZE):
+                    chunk = found_keys[start:start + _QUERY_CHUNK_SIZE]
+                    placeholders = ",".join("?" * len(chunk))
+                    connection.execute(f"UPDATE verdicts SET accessed = ? WHERE key IN ({placeholders})", [now] + chunk)
+        except sqlite3.Error as e:
+            # A broken cache must never break the alignment check itself
+            logging.error(f"Error reading alignment cache {self.path}: {str(e)}")
+            found = {}
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        ALIGNMENT_CACHE_HITS.inc(len(found))
+        ALIGNMENT_CACHE_MISSES.inc(len(keys) - len(found))
+        return found
+
+    def put_many(self, verdicts):
+        """
+        Store verdicts and evict old entries.
+
+        Args:
+            verdicts (dict): key -> result dict
+        """
+        if not verdicts:
+            return
+        now = time.time()
+
+        try:
+            with self._connect() as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO verdicts (key, result, created, accessed) VALUES (?, ?, ?, ?)",
+                    [(key, json.dumps(result), now, now) for key, result in verdicts.items()]
+                )
+                self._evict(connection, now)
+        except sqlite3.Error as e:
+            logging.error(f"Error writing alignment cache {self.path}: {str(e)}")
+
+    def _evict(self, connection, now):
+        connection.execute("DELETE FROM verdicts WHERE accessed < ?", (now - self.max_age,))
+        excess = connection.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts ORDER BY accessed LIMIT ?)",
+                (excess,)
+            )
+
+    def evict(self):
+        """Drop expired entries and the least recently used ones above max_entries."""
+        with self._connect() as connection:
+            self._evict(connection, time.time())
+
+    def clear(self):
+        """Remove every cached verdict and reset the counters."""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM verdicts")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Get the usage statistics of the cache.
+
+        Returns:
+            dict: hits, misses, hit_rate and the number of stored entries
+        """
+        with self._connect() as connection:
+            entries = connection.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0,
+            "entries": entries
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Get the shared cache at CACHE_PATH, opening it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AlignmentCache()
+        return _default_cache
+
+
+def resolve_cache(cache):
+    """
+    Turn the `cache` argument of the batch checkers into a cache instance.
+
+    Args:
+        cache: True for the default cache, False or None for no cache, or an AlignmentCache
+
+    Returns:
+        AlignmentCache: The cache to use, or None
+    """
+    if cache is True:
+        try:
+            return get_default_cache()
+        except sqlite3.Error as e:
+            logging.error(f"Could not open alignment cache {CACHE_PATH}: {str(e)}")
+            return None
+    return cache or None
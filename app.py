@@ -1,13 +1,22 @@
+import io
 import os
+import json
+import time
 import logging
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file, jsonify, \
+    Response, stream_with_context, g
 from werkzeug.utils import secure_filename
-import tempfile
 import uuid
-from text_splitter import process_excel_file
+from text_splitter import process_excel_file, read_excel_columns, verify_excel_columns, iter_split_records, \
+    is_complete, DEDUPLICATE_MODES, ALIGNMENT_CHECKERS, DEFAULT_ALIGNMENT_CHECKER
+from job_queue import submit_job, record_job, get_job, delete_job, fail_orphaned_jobs, DONE, FAILED
+import result_cache
+import artifact_store
+from writers import OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT, SHARD_ROWS, SHARD_MODE, available_output_formats
+import metrics
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging; DEBUG logs every processing step and slows down big files
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -15,109 +24,397 @@ app.secret_key = os.environ.get("SESSION_SECRET", "default-dev-secret")
 
 # Configure upload settings
 ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
-TEMP_FOLDER = tempfile.gettempdir()
+
+# Uploads at least this large are always processed in constant-memory streaming mode
+STREAMING_THRESHOLD_BYTES = int(os.environ.get("STREAMING_THRESHOLD_BYTES", 20 * 1024 * 1024))
+
+# Records split together by the NDJSON API; results are streamed back after every batch
+API_BATCH_SIZE = int(os.environ.get("API_BATCH_SIZE", 100))
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _output_filename(filename, output_format):
+    """The name of the output of an upload, with the extension of the output format."""
+    return f"{os.path.splitext(filename)[0]}.{OUTPUT_FORMATS[output_format]['extension']}"
+
+def _upload_path(upload_id, filename):
+    return artifact_store.artifact_path('input', f"{upload_id}_{filename}")
+
+def _parsed_path(upload_id):
+    # The parsed first sheet of an upload, reused when the same upload is processed again
+    return artifact_store.artifact_path('parsed', f"{upload_id}.pkl")
+
+def process_and_cache(cache_key, **kwargs):
+    """Run process_excel_file and keep its output in the result cache."""
+    # Restart the time to live of the upload, which may have waited in the queue
+    artifact_store.touch(kwargs['input_path'])
+    result = process_excel_file(**kwargs)
+    if is_complete(result):
+        result_cache.store(cache_key, kwargs['output_path'], result)
+    artifact_store.stored(kwargs['output_path'])
+    return result
+
+def init_app():
+    """
+    Prepare this process to serve requests.
+    
+    Fails the jobs of processes that ended before finishing them, then removes
+    what earlier runs left behind. Called once per serving process: in every
+    gunicorn worker (see gunicorn.conf.py) and by main.py for the development
+    server. Importing the app has no such side effects.
+    """
+    fail_orphaned_jobs()
+    artifact_store.startup_sweep()
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            endpoint=request.endpoint or 'unknown', method=request.method, status=response.status_code
+        )
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Processing and request metrics in the Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', upload=session.get('upload'), output_formats=available_output_formats())
 
-@app.route('/upload', methods=['POST'])
-def upload_file():
-    # Check if a file was uploaded
-    if 'file' not in request.files:
-        flash('No file part', 'danger')
-        return redirect(request.url)
+@app.route('/columns', methods=['POST'])
+def columns():
+    """Save an upload and return the column names of its sheets, read from the header rows only."""
+    file = request.files.get('file')
+    if file is None or file.filename == '' or not allowed_file(file.filename):
+        return jsonify({'error': 'Please upload an Excel file (.xlsx, .xls)'}), 400
+    
+    filename = secure_filename(file.filename)
+    upload_id = str(uuid.uuid4())
+    input_path = _upload_path(upload_id, filename)
+    file.save(input_path)
     
-    file = request.files['file']
+    try:
+        sheets = read_excel_columns(input_path)
+    except Exception as e:
+        artifact_store.remove(input_path)
+        return jsonify({'error': str(e)}), 400
     
-    # Check if the file was selected
-    if file.filename == '':
-        flash('No file selected', 'danger')
-        return redirect(request.url)
+    # The upload form can now refer to this file instead of sending it again
+    session['upload'] = {'id': upload_id, 'filename': filename}
+    
+    return jsonify({
+        'upload_id': upload_id,
+        'filename': filename,
+        'sheets': sheets,
+        'columns': next(iter(sheets.values()), [])  # Only the first sheet is processed
+    })
+
+@app.route('/upload', methods=['POST'])
+def upload_file():
+    upload = session.get('upload')
+    file = request.files.get('file')
     
-    if file and allowed_file(file.filename):
+    if upload and request.form.get('upload_id') == upload['id'] and (file is None or file.filename == ''):
+        # The file was already sent to /columns
+        upload_id = upload['id']
+        filename = upload['filename']
+        input_path = _upload_path(upload_id, filename)
+        if not os.path.exists(input_path):
+            session.pop('upload', None)
+            flash('The uploaded file has expired, please upload it again', 'warning')
+            return redirect(url_for('index'))
+        artifact_store.touch(input_path)
+    else:
+        # Check if a file was uploaded
+        if file is None:
+            flash('No file part', 'danger')
+            return redirect(request.url)
+        
+        # Check if the file was selected
+        if file.filename == '':
+            flash('No file selected', 'danger')
+            return redirect(request.url)
+        
+        if not allowed_file(file.filename):
+            flash('File type not allowed. Please upload an Excel file (.xlsx, .xls)', 'danger')
+            return redirect(url_for('index'))
+        
         # Secure the filename and create a unique name
         filename = secure_filename(file.filename)
-        unique_id = str(uuid.uuid4())
-        input_path = os.path.join(TEMP_FOLDER, f"input_{unique_id}_{filename}")
-        output_path = os.path.join(TEMP_FOLDER, f"output_{unique_id}_{filename}")
+        upload_id = str(uuid.uuid4())
+        input_path = _upload_path(upload_id, filename)
         
         # Save the uploaded file
         file.save(input_path)
         logging.debug(f"File saved at: {input_path}")
-        
-        # Get column names if provided
-        source_col = request.form.get('source_column', 'en-US')
-        target_col = request.form.get('target_column', 'cs-CZ')
-        check_alignment = 'check_alignment' in request.form
-        
-        logging.debug(f"Alignment check enabled: {check_alignment}")
-        
-        # Process the file
+        session['upload'] = {'id': upload_id, 'filename': filename}
+    
+    output_format = request.form.get('output_format', DEFAULT_OUTPUT_FORMAT)
+    if output_format not in available_output_formats():
+        flash(f"Unknown or unavailable output format: {output_format}", 'danger')
+        return redirect(url_for('index'))
+    deduplicate = request.form.get('deduplicate') or None
+    if deduplicate is not None and deduplicate not in DEDUPLICATE_MODES:
+        flash(f"Unknown deduplication mode: {deduplicate}", 'danger')
+        return redirect(url_for('index'))
+    alignment_checker = request.form.get('alignment_checker') or DEFAULT_ALIGNMENT_CHECKER
+    if alignment_checker not in ALIGNMENT_CHECKERS:
+        flash(f"Unknown alignment checker: {alignment_checker}", 'danger')
+        return redirect(url_for('index'))
+    output_filename = _output_filename(filename, output_format)
+    output_path = artifact_store.artifact_path('output', f"{uuid.uuid4()}_{output_filename}")
+    
+    # Get column names if provided
+    source_col = request.form.get('source_column', 'en-US')
+    target_col = request.form.get('target_column', 'cs-CZ')
+    check_alignment = 'check_alignment' in request.form
+    streaming = 'streaming' in request.form or os.path.getsize(input_path) >= STREAMING_THRESHOLD_BYTES
+    
+    logging.debug(f"Alignment check enabled: {check_alignment}")
+    logging.debug(f"Streaming mode enabled: {streaming}")
+    
+    # Catch wrong column names from the header alone, before any parsing;
+    # the upload is kept so the form can be sent again without the file
+    try:
+        verify_excel_columns(input_path, source_col, target_col)
+    except Exception as e:
+        flash(f"Error processing file: {str(e)}", 'danger')
+        return redirect(url_for('index'))
+    
+    # The same file with the same settings was processed before: reuse its output
+    cache_key = result_cache.cache_key(
+        input_path,
+        source_column=source_col,
+        target_column=target_col,
+        check_alignment=check_alignment,
+        alignment_checker=alignment_checker if check_alignment else None,
+        output_format=output_format,
+        deduplicate=deduplicate,
+        shard_rows=SHARD_ROWS,
+        shard_mode=SHARD_MODE
+    )
+    cached_stats = result_cache.lookup(cache_key, output_path)
+    
+    if cached_stats is not None:
+        logging.debug(f"Reusing cached result for {filename}")
+        artifact_store.stored(output_path)
+        job_id = record_job(
+            cached_stats,
+            filename=filename,
+            artifacts=[output_path],
+            output_path=output_path,
+            output_filename=output_filename,
+            output_format=output_format
+        )
+    else:
+        # Queue the file for processing; the results page waits for the job
+        parsed_path = None if streaming else _parsed_path(upload_id)
+        job_id = submit_job(
+            process_and_cache,
+            {
+                'cache_key': cache_key,
+                'input_path': input_path,
+                'output_path': output_path,
+                'source_column': source_col,
+                'target_column': target_col,
+                'check_alignment': check_alignment,
+                'alignment_checker': alignment_checker,
+                'streaming': streaming,
+                'parsed_cache_path': parsed_path,
+                'output_format': output_format,
+                'deduplicate': deduplicate
+            },
+            filename=filename,
+            # Kept by the artifact sweeps while the job is queued or running
+            artifacts=[path for path in (input_path, parsed_path, output_path) if path],
+            output_path=output_path,
+            output_filename=output_filename,
+            output_format=output_format
+        )
+    
+    # Store the job in session
+    session['job_id'] = job_id
+    
+    return redirect(url_for('results'))
+
+def _read_ndjson_records(stream, errors):
+    """
+    Parse NDJSON records from a request body as it arrives.
+    
+    An invalid line ends the records, so the ones before it are still split;
+    its error message is appended to errors.
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            errors.append(f"Line {line_number} is not valid JSON")
+            return
+        if not isinstance(record, dict):
+            errors.append(f"Line {line_number} is not a JSON object")
+            return
+        yield record
+
+@app.route('/api/split', methods=['POST'])
+def api_split():
+    """
+    Split NDJSON records into sentence pairs and stream them back as NDJSON.
+    
+    Every request line is an object with 'id', 'source' and 'target'. Every
+    response line is one sentence pair ('id', 'source', 'target' and, unless
+    check_alignment=0, 'alignment_score' and 'alignment_issues'). The last line
+    is {"stats": {...}}, or {"error": "..."} if the input was invalid or the
+    processing failed; the pairs of the records before an invalid line are sent first.
+    Query parameters: source_lang, target_lang, check_alignment.
+    """
+    source_lang = request.args.get('source_lang', 'en')
+    target_lang = request.args.get('target_lang', 'cs')
+    check_alignment = request.args.get('check_alignment', '1').lower() not in ('0', 'false', 'no')
+    
+    def generate():
+        stats = {}
+        errors = []
         try:
-            result = process_excel_file(
-                input_path, 
-                output_path, 
-                source_column=source_col, 
-                target_column=target_col,
-                check_alignment=check_alignment
-            )
-            
-            # Store the result paths in session
-            session['output_path'] = output_path
-            session['filename'] = filename
-            session['stats'] = result
-            
-            return redirect(url_for('results'))
-            
+            for pair in iter_split_records(
+                _read_ndjson_records(request.stream, errors),
+                source_lang=source_lang,
+                target_lang=target_lang,
+                check_alignment=check_alignment,
+                batch_size=API_BATCH_SIZE,
+                stats=stats
+            ):
+                yield json.dumps(pair, ensure_ascii=False) + '\n'
         except Exception as e:
-            flash(f"Error processing file: {str(e)}", 'danger')
-            logging.error(f"Error processing file: {str(e)}")
-            return redirect(url_for('index'))
+            # The response has already started, so the error can only be the last line
+            logging.exception(f"Error splitting NDJSON records: {str(e)}")
+            yield json.dumps({'error': f"Error processing records: {str(e)}"}) + '\n'
+            return
+        if errors:
+            logging.error(f"Error in NDJSON input: {errors[0]}")
+            yield json.dumps({'error': errors[0]}) + '\n'
+            return
+        yield json.dumps({'stats': stats}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _job_status(job):
+    """The public part of a job, as served by /jobs/<id>."""
+    status = {
+        'id': job['id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'stats': job['result'],
+        'error': job['error']
+    }
+    if job['status'] == DONE:
+        status['result_url'] = url_for('job_result', job_id=job['id'])
+    return status
+
+def _send_job_output(job):
+    """Send the output of a job, from the read cache of this process if it is there; None if it has expired."""
+    content = artifact_store.load(job['output_path'])
+    if content is not None:
+        source = io.BytesIO(content)
+        metrics.ARTIFACT_DOWNLOADS.inc(source='memory')
+    elif os.path.exists(job['output_path']):
+        # Small outputs are cached, for the next download handled by this process
+        content = artifact_store.remember(job['output_path'])
+        source = job['output_path'] if content is None else io.BytesIO(content)
+        metrics.ARTIFACT_DOWNLOADS.inc(source='disk')
     else:
-        flash('File type not allowed. Please upload an Excel file (.xlsx, .xls)', 'danger')
-        return redirect(url_for('index'))
+        return None
+    artifact_store.touch(job['output_path'])
+    
+    download_name = f"split_sentences_{job['output_filename']}"
+    mimetype = OUTPUT_FORMATS[job['output_format']]['mimetype']
+    
+    # Outputs sharded into several files are zip archives of the shards
+    if (job['result'] or {}).get('output_shard_mode') == 'files':
+        download_name = f"{os.path.splitext(download_name)[0]}.zip"
+        mimetype = 'application/zip'
+    
+    return send_file(
+        source,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=mimetype
+    )
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(_job_status(job))
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if job['status'] != DONE:
+        return jsonify(_job_status(job)), 409
+    response = _send_job_output(job)
+    if response is None:
+        return jsonify({'error': 'The result has expired'}), 410
+    return response
 
 @app.route('/results')
 def results():
-    if 'output_path' not in session or 'stats' not in session:
+    job = get_job(session['job_id']) if 'job_id' in session else None
+    if job is None:
         flash('No processed file available', 'warning')
         return redirect(url_for('index'))
     
-    return render_template('results.html', stats=session['stats'])
+    if job['status'] == FAILED:
+        session.pop('job_id', None)
+        delete_job(job['id'])
+        flash(f"Error processing file: {job['error']}", 'danger')
+        return redirect(url_for('index'))
+    
+    # While the job is queued or running the page polls /jobs/<id> and reloads when it is done
+    return render_template('results.html', job=_job_status(job), stats=job['result'])
 
 @app.route('/download')
 def download():
-    if 'output_path' not in session or 'filename' not in session:
+    job = get_job(session['job_id']) if 'job_id' in session else None
+    if job is None or job['status'] != DONE:
         flash('No processed file available', 'warning')
         return redirect(url_for('index'))
     
-    output_path = session['output_path']
-    original_filename = session['filename']
-    download_name = f"split_sentences_{original_filename}"
-    
-    return send_file(
-        output_path,
-        as_attachment=True,
-        download_name=download_name,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    response = _send_job_output(job)
+    if response is None:
+        flash('The processed file has expired, please process it again', 'warning')
+        return redirect(url_for('index'))
+    return response
 
 @app.route('/new')
 def new_process():
     # Clear session data
-    if 'output_path' in session:
-        try:
-            os.remove(session['output_path'])
-        except:
-            pass
-    session.pop('output_path', None)
-    session.pop('filename', None)
-    session.pop('stats', None)
+    job = get_job(session['job_id']) if 'job_id' in session else None
+    if job is not None and job['status'] in (DONE, FAILED):
+        artifact_store.remove(job['output_path'])
+        delete_job(job['id'])
+    session.pop('job_id', None)
+    
+    # The form no longer refers to the upload, so nothing will use it again
+    upload = session.pop('upload', None)
+    if upload is not None and (job is None or job['status'] in (DONE, FAILED)):
+        artifact_store.remove(_upload_path(upload['id'], upload['filename']))
+        artifact_store.remove(_parsed_path(upload['id']))
     return redirect(url_for('index'))
 
 # We'll handle cleanup through the new_process route instead of using teardown handlers
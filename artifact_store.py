@@ -0,0 +1,240 @@
+import os
+import re
+import time
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+import job_queue
+from metrics import ARTIFACTS_REMOVED
+
+# Uploads, parsed uploads and outputs of the web app live here
+ARTIFACT_FOLDER = os.environ.get("ARTIFACT_FOLDER", os.path.join(tempfile.gettempdir(), "filesplitter_artifacts"))
+
+# Seconds an artifact is kept after its last use, by kind (the file name prefix);
+# job state files are kept for OUTPUT_TTL after the job finished
+UPLOAD_TTL = float(os.environ.get("ARTIFACT_UPLOAD_TTL", 3600))
+OUTPUT_TTL = float(os.environ.get("ARTIFACT_OUTPUT_TTL", 6 * 3600))
+ARTIFACT_TTLS = {'input': UPLOAD_TTL, 'parsed': UPLOAD_TTL, 'output': OUTPUT_TTL}
+
+# Total size of the artifacts; least recently used ones are removed beyond it
+ARTIFACT_MAX_BYTES = int(os.environ.get("ARTIFACT_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Seconds between two sweeps of the background thread
+SWEEP_INTERVAL = float(os.environ.get("ARTIFACT_SWEEP_INTERVAL", 60))
+
+# Read cache of small outputs: every output is written to disk, and outputs up to
+# MEMORY_ITEM_MAX_BYTES are also kept in the memory of the process that produced or
+# served them, so repeated downloads skip the disk. MEMORY_MAX_BYTES is per process
+# (with gunicorn, per worker)
+MEMORY_ITEM_MAX_BYTES = int(os.environ.get("ARTIFACT_MEMORY_ITEM_BYTES", 4 * 1024 * 1024))
+MEMORY_MAX_BYTES = int(os.environ.get("ARTIFACT_MEMORY_BYTES", 64 * 1024 * 1024))
+
+# Uploads and outputs of earlier versions, written straight into the temp directory
+_LEGACY_PATTERN = re.compile(r'^(input|output)_[0-9a-f-]{36}_.+|^parsed_[0-9a-f-]{36}\.pkl$')
+
+_lock = threading.Lock()
+_memory = OrderedDict()  # path -> content, least recently used first
+_memory_bytes = 0
+_sweeper_pid = None
+
+
+def artifact_path(kind, name):
+    """
+    Get the path of a new or existing artifact.
+
+    Args:
+        kind (str): 'input', 'parsed' or 'output'; decides the time to live
+        name (str): Unique name of the artifact within its kind
+
+    Returns:
+        str: Path in ARTIFACT_FOLDER (which is created if missing)
+    """
+    os.makedirs(ARTIFACT_FOLDER, exist_ok=True)
+    start_sweeper()
+    return os.path.join(ARTIFACT_FOLDER, f"{kind}_{name}")
+
+
+def _kind(name):
+    return name.split('_', 1)[0]
+
+
+def touch(path):
+    """Mark an artifact as used now, which restarts its time to live."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def remember(path):
+    """
+    Keep a small output in the read cache of this process.
+
+    The file stays on disk, which other processes and the result cache read.
+
+    Args:
+        path (str): Path of the output file
+
+    Returns:
+        bytes: The content if it is now cached, else None
+    """
+    global _memory_bytes
+    try:
+        if os.path.getsize(path) > min(MEMORY_ITEM_MAX_BYTES, MEMORY_MAX_BYTES):
+            return None
+        with open(path, 'rb') as f:
+            content = f.read()
+    except OSError as e:
+        logging.warning(f"Could not keep {path} in memory: {str(e)}")
+        return None
+    with _lock:
+        _memory_bytes -= len(_memory.pop(path, b''))
+        _memory[path] = content
+        _memory_bytes += len(content)
+        while _memory_bytes > MEMORY_MAX_BYTES:
+            _memory_bytes -= len(_memory.popitem(last=False)[1])
+    return content
+
+
+def stored(path):
+    """
+    Register a completed output: cache it in memory if it is small, then enforce the quota.
+
+    Args:
+        path (str): Path of the output file
+    """
+    remember(path)
+    sweep()
+
+
+def load(path):
+    """
+    Get the content of an output from the read cache of this process.
+
+    Returns:
+        bytes: The content, or None if it is only on disk
+    """
+    with _lock:
+        content = _memory.get(path)
+        if content is not None:
+            _memory.move_to_end(path)
+        return content
+
+
+def _forget(path):
+    global _memory_bytes
+    with _lock:
+        _memory_bytes -= len(_memory.pop(path, b''))
+
+
+def remove(path, reason='deleted'):
+    """Delete an artifact from disk and memory."""
+    _forget(path)
+    try:
+        os.remove(path)
+    except OSError:
+        return
+    ARTIFACTS_REMOVED.inc(reason=reason)
+
+
+def sweep(now=None):
+    """
+    Remove the expired artifacts, then the least recently used ones above ARTIFACT_MAX_BYTES.
+
+    Artifacts of queued and running jobs are never removed, but count towards
+    the quota. The state files of expired jobs are removed as well.
+
+    Args:
+        now (float): Current time (defaults to time.time())
+
+    Returns:
+        dict: Number of artifacts removed because they 'expired' and because of the 'quota',
+              and number of expired 'jobs'
+    """
+    now = time.time() if now is None else now
+    removed = {'expired': 0, 'quota': 0, 'jobs': job_queue.sweep_jobs(OUTPUT_TTL, now)}
+    try:
+        names = os.listdir(ARTIFACT_FOLDER)
+    except OSError:
+        return removed
+    # Listed before the files, so an artifact is never older than the job that uses it
+    in_use = job_queue.artifacts_in_use()
+
+    entries = []
+    total_size = 0
+    for name in names:
+        path = os.path.join(ARTIFACT_FOLDER, name)
+        try:
+            status = os.stat(path)
+        except OSError:
+            continue
+        total_size += status.st_size
+        if path in in_use:
+            continue
+        ttl = ARTIFACT_TTLS.get(_kind(name), max(ARTIFACT_TTLS.values()))
+        if status.st_mtime + ttl < now:
+            remove(path, 'expired')
+            removed['expired'] += 1
+            total_size -= status.st_size
+            continue
+        entries.append((status.st_mtime, path, status.st_size))
+
+    for last_used, path, size in sorted(entries):
+        if total_size <= ARTIFACT_MAX_BYTES:
+            break
+        remove(path, 'quota')
+        removed['quota'] += 1
+        total_size -= size
+
+    # Outputs removed by other processes
+    with _lock:
+        gone = [path for path in _memory if not os.path.exists(path)]
+    for path in gone:
+        _forget(path)
+
+    if removed['expired'] or removed['quota'] or removed['jobs']:
+        logging.info(f"Removed {removed['expired']} expired and {removed['quota']} artifacts over the quota, "
+                     f"and {removed['jobs']} expired jobs")
+    return removed
+
+
+def startup_sweep():
+    """Sweep the store, and the expired uploads and outputs earlier versions left in the temp directory."""
+    folder = tempfile.gettempdir()
+    now = time.time()
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        names = []
+    for name in names:
+        if not _LEGACY_PATTERN.match(name):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            if os.path.getmtime(path) + ARTIFACT_TTLS[_kind(name)] < now:
+                remove(path, 'expired')
+        except OSError:
+            pass
+    return sweep(now)
+
+
+def _sweep_forever():
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        try:
+            sweep()
+        except Exception as e:
+            logging.error(f"Artifact sweep failed: {str(e)}")
+
+
+def start_sweeper():
+    """Start the background sweep thread of this process, if it is not running yet."""
+    global _sweeper_pid
+    with _lock:
+        # Threads do not survive a fork, so every worker process starts its own
+        if _sweeper_pid == os.getpid():
+            return
+        _sweeper_pid = os.getpid()
+    threading.Thread(target=_sweep_forever, name="artifact-sweeper", daemon=True).start()
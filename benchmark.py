@@ -0,0 +1,421 @@
+"""
+Benchmarks of the splitting pipeline on a synthetic bilingual corpus.
+
+Every benchmark runs in a fresh process, so its peak RSS is its own.
+Results can be stored as a baseline and later runs compared against it:
+
+    python benchmark.py --rows 20000 --save-baseline
+    python benchmark.py --rows 20000          # exits with 1 on a regression
+
+The start-up cost of the entry points is checked against fixed budgets:
+
+    python benchmark.py --imports             # exits with 1 if over budget
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+import concurrent.futures
+import multiprocessing
+
+import pandas as pd
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# A run slower (or larger) than the baseline by more than this fraction is a regression
+DEFAULT_TOLERANCE = 0.2
+
+# Seconds a fresh interpreter may spend importing each entry point (start-up excluded):
+# about 1.5 times what they took once the heavy packages were made lazy (0.35s and 0.2s)
+IMPORT_BUDGETS = {'app': 0.5, 'cli': 0.3}
+
+# Packages the entry points must only import on first use
+LAZY_PACKAGES = ('pandas', 'openpyxl', 'openai')
+
+SOURCE_COLUMN = 'en-US'
+TARGET_COLUMN = 'cs-CZ'
+
+# Parallel sentences; the second list is full of abbreviations, initials and numbers
+PLAIN_SENTENCES = [
+    ("This is a test sentence.", "Toto je testovací věta."),
+    ("Hello world!", "Ahoj světe!"),
+    ("How are you doing today?", "Jak se dnes máš?"),
+    ("The company increased profits by 15% in the second quarter.", "Společnost zvýšila zisk o 15 % ve druhém čtvrtletí."),
+    ("Please review the document by Friday.", "Prosím, zkontrolujte dokument do pátku."),
+    ("They bought a new car last month.", "Minulý měsíc si koupili nové auto."),
+    ("The meeting was moved to the large conference room.", "Schůzka byla přesunuta do velké zasedací místnosti."),
+    ("Click the button to save your changes.", "Kliknutím na tlačítko uložíte změny."),
+    ("Our team will contact you within two business days.", "Náš tým vás bude kontaktovat do dvou pracovních dnů."),
+    ("Do you want to continue?", "Chcete pokračovat?"),
+]
+ABBREVIATION_SENTENCES = [
+    ("Mr. Smith went to Washington D.C. for a meeting.", "Pan Smith jel na schůzku do Washingtonu D.C."),
+    ("Dr. Brown visited St. Louis in May.", "Dr. Brown navštívil v květnu St. Louis."),
+    ("Version 2.0.4 fixes the crash on p. 5 of the report.", "Verze 2.0.4 opravuje pád na str. 5 zprávy."),
+    ("See e.g. the manual for details.", "Podrobnosti viz např. v příručce."),
+    ("Prof. J. R. Novak gave the talk.", "Přednášku měl prof. J. R. Novák."),
+    ("The price is approx. 3.5 million, i.e. less than last year.", "Cena je cca 3,5 milionu, tj. méně než loni."),
+]
+
+
+def generate_corpus(rows, sentences_per_cell=(1, 4), abbreviation_density=0.2, mismatch_rate=0.05, seed=0):
+    """
+    Generate a reproducible bilingual corpus.
+
+    Args:
+        rows (int): Number of rows
+        sentences_per_cell (tuple): Minimum and maximum number of sentences in a cell
+        abbreviation_density (float): Share of sentences with abbreviations, initials or version numbers
+        mismatch_rate (float): Share of rows whose target lacks one sentence of the source
+        seed (int): Seed of the random generator
+
+    Returns:
+        DataFrame: The corpus with the en-US and cs-CZ columns
+    """
+    generator = random.Random(seed)
+    sources = []
+    targets = []
+    for _ in range(rows):
+        count = generator.randint(*sentences_per_cell)
+        pairs = [
+            generator.choice(ABBREVIATION_SENTENCES if generator.random() < abbreviation_density else PLAIN_SENTENCES)
+            for _ in range(count)
+        ]
+        target_pairs = pairs
+        if count > 1 and generator.random() < mismatch_rate:
+            target_pairs = pairs[:-1]
+        sources.append(' '.join(source for source, _ in pairs))
+        targets.append(' '.join(target for _, target in target_pairs))
+    return pd.DataFrame({SOURCE_COLUMN: sources, TARGET_COLUMN: targets})
+
+
+def write_corpus(path, rows, **options):
+    """Generate a corpus (see generate_corpus) and save it as an Excel workbook."""
+    generate_corpus(rows, **options).to_excel(path, index=False)
+    return path
+
+
+def bench_process_file(input_path, work_dir):
+    """process_excel_file end to end, in memory."""
+    from text_splitter import process_excel_file
+
+    process_excel_file(input_path, os.path.join(work_dir, 'output.xlsx'))
+
+
+def bench_process_file_streaming(input_path, work_dir):
+    """process_excel_file end to end, in streaming mode."""
+    from text_splitter import process_excel_file
+
+    process_excel_file(input_path, os.path.join(work_dir, 'output.xlsx'), streaming=True)
+
+
+def bench_segmenter(input_path, work_dir, corpus):
+    """The sentence segmenter alone, on both columns."""
+    from segmenter import get_segmenter
+
+    get_segmenter('en').split_many(corpus[SOURCE_COLUMN].tolist())
+    get_segmenter('cs').split_many(corpus[TARGET_COLUMN].tolist())
+
+
+def bench_alignment_check(input_path, work_dir, corpus):
+    """The heuristic alignment check of every (unsplit) row, without a cache."""
+    from translation_check_simple import batch_check_translations
+
+    batch_check_translations(
+        corpus[SOURCE_COLUMN].tolist(), corpus[TARGET_COLUMN].tolist(),
+        sample_size=None, include_details=False, cache=None
+    )
+
+
+def bench_read_xlsx(input_path, work_dir):
+    """Reading the input workbook with pandas."""
+    pd.read_excel(input_path)
+
+
+def bench_write_xlsx(input_path, work_dir, corpus):
+    """Writing the rows with the streaming xlsx writer."""
+    from writers import open_writer
+
+    with open_writer('xlsx', os.path.join(work_dir, 'written.xlsx'), list(corpus.columns)) as writer:
+        writer.write_rows(corpus.itertuples(index=False, name=None))
+
+
+def bench_upload(input_path, work_dir):
+    """The upload route through Flask's test client, until the job is done and its output downloaded."""
+    from app import app
+    from job_queue import get_job, DONE, FAILED
+    import result_cache
+
+    # Every repeat processes the file: nothing is served from the results of the previous one
+    shutil.rmtree(result_cache.RESULT_CACHE_FOLDER, ignore_errors=True)
+
+    client = app.test_client()
+    with open(input_path, 'rb') as f:
+        response = client.post('/upload', data={
+            'file': (f, 'benchmark.xlsx'),
+            'source_column': SOURCE_COLUMN,
+            'target_column': TARGET_COLUMN,
+            'check_alignment': 'on'
+        })
+    if response.status_code != 302:
+        raise Exception(f"Upload failed with status {response.status_code}")
+
+    with client.session_transaction() as session:
+        job_id = session['job_id']
+    while True:
+        job = get_job(job_id)
+        if job['status'] in (DONE, FAILED):
+            break
+        time.sleep(0.01)
+    if job['status'] == FAILED:
+        raise Exception(f"Upload job failed: {job['error']}")
+
+    response = client.get('/download')
+    if response.status_code != 200:
+        raise Exception(f"Download failed with status {response.status_code}")
+    response.close()
+
+
+# Benchmark name -> function; functions with a corpus argument get the generated DataFrame
+BENCHMARKS = {
+    'process_file': bench_process_file,
+    'process_file_streaming': bench_process_file_streaming,
+    'segmenter': bench_segmenter,
+    'alignment_check': bench_alignment_check,
+    'read_xlsx': bench_read_xlsx,
+    'write_xlsx': bench_write_xlsx,
+    'upload': bench_upload,
+}
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _run_benchmark(name, input_path, repeat):
+    """Run one benchmark `repeat` times in the current process and return its measurements."""
+    logging.disable(logging.WARNING)
+    function = BENCHMARKS[name]
+    corpus = pd.read_excel(input_path) if 'corpus' in function.__code__.co_varnames else None
+    rows = len(corpus) if corpus is not None else len(pd.read_excel(input_path, usecols=[0]))
+
+    timings = []
+    with tempfile.TemporaryDirectory() as run_dir:
+        # Jobs, results and uploads of this run only; the app reads these on import,
+        # so they are kept until every repeat is done
+        os.environ['JOBS_FOLDER'] = os.path.join(run_dir, 'jobs')
+        os.environ['RESULT_CACHE_FOLDER'] = os.path.join(run_dir, 'results')
+        os.environ['ARTIFACT_FOLDER'] = os.path.join(run_dir, 'artifacts')
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory(dir=run_dir) as work_dir:
+                started = time.perf_counter()
+                if corpus is not None:
+                    function(input_path, work_dir, corpus)
+                else:
+                    function(input_path, work_dir)
+                timings.append(time.perf_counter() - started)
+
+    seconds = statistics.median(timings)
+    return {
+        'seconds': seconds,
+        'min_seconds': min(timings),
+        'rows_per_second': rows / seconds if seconds > 0 else None,
+        'peak_rss_bytes': _peak_rss_bytes()
+    }
+
+
+def run_benchmarks(input_path, names=None, repeat=3):
+    """
+    Run benchmarks, each in a fresh process.
+
+    Args:
+        input_path (str): The workbook to process
+        names (list): Names of BENCHMARKS to run (defaults to all)
+        repeat (int): Runs per benchmark; the median time is reported
+
+    Returns:
+        dict: Benchmark name -> seconds, min_seconds, rows_per_second and peak_rss_bytes
+    """
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name in names or BENCHMARKS:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[name] = executor.submit(_run_benchmark, name, input_path, repeat).result()
+    return results
+
+
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare results with a baseline.
+
+    Args:
+        results (dict): Results of run_benchmarks
+        baseline (dict): Results of an earlier run
+        tolerance (float): Allowed relative increase of time and peak RSS
+
+    Returns:
+        list: One message per regression
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        for metric in ('seconds', 'peak_rss_bytes'):
+            if expected.get(metric) and result[metric] > expected[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {result[metric]:.6g} > baseline {expected[metric]:.6g} (+{tolerance:.0%})"
+                )
+    return regressions
+
+
+def measure_import(module, repeat=5):
+    """
+    Time importing a module in fresh interpreters, with python -X importtime.
+
+    Args:
+        module (str): Name of the module
+        repeat (int): Interpreters started; the median time is reported
+
+    Returns:
+        dict: 'seconds' the import took and the top-level 'packages' it imported
+    """
+    timings = []
+    packages = set()
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise Exception(f"Could not import {module}: {completed.stderr.strip().splitlines()[-1]}")
+        # Lines are "import time: self [us] | cumulative | name", nested imports indented
+        for line in completed.stderr.splitlines():
+            _, _, fields = line.partition('import time:')
+            parts = fields.split('|')
+            if len(parts) != 3 or not parts[1].strip().isdigit():
+                continue
+            name = parts[2].rstrip()
+            packages.add(name.strip().split('.')[0])
+            if name == f" {module}":
+                timings.append(int(parts[1]) / 1e6)
+    return {'seconds': statistics.median(timings), 'packages': sorted(packages)}
+
+
+def check_imports(budgets=None, repeat=5):
+    """
+    Check the import time of the entry points against their budgets.
+
+    Args:
+        budgets (dict): Module name -> seconds (defaults to IMPORT_BUDGETS)
+        repeat (int): Interpreters started per module
+
+    Returns:
+        tuple: Module name -> measure_import result, and one message per budget exceeded
+               or lazy package imported
+    """
+    results = {}
+    problems = []
+    for module, budget in (budgets or IMPORT_BUDGETS).items():
+        result = results[module] = measure_import(module, repeat)
+        if result['seconds'] > budget:
+            problems.append(f"{module}: import took {result['seconds']:.3f}s > budget {budget:.3f}s")
+        for package in LAZY_PACKAGES:
+            if package in result['packages']:
+                problems.append(f"{module}: imports {package} at start-up")
+    return results, problems
+
+
+def _format_report(results, baseline):
+    lines = [f"{'benchmark':<24}{'seconds':>10}{'rows/s':>12}{'peak RSS MB':>13}{'vs baseline':>13}"]
+    for name, result in results.items():
+        expected = (baseline or {}).get(name)
+        change = f"{result['seconds'] / expected['seconds'] - 1:+.1%}" if expected else '-'
+        rows_per_second = f"{result['rows_per_second']:.0f}" if result['rows_per_second'] else '-'
+        lines.append(
+            f"{name:<24}{result['seconds']:>10.3f}{rows_per_second:>12}"
+            f"{result['peak_rss_bytes'] / 1024 / 1024:>13.1f}{change:>13}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bilingual text splitter on a synthetic corpus.")
+    parser.add_argument('--rows', type=int, default=10000, help="rows of the generated workbook")
+    parser.add_argument('--sentences', type=int, nargs=2, default=(1, 4), metavar=('MIN', 'MAX'),
+                        help="sentences per cell")
+    parser.add_argument('--abbreviations', type=float, default=0.2, help="share of sentences with abbreviations")
+    parser.add_argument('--mismatch-rate', type=float, default=0.05, help="share of rows with a missing target sentence")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--input', help="benchmark this workbook instead of a generated one")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per benchmark (the median is reported)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline file to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown before a run counts as a regression")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    parser.add_argument('--imports', action='store_true',
+                        help="check the import time of the entry points against IMPORT_BUDGETS instead")
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        import_results, problems = check_imports(repeat=args.repeat)
+        for module, result in import_results.items():
+            print(f"{module:<24}{result['seconds']:>10.3f}s  (budget {IMPORT_BUDGETS[module]:.3f}s)")
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        input_path = args.input
+        if input_path is None:
+            input_path = write_corpus(
+                os.path.join(corpus_dir, 'corpus.xlsx'), args.rows, sentences_per_cell=tuple(args.sentences),
+                abbreviation_density=args.abbreviations, mismatch_rate=args.mismatch_rate, seed=args.seed
+            )
+        results = run_benchmarks(input_path, args.only, args.repeat)
+
+    # Timings only compare on the same corpus
+    parameters = {
+        'input': args.input, 'rows': args.rows, 'sentences': list(args.sentences),
+        'abbreviations': args.abbreviations, 'mismatch_rate': args.mismatch_rate, 'seed': args.seed
+    }
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored.get('parameters') == parameters:
+            baseline = stored['results']
+        else:
+            print(f"Baseline {args.baseline} was measured on another corpus, not comparing")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(_format_report(results, baseline))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'parameters': parameters, 'results': results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = find_regressions(results, baseline or {}, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
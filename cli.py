@@ -0,0 +1,304 @@
+"""
+Split workbooks from the command line, without the web app.
+
+    python cli.py data/*.xlsx incoming/ -o split/ --jobs 4
+
+Inputs are files, directories (their .xlsx and .xls files) or glob patterns.
+Outputs whose input and settings did not change since the last run are
+skipped; the state is kept in a manifest file in the output directory.
+With --incremental, changed inputs are reprocessed row by row: only rows
+that were added or edited since the last run are split and checked.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import result_cache
+import row_manifest
+from text_splitter import process_excel_file, is_complete, DEDUPLICATE_MODES, ALIGNMENT_CHECKERS, DEFAULT_ALIGNMENT_CHECKER
+from writers import OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT, SHARD_MODE, available_output_formats, shard_size
+
+INPUT_EXTENSIONS = ('.xlsx', '.xls')
+
+# Kept in the output directory: output name -> input, its mtime, size and hash, settings, stats
+# and the name of the output file actually written (a zip archive if the output was sharded into files)
+MANIFEST_NAME = '.filesplitter-manifest.json'
+
+# Counters summed over all files in the final report
+TOTAL_KEYS = ('total_rows', 'processed_rows', 'skipped_rows', 'total_sentences', 'mismatched_sentences',
+              'realigned_rows', 'dropped_sentences', 'duplicate_rows')
+
+
+def find_inputs(patterns):
+    """
+    Expand files, directories and glob patterns into workbook paths.
+
+    Args:
+        patterns (list): Paths of files or directories, or glob patterns
+
+    Returns:
+        list: Absolute paths of the workbooks, sorted and without duplicates
+    """
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise Exception(f"No such file or directory: {pattern}")
+        for match in matches:
+            candidates = [os.path.join(match, name) for name in os.listdir(match)] if os.path.isdir(match) else [match]
+            for path in candidates:
+                # Skip the lock files Excel leaves next to open workbooks
+                if path.lower().endswith(INPUT_EXTENSIONS) and not os.path.basename(path).startswith('~$'):
+                    paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def output_name(input_path, output_format):
+    """The output file name of an input, with the extension of the output format."""
+    return f"{os.path.splitext(os.path.basename(input_path))[0]}.{OUTPUT_FORMATS[output_format]['extension']}"
+
+
+def archive_name(name):
+    """The name of the zip archive an output sharded into several files is written to."""
+    return f"{os.path.splitext(name)[0]}.zip"
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def is_up_to_date(entry, input_path, output_path, settings):
+    """
+    Check whether an output still matches its input and settings.
+
+    The modification time and size are compared first; only when they changed
+    is the input hashed, so touched or copied files with the same content are
+    still skipped.
+
+    Returns:
+        bool: True if the output can be kept; the entry is refreshed when the hash matched
+    """
+    if not entry or not os.path.exists(output_path):
+        return False
+    if entry.get('input') != input_path or entry.get('settings') != settings:
+        return False
+    status = os.stat(input_path)
+    if entry.get('mtime') == status.st_mtime and entry.get('size') == status.st_size:
+        return True
+    if entry.get('hash') != result_cache.cache_key(input_path, **settings):
+        return False
+    entry['mtime'] = status.st_mtime
+    entry['size'] = status.st_size
+    return True
+
+
+def _process_file(input_path, output_path, settings, streaming, incremental=False):
+    """
+    Process one workbook in a worker process; the output only appears once it is complete.
+
+    Returns:
+        tuple: Stats, the path of the output (the zip archive of the shards if it was
+               sharded into several files) and the seconds it took
+    """
+    started = time.perf_counter()
+    temp_path = f"{output_path}.{os.getpid()}.part"
+    manifest_path = row_manifest.manifest_path(output_path) if incremental else None
+    try:
+        stats = process_excel_file(
+            input_path, temp_path, streaming=streaming, workers=1, manifest_path=manifest_path,
+            output_name=os.path.basename(output_path), **settings
+        )
+        if stats.get('output_shard_mode') == 'files':
+            output_path = os.path.join(os.path.dirname(output_path), archive_name(os.path.basename(output_path)))
+        os.replace(temp_path, output_path)
+    finally:
+        # The output, or what a failed run left of it: shard files and their archive
+        for path in [temp_path] + glob.glob(f"{glob.escape(temp_path)}.*.part"):
+            if os.path.exists(path):
+                os.remove(path)
+    return stats, output_path, time.perf_counter() - started
+
+
+def run(inputs, output_dir, settings, jobs=None, streaming=False, force=False, incremental=False):
+    """
+    Process workbooks in parallel and write their outputs to a directory.
+
+    Args:
+        inputs (list): Workbook paths from find_inputs
+        output_dir (str): Directory of the outputs (created if missing)
+        settings (dict): source_column, target_column, check_alignment, alignment_checker, output_format,
+                         deduplicate, shard_rows and shard_mode
+        jobs (int): Worker processes (defaults to the number of CPUs)
+        streaming (bool): Process every file in constant-memory streaming mode
+        force (bool): Process inputs even if their outputs are up to date
+        incremental (bool): Reuse the per-row results of the last run of each input and
+                            only split and check its added or changed rows
+
+    Returns:
+        dict: Per-file results ('processed', 'skipped' or 'failed' with stats or error),
+              keyed by input path
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+
+    outputs = {}
+    for input_path in inputs:
+        name = output_name(input_path, settings['output_format'])
+        if name in outputs.values():
+            raise Exception(f"Several inputs would be written to {name}; process them into different directories")
+        outputs[input_path] = name
+
+    results = {}
+    pending = {}
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        for input_path, name in outputs.items():
+            entry = manifest.get(name)
+            written_path = os.path.join(output_dir, (entry or {}).get('output', name))
+            if not force and is_up_to_date(entry, input_path, written_path, settings):
+                results[input_path] = {'status': 'skipped', 'output': written_path, 'stats': entry['stats']}
+                continue
+            output_path = os.path.join(output_dir, name)
+            future = executor.submit(_process_file, input_path, output_path, settings, streaming, incremental)
+            pending[future] = (input_path, name, output_path)
+
+        for future in as_completed(pending):
+            input_path, name, output_path = pending[future]
+            try:
+                stats, written_path, elapsed = future.result()
+            except Exception as e:
+                logging.error(f"Failed to process {input_path}: {str(e)}")
+                results[input_path] = {'status': 'failed', 'output': output_path, 'error': str(e)}
+                manifest.pop(name, None)
+                continue
+
+            # An output now sharded into files replaces the single file of an earlier run, or vice versa
+            for stale_name in {name, archive_name(name)} - {os.path.basename(written_path)}:
+                stale_path = os.path.join(output_dir, stale_name)
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            output_path = written_path
+
+            results[input_path] = {'status': 'processed', 'output': output_path, 'stats': stats, 'seconds': elapsed}
+            print(f"{input_path} -> {output_path}: {stats['total_sentences']} sentence pairs "
+                  f"from {stats['total_rows']} rows in {elapsed:.1f}s", flush=True)
+            if not is_complete(stats):
+                # Processed again by the next run, when the alignment check may succeed
+                manifest.pop(name, None)
+                continue
+
+            status = os.stat(input_path)
+            manifest[name] = {
+                'input': input_path,
+                'mtime': status.st_mtime,
+                'size': status.st_size,
+                'hash': result_cache.cache_key(input_path, **settings),
+                'settings': settings,
+                'stats': stats,
+                'output': os.path.basename(output_path)
+            }
+            save_manifest(output_dir, manifest)
+
+    save_manifest(output_dir, manifest)
+    return results
+
+
+def summarize(results, elapsed):
+    """Aggregate the per-file results of run() into report lines."""
+    counts = {'processed': 0, 'skipped': 0, 'failed': 0}
+    totals = dict.fromkeys(TOTAL_KEYS, 0)
+    tiers = {}
+    processed_rows = 0
+    for result in results.values():
+        counts[result['status']] += 1
+        for key in TOTAL_KEYS:
+            totals[key] += (result.get('stats') or {}).get(key, 0)
+        for tier, count in (result.get('stats') or {}).get('alignment_tiers', {}).items():
+            tiers[tier] = tiers.get(tier, 0) + count
+        if result['status'] == 'processed':
+            processed_rows += result['stats']['total_rows']
+
+    lines = [
+        f"Files: {counts['processed']} processed, {counts['skipped']} up to date, {counts['failed']} failed",
+        f"Rows: {totals['total_rows']} ({totals['skipped_rows']} skipped, {totals['realigned_rows']} realigned, "
+        f"{totals['duplicate_rows']} duplicates)",
+        f"Sentence pairs: {totals['total_sentences']} ({totals['dropped_sentences']} sentences without a counterpart)",
+        f"Elapsed: {elapsed:.1f}s, {processed_rows / elapsed if elapsed > 0 else 0:.0f} rows/s"
+    ]
+    if tiers:
+        lines.insert(3, f"Alignment check: {tiers['heuristic']} pairs by heuristics, {tiers['llm']} by the LLM, "
+                        f"{tiers['over_budget'] + tiers['llm_errors']} uncertain kept by heuristics "
+                        f"({tiers['over_budget']} over the budget, {tiers['llm_errors']} failed)")
+    for input_path, result in results.items():
+        if result['status'] == 'failed':
+            lines.append(f"FAILED {input_path}: {result['error']}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split bilingual workbooks into aligned sentence pairs.")
+    parser.add_argument('inputs', nargs='+', help="workbooks, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', required=True, help="directory of the outputs")
+    parser.add_argument('--source-column', default='en-US')
+    parser.add_argument('--target-column', default='cs-CZ')
+    parser.add_argument('--format', choices=available_output_formats(), default=DEFAULT_OUTPUT_FORMAT,
+                        help="output format")
+    parser.add_argument('--no-alignment-check', action='store_true', help="skip the translation alignment check")
+    parser.add_argument('--alignment-checker', choices=ALIGNMENT_CHECKERS, default=DEFAULT_ALIGNMENT_CHECKER,
+                        help="check every pair with heuristics, or also send the uncertain ones to the LLM (tiered)")
+    parser.add_argument('--deduplicate', choices=DEDUPLICATE_MODES,
+                        help="split and check rows with the same texts once, and write every copy (fanout) "
+                             "or one with an occurrence count (collapse)")
+    parser.add_argument('--streaming', action='store_true', help="constant-memory streaming mode")
+    parser.add_argument('-j', '--jobs', type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument('--force', action='store_true', help="process inputs even if their outputs are up to date")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only split and check the rows added or changed since the last run")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log progress")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    settings = {
+        'source_column': args.source_column,
+        'target_column': args.target_column,
+        'check_alignment': not args.no_alignment_check,
+        'alignment_checker': args.alignment_checker,
+        'output_format': args.format,
+        'deduplicate': args.deduplicate,
+        # Part of the settings, so outputs are written again when the sharding changes
+        'shard_rows': shard_size(args.format),
+        'shard_mode': SHARD_MODE
+    }
+    started = time.perf_counter()
+    try:
+        inputs = find_inputs(args.inputs)
+        results = run(inputs, args.output_dir, settings, args.jobs, args.streaming, args.force,
+                      args.incremental)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 2
+
+    for line in summarize(results, time.perf_counter() - started):
+        print(line)
+    return 1 if any(result['status'] == 'failed' for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""
+Gunicorn settings, picked up automatically from the working directory:
+
+    GUNICORN_PRELOAD=1 SPLITTER_WARM_UP=1 gunicorn --bind 0.0.0.0:5000 --workers 4 main:app
+
+Both options are off by default. With GUNICORN_PRELOAD the app is imported
+once in the master and the workers are forked from it. With SPLITTER_WARM_UP
+the workbook libraries are imported and a sample row is run through the
+splitter before serving: once in the master when preloading, so the workers
+inherit it, otherwise in every worker. Do not combine preloading with --reload.
+
+Every worker runs app.init_app() once it has loaded the app, before serving;
+it fails the jobs of workers that ended and sweeps old uploads and outputs.
+
+Every worker runs up to MAX_CONCURRENT_JOBS jobs at once, so with --workers 4
+up to 4 * MAX_CONCURRENT_JOBS files are processed at the same time.
+"""
+import os
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "").lower() in ("1", "true", "yes")
+
+WARM_UP = os.environ.get("SPLITTER_WARM_UP", "").lower() in ("1", "true", "yes")
+
+
+def when_ready(server):
+    # Runs in the master before the workers are forked
+    if WARM_UP and preload_app:
+        from text_splitter import warm_up
+        warm_up()
+
+
+def post_worker_init(worker):
+    # Jobs are owned by worker processes, so orphans are only known after the fork
+    from app import init_app
+    init_app()
+    if WARM_UP and not preload_app:
+        from text_splitter import warm_up
+        warm_up()
@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Job state files live here, so every worker process of the app sees every job
+JOBS_FOLDER = os.environ.get("JOBS_FOLDER", os.path.join(tempfile.gettempdir(), "filesplitter_jobs"))
+
+# Maximum number of jobs processed at the same time by one app process; the rest wait in the queue.
+# The limit is per process: with gunicorn, up to workers * MAX_CONCURRENT_JOBS jobs run at once
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", 2))
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TERMINAL_STATES = (DONE, FAILED)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix="job")
+    return _executor
+
+
+def _job_path(job_id):
+    # Only well-formed ids are accepted, so a job id can never point outside JOBS_FOLDER
+    return os.path.join(JOBS_FOLDER, f"{uuid.UUID(job_id)}.json")
+
+
+def _save_job(job):
+    os.makedirs(JOBS_FOLDER, exist_ok=True)
+    path = _job_path(job['id'])
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+    # Atomic replace: readers never see a half-written state file
+    os.replace(temp_path, path)
+
+
+def get_job(job_id):
+    """
+    Get the current state of a job.
+
+    Args:
+        job_id (str): The id returned by submit_job
+
+    Returns:
+        dict: The job (id, status, created, started, finished, result, error and the
+              info given to submit_job), or None if there is no such job
+    """
+    try:
+        with open(_job_path(job_id), encoding='utf-8') as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return None
+
+
+def _update_job(job_id, **changes):
+    job = get_job(job_id)
+    job.update(changes)
+    _save_job(job)
+    return job
+
+
+def _run_job(job_id, func, kwargs):
+    _update_job(job_id, status=RUNNING, started=time.time())
+    try:
+        result = func(**kwargs)
+    except Exception as e:
+        logging.error(f"Job {job_id} failed: {str(e)}")
+        _update_job(job_id, status=FAILED, finished=time.time(), error=str(e))
+    else:
+        _update_job(job_id, status=DONE, finished=time.time(), result=result)
+
+
+def submit_job(func, kwargs, **info):
+    """
+    Queue a call of func(**kwargs) to run in the background.
+
+    Args:
+        func (callable): The work to do; its return value must be JSON serializable
+        kwargs (dict): Keyword arguments for func
+        **info: Extra JSON serializable values stored with the job (file names, paths, ...)
+
+    Returns:
+        str: The id of the new job
+    """
+    job_id = str(uuid.uuid4())
+    _save_job({
+        **info,
+        'id': job_id,
+        'status': QUEUED,
+        'created': time.time(),
+        'started': None,
+        'finished': None,
+        'result': None,
+        'error': None,
+        # The queue is in the memory of this process; see fail_orphaned_jobs
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'pid_started': _process_start_time(os.getpid())
+    })
+    _get_executor().submit(_run_job, job_id, func, kwargs)
+    logging.debug(f"Job {job_id} queued")
+    return job_id
+
+
+def record_job(result, **info):
+    """
+    Record a job that is already done, e.g. because its result was found in a cache.
+
+    Args:
+        result: The JSON serializable result of the job
+        **info: Extra JSON serializable values stored with the job
+
+    Returns:
+        str: The id of the new job
+    """
+    job_id = str(uuid.uuid4())
+    now = time.time()
+    _save_job({
+        **info,
+        'id': job_id,
+        'status': DONE,
+        'created': now,
+        'started': now,
+        'finished': now,
+        'result': result,
+        'error': None
+    })
+    return job_id
+
+
+def _iter_jobs():
+    try:
+        names = os.listdir(JOBS_FOLDER)
+    except OSError:
+        return
+    for name in names:
+        if name.endswith('.json'):
+            job = get_job(name[:-len('.json')])
+            if job is not None:
+                yield job
+
+
+def artifacts_in_use():
+    """The paths listed in the 'artifacts' of the jobs that are queued or running."""
+    return {
+        path
+        for job in _iter_jobs() if job['status'] not in TERMINAL_STATES
+        for path in job.get('artifacts') or ()
+    }
+
+
+def sweep_jobs(ttl, now=None):
+    """
+    Delete the state files of the jobs that finished more than ttl seconds ago.
+
+    A finished job is kept while any of its 'artifacts' still exists, so a job
+    whose output is still downloadable can always be looked up.
+
+    Args:
+        ttl (float): Seconds a finished job is kept
+        now (float): Current time (defaults to time.time())
+
+    Returns:
+        int: Number of jobs deleted
+    """
+    now = time.time() if now is None else now
+    removed = 0
+    for job in list(_iter_jobs()):
+        if job['status'] not in TERMINAL_STATES or (job['finished'] or job['created']) + ttl >= now:
+            continue
+        if not any(os.path.exists(path) for path in job.get('artifacts') or ()):
+            delete_job(job['id'])
+            removed += 1
+    return removed
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start_time(pid):
+    """The start time of a process in clock ticks after boot, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses; the fields after it do not
+    try:
+        return int(stat[stat.rindex(b')') + 1:].split()[19])
+    except (ValueError, IndexError):
+        return None
+
+
+def _owner_is_running(job):
+    pid = job.get('pid')
+    if pid is None or not _process_exists(pid):
+        return False
+    started = job.get('pid_started')
+    if started is None:
+        # Without a start time, a job recorded under the pid of this process,
+        # which has just started, belongs to an earlier one
+        return pid != os.getpid()
+    # A pid can be reused by a new process once its owner ended
+    return _process_start_time(pid) in (started, None)
+
+
+def fail_orphaned_jobs():
+    """
+    Mark the queued and running jobs of processes that no longer exist as failed.
+
+    Jobs are queued in the memory of the process that accepted them, so the
+    jobs of a process that exits or is restarted would otherwise stay queued
+    or running forever. A process is identified by its pid and start time, so
+    a new process that got the pid of an ended one does not keep its jobs
+    alive. Only jobs accepted on this host are checked; the state of jobs of
+    other hosts sharing JOBS_FOLDER cannot be known here.
+
+    Returns:
+        int: Number of jobs marked as failed
+    """
+    host = socket.gethostname()
+    failed = 0
+    for job in list(_iter_jobs()):
+        if job['status'] in TERMINAL_STATES or job.get('host', host) != host:
+            continue
+        if _owner_is_running(job):
+            continue
+        logging.warning(f"Job {job['id']} was {job['status']} when its process ended, marking it as failed")
+        _update_job(
+            job['id'], status=FAILED, finished=time.time(),
+            error="The server was restarted before the job finished. Please process the file again."
+        )
+        failed += 1
+    return failed
+
+
+def delete_job(job_id):
+    """Forget a finished job (its state file); files it produced are left to the caller."""
+    try:
+        os.remove(_job_path(job_id))
+    except (ValueError, OSError):
+        pass
@@ -1,4 +1,5 @@
-from app import app  # noqa: F401
+from app import app, init_app  # noqa: F401
 
 if __name__ == "__main__":
+    init_app()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,182 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class of the metrics: a name, a help text and values per label set."""
+
+    kind = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def render(self):
+        """Lines of the Prometheus text exposition format for this metric."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(Metric):
+    """A value that only goes up, e.g. the number of processed rows."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        super().__init__(name, documentation)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    """Distribution of observed values (durations) in cumulative buckets, with their count and sum."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        counts, _ = self._values.get(_label_key(labels), ([0], 0.0))
+        return sum(counts)
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+        return lines
+
+
+class StageTimer:
+    """
+    Accumulates the time spent in each stage of processing one file.
+
+    Stages may be entered many times (once per chunk); observe() records
+    the total of every stage once in STAGE_SECONDS.
+    """
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, stage, seconds):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage):
+        """Add the duration of the with block to a stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def observe(self):
+        for stage, seconds in self.totals.items():
+            STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def render():
+    """
+    Render every metric in the Prometheus text exposition format.
+
+    Metrics are kept per process; with several app worker processes each
+    one reports its own values.
+    """
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Processing stages: read, split, align, build, write and total (per processed file)
+STAGE_SECONDS = Histogram('filesplitter_stage_seconds', 'Time spent in each processing stage.')
+FILES_PROCESSED = Counter('filesplitter_files_processed_total', 'Processed files by mode and output format.')
+ROWS_PROCESSED = Counter('filesplitter_rows_total', 'Input rows read.')
+SENTENCES_PRODUCED = Counter('filesplitter_sentence_pairs_total', 'Sentence pairs produced.')
+ROWS_PER_SECOND = Histogram(
+    'filesplitter_rows_per_second', 'Input rows processed per second, per file.',
+    buckets=(100, 500, 1000, 5000, 10000, 25000, 50000, 100000, 250000, 500000)
+)
+
+# Alignment checkers
+ALIGNMENT_SECONDS = Histogram('filesplitter_alignment_batch_seconds', 'Duration of one batch alignment check.')
+ALIGNMENT_REQUEST_SECONDS = Histogram('filesplitter_alignment_request_seconds', 'Duration of one alignment API request.')
+ALIGNMENT_PAIRS = Counter('filesplitter_alignment_pairs_total', 'Sentence pairs checked for alignment.')
+ALIGNMENT_CACHE_HITS = Counter('filesplitter_alignment_cache_hits_total', 'Alignment verdicts found in the cache.')
+ALIGNMENT_CACHE_MISSES = Counter('filesplitter_alignment_cache_misses_total', 'Alignment verdicts not found in the cache.')
+
+# HTTP
+HTTP_REQUEST_SECONDS = Histogram('filesplitter_http_request_seconds', 'Duration of HTTP requests.')
+
+# Artifact store
+ARTIFACTS_REMOVED = Counter('filesplitter_artifacts_removed_total', 'Uploads and outputs removed, by reason.')
+ARTIFACT_DOWNLOADS = Counter('filesplitter_artifact_downloads_total', 'Outputs downloaded, by where they were read from.')
@@ -0,0 +1,152 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+
+import translation_check_tiered
+
+# Processed outputs and their stats are kept here, across restarts of the app
+RESULT_CACHE_FOLDER = os.environ.get(
+    "RESULT_CACHE_FOLDER",
+    os.path.join(tempfile.gettempdir(), "filesplitter_results")
+)
+
+# Total size of the cached outputs; least recently used entries are evicted beyond it
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+
+# Bump when a change to the processing makes earlier outputs stale
+RESULT_CACHE_VERSION = 3
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+_lock = threading.Lock()
+
+
+def cache_key(input_path, **params):
+    """
+    Build the cache key of processing a file with the given parameters.
+
+    Args:
+        input_path (str): Path of the uploaded file
+        **params: The processing parameters that change the output (columns, alignment check, ...)
+
+    Returns:
+        str: Hex SHA-256 digest of the file content and the parameters
+    """
+    # The tiered checker is configured through the environment, not the parameters
+    if params.get('alignment_checker') == translation_check_tiered.CHECKER_NAME:
+        params['tiered'] = translation_check_tiered.settings()
+    digest = hashlib.sha256()
+    digest.update(json.dumps({'version': RESULT_CACHE_VERSION, **params}, sort_keys=True).encode('utf-8'))
+    with open(input_path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry_paths(key):
+    return os.path.join(RESULT_CACHE_FOLDER, f"{key}.json"), os.path.join(RESULT_CACHE_FOLDER, f"{key}.out")
+
+
+def _link_or_copy(source_path, target_path):
+    # A hard link costs nothing; fall back to a copy across file systems
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copyfile(source_path, target_path)
+
+
+def lookup(key, output_path):
+    """
+    Restore a cached output.
+
+    Args:
+        key (str): Key from cache_key()
+        output_path (str): Where to put the cached output file
+
+    Returns:
+        dict: The stats of the cached result, or None on a miss
+    """
+    meta_path, data_path = _entry_paths(key)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            stats = json.load(f)['stats']
+        _link_or_copy(data_path, output_path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+    # The modification time of the metadata file is the last use, for LRU eviction
+    try:
+        os.utime(meta_path)
+    except OSError:
+        pass
+    logging.debug(f"Result cache hit: {key}")
+    return stats
+
+
+def store(key, output_path, stats):
+    """
+    Cache a processed output and its stats, then evict old entries above the size cap.
+
+    Args:
+        key (str): Key from cache_key()
+        output_path (str): The output file to cache (it is linked or copied, not moved)
+        stats (dict): The stats returned by process_excel_file
+    """
+    meta_path, data_path = _entry_paths(key)
+    try:
+        os.makedirs(RESULT_CACHE_FOLDER, exist_ok=True)
+        temp_data_path = f"{data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        _link_or_copy(output_path, temp_data_path)
+        os.replace(temp_data_path, data_path)
+
+        # The metadata file is written last: an entry only exists once its output is complete
+        temp_meta_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'stats': stats}, f)
+        os.replace(temp_meta_path, meta_path)
+    except OSError as e:
+        logging.error(f"Could not cache result {key}: {str(e)}")
+        return
+
+    evict()
+
+
+def evict(max_bytes=None):
+    """Remove least recently used entries until the cached outputs fit in max_bytes."""
+    if max_bytes is None:
+        max_bytes = RESULT_CACHE_MAX_BYTES
+
+    with _lock:
+        entries = []
+        total_size = 0
+        try:
+            names = os.listdir(RESULT_CACHE_FOLDER)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            meta_path, data_path = _entry_paths(key)
+            try:
+                last_used = os.path.getmtime(meta_path)
+                size = os.path.getsize(data_path)
+            except OSError:
+                continue
+            entries.append((last_used, key, size))
+            total_size += size
+
+        for last_used, key, size in sorted(entries):
+            if total_size <= max_bytes:
+                break
+            for path in _entry_paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_size -= size
+            logging.debug(f"Result cache evicted: {key}")
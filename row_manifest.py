@@ -0,0 +1,77 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+
+# Bump when a change to the splitting makes the results kept in manifests stale
+MANIFEST_VERSION = 1
+
+_KEY_SEPARATOR = "\x1f"
+
+
+def manifest_path(output_path):
+    """The path of the manifest kept next to an output file."""
+    return f"{output_path}.rows.json.gz"
+
+
+def row_key(source_text, target_text):
+    """
+    Identify a row by its content.
+
+    Args:
+        source_text (str): The source cell text
+        target_text (str): The target cell text
+
+    Returns:
+        str: Hex digest of the two texts
+    """
+    return hashlib.blake2b(
+        f"{source_text}{_KEY_SEPARATOR}{target_text}".encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def load_manifest(path, settings):
+    """
+    Read the per-row results of an earlier run.
+
+    Args:
+        path (str): Path of the manifest
+        settings (dict): The settings of this run; a manifest written with other settings is ignored
+
+    Returns:
+        dict: Row key -> [mismatched, dropped sentences, pairs], empty if there is
+              no usable manifest. Every pair is [source_start, source_end, target_start,
+              target_end, source_period, target_period, alignment_score, alignment_issue].
+    """
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable manifest {path}: {str(e)}")
+        return {}
+
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('settings') != settings:
+        logging.info(f"Manifest {path} was written with other settings, processing every row")
+        return {}
+    return manifest['rows']
+
+
+def save_manifest(path, settings, rows):
+    """
+    Write the per-row results of a run, replacing the earlier manifest.
+
+    Args:
+        path (str): Path of the manifest
+        settings (dict): The settings of the run
+        rows (dict): Row key -> entry, as load_manifest returns
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=5) as f:
+            json.dump({'version': MANIFEST_VERSION, 'settings': settings, 'rows': rows}, f, separators=(',', ':'))
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.error(f"Could not save manifest {path}: {str(e)}")
@@ -0,0 +1,280 @@
+import os
+import re
+import json
+import logging
+from array import array
+
+# Titles that never end a sentence whatever the language of the text
+COMMON_ABBREVIATIONS = {'Mr', 'Mrs', 'Ms', 'Dr', 'Prof', 'St'}
+
+# Abbreviations that never end a sentence, per language (the word before the period)
+ABBREVIATIONS = {
+    'en': {'Rev', 'Jr', 'Sr', 'vs', 'p', 'pp', 'vol', 'Fig', 'approx'},
+    'cs': {'p', 'č', 'str', 'r', 'Ing', 'Mgr', 'Bc', 'např', 'tzv', 'tj', 'sv', 'ul', 'tel'},
+}
+
+# Optional JSON file with extra languages or abbreviations: {"de": ["Hr", "Fr", "Nr"], ...}
+ABBREVIATIONS_FILE_ENV = "SEGMENTER_ABBREVIATIONS_FILE"
+
+# Texts longer than this that have no regular boundary get a second, more permissive look.
+# Shorter strings (UI labels, titles like 'Open the U.S. Map') are left alone.
+FALLBACK_MIN_LENGTH = 30
+
+# A sentence-ending mark followed by whitespace is a boundary candidate
+_CANDIDATE_PATTERN = re.compile(r'[.!?]\s+')
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+def _is_initials(text, mark):
+    """True for marks like the last period of 'D.C.' or 'e.g.' (word char, period, word char)."""
+    return (
+        mark >= 3
+        and text[mark - 2] == '.'
+        and _is_word_char(text[mark - 1])
+        and _is_word_char(text[mark - 3])
+    )
+
+
+def _is_title_case_pair(text, mark):
+    """True for periods after a capital and a lower-case letter, like 'Mr.' or 'Dr.'."""
+    return (
+        mark >= 2
+        and text[mark] == '.'
+        and 'A' <= text[mark - 2] <= 'Z'
+        and 'a' <= text[mark - 1] <= 'z'
+    )
+
+
+def _is_ordinal(text, mark, next_start):
+    """True for periods after a number that are followed by a lower-case word, like Czech '10. května'."""
+    return (
+        mark >= 1
+        and text[mark] == '.'
+        and '0' <= text[mark - 1] <= '9'
+        and next_start < len(text)
+        and text[next_start].islower()
+    )
+
+
+def _word_before(text, mark):
+    """The run of word characters that ends right before position mark."""
+    start = mark
+    while start > 0 and _is_word_char(text[start - 1]):
+        start -= 1
+    return text[start:mark]
+
+
+class Segmenter:
+    """
+    Single-pass sentence boundary scanner for one language.
+
+    Every '.', '!' or '?' followed by whitespace is a candidate boundary. A
+    candidate is rejected if the word before a period is in the language's
+    abbreviation table, if it ends an ordinal number ('10. května'), or if it
+    looks like initials ('D.C.') or a short title ('Mr.'). Long texts with no boundary at all get a second chance:
+    periods rejected only as initials or titles count when the next word
+    starts with a capital letter or a digit. All of this is decided from one
+    scan of the text.
+
+    Segmenters hold no per-call state, so one instance can be shared freely.
+    """
+
+    def __init__(self, language='en', abbreviations=None, fallback_min_length=FALLBACK_MIN_LENGTH):
+        """
+        Args:
+            language (str): ISO code of the language (en, cs, etc)
+            abbreviations (iterable): Words that never end a sentence
+                                      (defaults to the language table plus COMMON_ABBREVIATIONS)
+            fallback_min_length (int): Minimum length of a text for the second-chance boundaries
+        """
+        if abbreviations is None:
+            abbreviations = COMMON_ABBREVIATIONS.union(ABBREVIATIONS.get(language, DEFAULT_ABBREVIATIONS))
+        self.language = language
+        self.abbreviations = frozenset(abbreviations)
+        self.fallback_min_length = fallback_min_length
+
+    def __repr__(self):
+        return f"Segmenter(language={self.language!r}, abbreviations={len(self.abbreviations)})"
+
+    def boundaries(self, text):
+        """
+        Find the sentence boundaries of a text.
+
+        Args:
+            text (str): The text to scan
+
+        Returns:
+            list: (sentence_end, next_start) offsets, one per boundary
+        """
+        regular = []
+        fallback = []
+        abbreviations = self.abbreviations
+
+        for match in _CANDIDATE_PATTERN.finditer(text):
+            mark = match.start()
+            boundary = (mark + 1, match.end())
+
+            if text[mark] == '.' and _word_before(text, mark) in abbreviations:
+                continue
+            if _is_ordinal(text, mark, boundary[1]):
+                continue
+            if _is_initials(text, mark) or _is_title_case_pair(text, mark):
+                # Not a boundary by itself, but good enough for the second chance
+                if text[mark] == '.' and boundary[1] < len(text):
+                    next_char = text[boundary[1]]
+                    if 'A' <= next_char <= 'Z' or '0' <= next_char <= '9':
+                        fallback.append(boundary)
+                continue
+            regular.append(boundary)
+
+        if not regular and len(text) > self.fallback_min_length:
+            return fallback
+        return regular
+
+    def spans(self, text):
+        """
+        Find the sentences of a text as offsets, without surrounding whitespace.
+
+        Args:
+            text (str): The text to split
+
+        Returns:
+            list: (start, end) offsets into text, one per non-empty sentence
+        """
+        spans = []
+        start = 0
+        for end, next_start in self.boundaries(text) + [(len(text), len(text))]:
+            sentence = text[start:end]
+            stripped = sentence.strip()
+            if stripped:
+                offset = start + (len(sentence) - len(sentence.lstrip()))
+                spans.append((offset, offset + len(stripped)))
+            start = next_start
+        return spans
+
+    def split(self, text):
+        """
+        Split a text into sentences.
+
+        Args:
+            text (str): The text to split
+
+        Returns:
+            list: The sentences, stripped of surrounding whitespace
+        """
+        return [text[start:end] for start, end in self.spans(text)]
+
+    def spans_many(self, texts):
+        """
+        Find the sentences of many texts as flat typed arrays of offsets.
+
+        Args:
+            texts (iterable): The texts to split
+
+        Returns:
+            tuple: (text_index, start, end) arrays of C ints, one entry per
+                   sentence, in the order of the texts
+        """
+        text_index = array('i')
+        starts = array('i')
+        ends = array('i')
+        spans = self.spans
+        for i, text in enumerate(texts):
+            for start, end in spans(text):
+                text_index.append(i)
+                starts.append(start)
+                ends.append(end)
+        return text_index, starts, ends
+
+    def split_many(self, texts):
+        """
+        Split many texts into sentences.
+
+        Args:
+            texts (iterable): The texts to split
+
+        Returns:
+            list: One list of sentences per text
+        """
+        split = self.split
+        return [split(text) for text in texts]
+
+
+def normalize_language(language):
+    """Reduce a language tag like 'en-US' or 'cs_CZ' to its ISO code ('en', 'cs')."""
+    return re.split(r'[-_]', str(language), maxsplit=1)[0].lower()
+
+
+def load_abbreviations(path):
+    """
+    Merge the abbreviation tables of a JSON file into ABBREVIATIONS.
+
+    Args:
+        path (str): Path to a JSON object mapping language codes to lists of abbreviations
+    """
+    with open(path, encoding='utf-8') as f:
+        tables = json.load(f)
+    for language, abbreviations in tables.items():
+        register_language(language, abbreviations)
+
+
+def register_language(language, abbreviations):
+    """
+    Add abbreviations for a language and rebuild its segmenter.
+
+    Args:
+        language (str): Language tag (en, cs-CZ, etc)
+        abbreviations (iterable): Words that never end a sentence in this language
+    """
+    language = normalize_language(language)
+    ABBREVIATIONS.setdefault(language, set()).update(abbreviations)
+    SEGMENTERS[language] = Segmenter(language)
+
+
+def get_segmenter(language):
+    """
+    Get the shared segmenter of a language.
+
+    Languages without their own table use the union of all built-in tables.
+
+    Args:
+        language (str): Language tag (en, cs-CZ, etc)
+
+    Returns:
+        Segmenter: The segmenter for the language
+    """
+    language = normalize_language(language)
+    segmenter = SEGMENTERS.get(language)
+    if segmenter is None:
+        segmenter = SEGMENTERS[language] = Segmenter(language)
+    return segmenter
+
+
+def split_sentences(text, language='en'):
+    """
+    Split a text into sentences with the shared segmenter of a language.
+
+    Args:
+        text (str): The text to split
+        language (str): Language tag (en, cs-CZ, etc)
+
+    Returns:
+        list: The sentences
+    """
+    return get_segmenter(language).split(text)
+
+
+# Languages without a table of their own fall back to all the built-in abbreviations
+DEFAULT_ABBREVIATIONS = frozenset().union(*ABBREVIATIONS.values())
+
+# Segmenters are built once, at import time
+SEGMENTERS = {language: Segmenter(language) for language in ABBREVIATIONS}
+
+if os.environ.get(ABBREVIATIONS_FILE_ENV):
+    try:
+        load_abbreviations(os.environ[ABBREVIATIONS_FILE_ENV])
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not load abbreviations from {os.environ[ABBREVIATIONS_FILE_ENV]}: {str(e)}")
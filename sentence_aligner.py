@@ -0,0 +1,185 @@
+import math
+import numpy as np
+
+# Bead types (source sentences, target sentences) and their prior probabilities (Gale & Church, 1993)
+BEADS = ((1, 1), (1, 2), (2, 1), (1, 0), (0, 1))
+BEAD_PRIORS = np.array([0.89, 0.0445, 0.0445, 0.0099 / 2, 0.0099 / 2])
+BEAD_PENALTIES = -np.log(BEAD_PRIORS / BEAD_PRIORS.sum())
+
+# Variance of the target length per source character
+LENGTH_VARIANCE = 6.8
+
+# Cells searched on each side of the diagonal, on top of the difference of the sentence counts
+BAND_WIDTH = 3
+
+# Cost of a bead whose length difference is practically impossible
+MAX_BEAD_COST = 1e4
+
+
+def _normal_cdf(values):
+    # Abramowitz & Stegun 26.2.17, accurate to 7.5e-8; numpy has no vectorized erf
+    x = np.abs(values)
+    t = 1.0 / (1.0 + 0.2316419 * x)
+    poly = t * (0.319381530 + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429))))
+    upper = np.exp(-0.5 * x * x) / math.sqrt(2 * math.pi) * poly
+    return np.where(values >= 0, 1.0 - upper, upper)
+
+
+def bead_costs(source_lengths, target_lengths, ratio=1.0, variance=LENGTH_VARIANCE):
+    """
+    Length cost of matching source_lengths with target_lengths characters.
+
+    The cost is -log of the probability that a translation of the source has
+    a length at least this far from ratio * source length.
+
+    Args:
+        source_lengths (np.ndarray): Characters on the source side of each bead
+        target_lengths (np.ndarray): Characters on the target side of each bead
+        ratio (float): Expected target characters per source character
+        variance (float): Variance of the target length per character
+
+    Returns:
+        np.ndarray: The costs, same shape as the lengths
+    """
+    source_lengths = np.asarray(source_lengths, dtype=float)
+    target_lengths = np.asarray(target_lengths, dtype=float)
+    mean = (source_lengths + target_lengths / ratio) / 2
+    delta = (target_lengths - source_lengths * ratio) / np.sqrt(variance * np.maximum(mean, 1e-9))
+    probability = 2 * (1 - _normal_cdf(np.abs(delta)))
+    return np.minimum(-np.log(np.maximum(probability, 1e-300)), MAX_BEAD_COST)
+
+
+def _align_group(source_lengths, target_lengths, ratio, variance):
+    """
+    Align rows that all have the same sentence counts, one DP over the whole group.
+
+    Only cells near the diagonal are scored and stored: cell (i, j) lives in
+    column j - offsets[i] of the band arrays, so time and memory grow linearly
+    with the number of sentences of the row.
+    """
+    rows, n = source_lengths.shape
+    m = target_lengths.shape[1]
+    source_cumsum = np.concatenate([np.zeros((rows, 1)), np.cumsum(source_lengths, axis=1)], axis=1)
+    target_cumsum = np.concatenate([np.zeros((rows, 1)), np.cumsum(target_lengths, axis=1)], axis=1)
+
+    # The cells searched in DP row i are floor(center - width) .. ceil(center + width)
+    width = BAND_WIDTH + abs(n - m)
+    band = 2 * width + 2
+    centers = np.arange(n + 1) * m / n if n else np.zeros(1)
+    offsets = np.floor(centers - width).astype(int)
+    last = np.minimum(m, np.ceil(centers + width).astype(int))
+    columns = offsets[:, None] + np.arange(band)
+    inside = (columns >= 0) & (columns <= last[:, None])
+
+    total = np.full((rows, n + 1, band), np.inf)
+    back = np.zeros((rows, n + 1, band), dtype=np.int8)
+    total[:, 0, -offsets[0]] = 0
+    skip_bead = BEADS.index((0, 1))
+    for i in range(n + 1):
+        j = columns[i]
+        # Beads that consume a source sentence come from earlier DP rows, the whole band at once
+        candidates = np.full((len(BEADS), rows, band), np.inf)
+        for bead, (di, dj) in enumerate(BEADS):
+            if di == 0 or di > i:
+                continue
+            previous = j - dj - offsets[i - di]
+            valid = inside[i] & (j - dj >= 0) & (previous >= 0) & (previous < band)
+            if not valid.any():
+                continue
+            source_len = source_cumsum[:, i] - source_cumsum[:, i - di]
+            target_len = target_cumsum[:, j[valid]] - target_cumsum[:, j[valid] - dj]
+            candidates[bead][:, valid] = total[:, i - di, previous[valid]] + (
+                BEAD_PENALTIES[bead] + bead_costs(source_len[:, None], target_len, ratio, variance)
+            )
+        if i > 0:
+            # The first best bead wins ties, as when comparing them one by one
+            back[:, i] = np.argmin(candidates, axis=0)
+            total[:, i] = np.min(candidates, axis=0)
+
+        # A target sentence alone comes from the previous cell of the same DP row
+        valid = inside[i] & (j >= 1)
+        valid[0] = False
+        if not valid.any():
+            continue
+        skip_costs = np.full((rows, band), np.inf)
+        skip_costs[:, valid] = BEAD_PENALTIES[skip_bead] + bead_costs(
+            np.zeros((rows, 1)), target_cumsum[:, j[valid]] - target_cumsum[:, j[valid] - 1], ratio, variance
+        )
+        for k in np.flatnonzero(valid):
+            candidate = total[:, i, k - 1] + skip_costs[:, k]
+            better = candidate < total[:, i, k]
+            total[:, i, k] = np.where(better, candidate, total[:, i, k])
+            back[:, i, k] = np.where(better, skip_bead, back[:, i, k])
+
+    alignments = []
+    for row in range(rows):
+        beads = []
+        i, j = n, m
+        while i > 0 or j > 0:
+            di, dj = BEADS[back[row, i, j - offsets[i]]]
+            beads.append((i - di, i, j - dj, j))
+            i, j = i - di, j - dj
+        alignments.append(beads[::-1])
+    return alignments
+
+
+def align_many(source_lengths, target_lengths, ratio=1.0, variance=LENGTH_VARIANCE):
+    """
+    Align the sentences of many rows by their lengths (Gale & Church).
+
+    Each row is aligned with 1-1, 1-2, 2-1, 1-0 and 0-1 beads by a dynamic
+    program restricted to a band around the diagonal. Rows with the same
+    sentence counts are aligned together, vectorized over the group.
+
+    Args:
+        source_lengths (list): Per row, the lengths of its source sentences
+        target_lengths (list): Per row, the lengths of its target sentences
+        ratio (float): Expected target characters per source character
+        variance (float): Variance of the target length per character
+
+    Returns:
+        list: Per row, its beads as (source_start, source_end, target_start, target_end)
+              sentence index ranges, in order
+    """
+    if len(source_lengths) != len(target_lengths):
+        raise ValueError("Source and target lengths must have the same number of rows")
+
+    groups = {}
+    for row, (source, target) in enumerate(zip(source_lengths, target_lengths)):
+        groups.setdefault((len(source), len(target)), []).append(row)
+
+    alignments = [None] * len(source_lengths)
+    for (n, m), rows in groups.items():
+        group_alignments = _align_group(
+            np.array([source_lengths[row] for row in rows], dtype=float).reshape(len(rows), n),
+            np.array([target_lengths[row] for row in rows], dtype=float).reshape(len(rows), m),
+            ratio, variance
+        )
+        for row, beads in zip(rows, group_alignments):
+            alignments[row] = beads
+    return alignments
+
+
+def align_sentences(source_sentences, target_sentences, ratio=1.0, variance=LENGTH_VARIANCE):
+    """
+    Align the sentences of one row into pairs.
+
+    Sentences matched two to one are joined with a space; sentences without
+    a counterpart are left out.
+
+    Args:
+        source_sentences (list): The source sentences
+        target_sentences (list): The target sentences
+        ratio (float): Expected target characters per source character
+        variance (float): Variance of the target length per character
+
+    Returns:
+        list: The (source, target) sentence pairs
+    """
+    beads = align_many(
+        [[len(s) for s in source_sentences]], [[len(s) for s in target_sentences]], ratio, variance
+    )[0]
+    return [
+        (' '.join(source_sentences[i:k]), ' '.join(target_sentences[j:l]))
+        for i, k, j, l in beads if k > i and l > j
+    ]
@@ -0,0 +1,100 @@
+import numpy as np
+
+# Pairs materialized as strings at a time when checking or writing
+MATERIALIZE_BLOCK_SIZE = 50000
+
+_OFFSET_FIELDS = ('rows', 'source_start', 'source_end', 'target_start', 'target_end', 'source_period', 'target_period')
+
+
+def _materialize(texts, rows, starts, ends, periods):
+    # Slice every sentence out of its cell text; a period is added where the sentence had no final punctuation
+    return [
+        texts[row][start:end] + '.' if period else texts[row][start:end]
+        for row, start, end, period in zip(rows.tolist(), starts.tolist(), ends.tolist(), periods.tolist())
+    ]
+
+
+class SentencePairs:
+    """
+    Aligned sentence pairs kept as offsets into the original cell texts.
+
+    Every pair is the index of its input row and a (start, end) character
+    range on each side, plus a flag for the period added to sentences without
+    final punctuation. The offsets live in int32/bool numpy arrays and the
+    texts are the input cells themselves, so a pair costs a few bytes until
+    its strings are requested, which is done a slice at a time.
+    """
+
+    def __init__(self, source_texts, target_texts, row_numbers, rows, source_start, source_end,
+                 target_start, target_end, source_period, target_period):
+        """
+        Args:
+            source_texts (list): Source cell texts, one per input row
+            target_texts (list): Target cell texts, one per input row
+            row_numbers (np.ndarray): Row reference reported for each input row
+            rows (np.ndarray): Input row of each pair
+            source_start, source_end (np.ndarray): Character range of each source sentence
+            target_start, target_end (np.ndarray): Character range of each target sentence
+            source_period, target_period (np.ndarray): Whether a period is added to each sentence
+        """
+        self.source_texts = source_texts
+        self.target_texts = target_texts
+        self.row_numbers = np.asarray(row_numbers)
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.source_start = np.asarray(source_start, dtype=np.int32)
+        self.source_end = np.asarray(source_end, dtype=np.int32)
+        self.target_start = np.asarray(target_start, dtype=np.int32)
+        self.target_end = np.asarray(target_end, dtype=np.int32)
+        self.source_period = np.asarray(source_period, dtype=bool)
+        self.target_period = np.asarray(target_period, dtype=bool)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __repr__(self):
+        return f"SentencePairs({len(self)} pairs from {len(self.source_texts)} rows)"
+
+    def sources(self, start=0, stop=None):
+        """The source sentences of pairs start to stop, as strings."""
+        return _materialize(
+            self.source_texts, self.rows[start:stop], self.source_start[start:stop],
+            self.source_end[start:stop], self.source_period[start:stop]
+        )
+
+    def targets(self, start=0, stop=None):
+        """The target sentences of pairs start to stop, as strings."""
+        return _materialize(
+            self.target_texts, self.rows[start:stop], self.target_start[start:stop],
+            self.target_end[start:stop], self.target_period[start:stop]
+        )
+
+    def original_rows(self, start=0, stop=None):
+        """The row references of pairs start to stop."""
+        return self.row_numbers[self.rows[start:stop]].tolist()
+
+    def blocks(self, block_size=MATERIALIZE_BLOCK_SIZE):
+        """Yield (start, stop) ranges covering all pairs, block_size pairs each."""
+        for start in range(0, len(self), block_size):
+            yield start, min(start + block_size, len(self))
+
+    @classmethod
+    def concat(cls, parts):
+        """
+        Join the pairs of consecutive chunks of input rows.
+
+        Args:
+            parts (list): SentencePairs, in input order
+
+        Returns:
+            SentencePairs: All pairs, with the row indexes shifted to the joined texts
+        """
+        if not parts:
+            return cls([], [], [], *([[]] * len(_OFFSET_FIELDS)))
+        row_offsets = np.cumsum([0] + [len(part.source_texts) for part in parts[:-1]])
+        return cls(
+            [text for part in parts for text in part.source_texts],
+            [text for part in parts for text in part.target_texts],
+            np.concatenate([part.row_numbers for part in parts]),
+            np.concatenate([part.rows + offset for part, offset in zip(parts, row_offsets)]),
+            *(np.concatenate([getattr(part, name) for part in parts]) for name in _OFFSET_FIELDS[1:])
+        )
@@ -27,7 +27,93 @@ document.addEventListener('DOMContentLoaded', function() {
             if (!isValid && fileName) {
                 alert('Please select a valid Excel file (.xlsx or .xls)');
                 this.value = ''; // Clear the file input
+                return;
+            }
+            
+            if (fileName) {
+                loadColumns(this);
             }
         });
+        
+        // A file already sent to /columns is referred to by its upload id instead of being sent again
+        fileInput.form.addEventListener('submit', function() {
+            const uploaded = !fileInput.files.length || fileInput.dataset.uploaded === 'true';
+            if (document.getElementById('upload_id').value && uploaded) {
+                fileInput.disabled = true;
+            }
+        });
+    }
+    
+    // Send the chosen file to /columns and offer its column names in the column inputs
+    function loadColumns(input) {
+        const info = document.getElementById('upload-info');
+        const uploadId = document.getElementById('upload_id');
+        const data = new FormData();
+        data.append('file', input.files[0]);
+        
+        uploadId.value = '';
+        input.dataset.uploaded = 'false';
+        info.textContent = 'Reading columns...';
+        
+        fetch(input.dataset.columnsUrl, { method: 'POST', body: data })
+            .then(function(response) { return response.json(); })
+            .then(function(result) {
+                if (result.error) {
+                    info.textContent = result.error;
+                    return;
+                }
+                uploadId.value = result.upload_id;
+                input.dataset.uploaded = 'true';
+                
+                const datalist = document.getElementById('column_names');
+                datalist.innerHTML = '';
+                result.columns.forEach(function(column) {
+                    const option = document.createElement('option');
+                    option.value = column;
+                    datalist.appendChild(option);
+                });
+                info.textContent = 'Available columns: ' + (result.columns.join(', ') || 'none');
+                
+                ['source_column', 'target_column'].forEach(function(id) {
+                    const field = document.getElementById(id);
+                    field.classList.toggle('is-invalid', result.columns.indexOf(field.value) === -1);
+                });
+            })
+            .catch(function() {
+                info.textContent = 'Could not read the columns, the file will be checked on upload.';
+            });
+    }
+    
+    ['source_column', 'target_column'].forEach(function(id) {
+        const field = document.getElementById(id);
+        if (field) {
+            field.addEventListener('input', function() {
+                const options = document.querySelectorAll('#column_names option');
+                const known = Array.prototype.some.call(options, function(option) { return option.value === field.value; });
+                field.classList.toggle('is-invalid', options.length > 0 && !known);
+            });
+        }
+    });
+
+    // Poll a queued or running job and reload the results page once it has finished
+    const jobStatus = document.getElementById('job-status');
+    if (jobStatus) {
+        const statusText = document.getElementById('job-status-text');
+        const poll = function() {
+            fetch(jobStatus.dataset.jobUrl)
+                .then(function(response) { return response.json(); })
+                .then(function(job) {
+                    if (job.status === 'done' || job.status === 'failed' || job.error === 'Unknown job') {
+                        window.location.reload();
+                        return;
+                    }
+                    statusText.textContent = job.status === 'queued' ? 'Waiting in the queue' : 'Splitting sentences';
+                    setTimeout(poll, 2000);
+                })
+                .catch(function() {
+                    setTimeout(poll, 5000);
+                });
+        };
+        setTimeout(poll, 1000);
     }
 });
@@ -0,0 +1,93 @@
+import pytest
+
+import alignment_cache
+from alignment_cache import AlignmentCache, make_key
+from metrics import ALIGNMENT_CACHE_HITS, ALIGNMENT_CACHE_MISSES
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(alignment_cache.time, "time", clock)
+    return clock
+
+
+def _cache(tmp_path, **kwargs):
+    return AlignmentCache(path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def _key(text, **kwargs):
+    arguments = {'source_lang': 'en', 'target_lang': 'cs', 'checker': 'heuristic', 'version': '1', **kwargs}
+    return make_key(text, f"{text} (cs)", **arguments)
+
+
+def test_put_many_and_get_many_round_trip(tmp_path):
+    cache = _cache(tmp_path)
+    verdicts = {_key("One."): {'score': 0.9, 'issues': []}, _key("Two."): {'score': 0.2, 'issues': ['length']}}
+    hits, misses = ALIGNMENT_CACHE_HITS.value(), ALIGNMENT_CACHE_MISSES.value()
+
+    cache.put_many(verdicts)
+
+    assert cache.get_many([_key("One."), _key("Two."), _key("Three."), _key("One.")]) == verdicts
+    # Repeated keys are looked up once
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert (ALIGNMENT_CACHE_HITS.value() - hits, ALIGNMENT_CACHE_MISSES.value() - misses) == (2, 1)
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3, 'entries': 2}
+
+    # The verdicts are stored on disk, not in the instance
+    assert _cache(tmp_path).get_many(list(verdicts)) == verdicts
+    cache.clear()
+    assert cache.get_many(list(verdicts)) == {}
+    assert cache.stats()['entries'] == 0
+
+
+@pytest.mark.parametrize("changed", [
+    {'source_lang': 'de'},
+    {'target_lang': 'sk'},
+    {'checker': 'llm'},
+    {'version': '2'},
+    {'model': 'gpt-4o'},
+])
+def test_verdicts_are_isolated_by_languages_and_checker(tmp_path, changed):
+    cache = _cache(tmp_path)
+    cache.put_many({_key("One."): {'score': 0.9}})
+
+    assert _key("One.", **changed) != _key("One.")
+    assert cache.get_many([_key("One.", **changed)]) == {}
+    assert cache.get_many([_key("One.")]) == {_key("One."): {'score': 0.9}}
+
+
+def test_evict_drops_the_least_recently_used_entries(tmp_path, clock):
+    cache = _cache(tmp_path, max_entries=10)
+    for text in ("One.", "Two.", "Three."):
+        cache.put_many({_key(text): {'score': 1}})
+        clock.now += 1
+    # Reading an entry makes it recently used
+    cache.get_many([_key("One.")])
+    clock.now += 1
+
+    cache.max_entries = 2
+    cache.evict()
+
+    assert set(cache.get_many([_key(text) for text in ("One.", "Two.", "Three.")])) == {_key("One."), _key("Three.")}
+
+
+def test_evict_drops_expired_entries(tmp_path, clock):
+    cache = _cache(tmp_path, max_age=60)
+    cache.put_many({_key("Old."): {'score': 1}})
+    clock.now += 50
+    cache.put_many({_key("New."): {'score': 1}})
+    clock.now += 20
+
+    # An expired entry is a miss even before it is evicted
+    assert cache.get_many([_key("Old."), _key("New.")]) == {_key("New."): {'score': 1}}
+    cache.evict()
+    assert cache.stats()['entries'] == 1
@@ -0,0 +1,147 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+import app
+import artifact_store
+import job_queue
+import result_cache
+import text_splitter
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "ARTIFACT_FOLDER", str(tmp_path / "artifacts"))
+    monkeypatch.setattr(job_queue, "JOBS_FOLDER", str(tmp_path / "jobs"))
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_FOLDER", str(tmp_path / "cache"))
+    return app.app.test_client()
+
+
+def _workbook_bytes(**sheets):
+    data = io.BytesIO()
+    with pd.ExcelWriter(data) as writer:
+        for name, columns in sheets.items():
+            pd.DataFrame({column: ["Text."] for column in columns}).to_excel(writer, sheet_name=name, index=False)
+    return data.getvalue()
+
+
+def _post_columns(client, content, filename):
+    return client.post('/columns', data={'file': (io.BytesIO(content), filename)}, content_type='multipart/form-data')
+
+
+def test_columns_lists_the_columns_and_keeps_the_upload(client):
+    response = _post_columns(client, _workbook_bytes(Texts=['en-US', 'cs-CZ'], Notes=['note']), "my file.xlsx")
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['filename'] == "my_file.xlsx"
+    assert result['sheets'] == {'Texts': ['en-US', 'cs-CZ'], 'Notes': ['note']}
+    assert result['columns'] == ['en-US', 'cs-CZ']
+    assert os.path.exists(app._upload_path(result['upload_id'], result['filename']))
+    with client.session_transaction() as session:
+        assert session['upload'] == {'id': result['upload_id'], 'filename': "my_file.xlsx"}
+
+
+@pytest.mark.parametrize("content,filename", [
+    (b"not a workbook", "broken.xlsx"),
+    (b"en-US,cs-CZ\n", "texts.csv"),
+    (b"", ""),
+])
+def test_columns_rejects_invalid_workbooks(client, content, filename):
+    response = _post_columns(client, content, filename)
+
+    assert response.status_code == 400
+    assert response.get_json()['error']
+    # Nothing is kept of a rejected upload
+    assert not os.path.exists(artifact_store.ARTIFACT_FOLDER) or os.listdir(artifact_store.ARTIFACT_FOLDER) == []
+    with client.session_transaction() as session:
+        assert 'upload' not in session
+
+
+def _ndjson(*lines):
+    return '\n'.join(line if isinstance(line, str) else json.dumps(line) for line in lines) + '\n'
+
+
+def _split(client, body, **params):
+    response = client.post('/api/split', query_string=params, data=body.encode('utf-8'),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_api_split_streams_pairs_and_stats(client):
+    lines = _split(client, _ndjson(
+        {'id': 'a', 'source': "Hello world. How are you?", 'target': "Ahoj světe. Jak se máš?"},
+        {'id': 'b', 'source': "Fine.", 'target': "Dobře."}
+    ), check_alignment=0)
+
+    assert [(line['id'], line['source']) for line in lines[:-1]] == [
+        ('a', "Hello world."), ('a', "How are you?"), ('b', "Fine.")
+    ]
+    assert lines[-1]['stats']['total_sentences'] == 3
+
+
+@pytest.mark.parametrize("bad_line,error", [
+    ("{not json", "Line 3 is not valid JSON"),
+    ("[1, 2]", "Line 3 is not a JSON object"),
+])
+def test_api_split_sends_the_pending_pairs_before_an_input_error(client, bad_line, error):
+    # The records before the invalid line are in the same, unfinished batch
+    lines = _split(client, _ndjson(
+        {'id': 1, 'source': "One.", 'target': "Jedna."},
+        {'id': 2, 'source': "Two.", 'target': "Dvě."},
+        bad_line,
+        {'id': 4, 'source': "Four.", 'target': "Čtyři."}
+    ), check_alignment=0)
+
+    assert [line['id'] for line in lines[:-1]] == [1, 2]
+    assert lines[-1] == {'error': error}
+
+
+def test_api_split_ends_with_an_error_when_processing_fails(client, monkeypatch):
+    def failing(*args, **kwargs):
+        raise RuntimeError("checker crashed")
+
+    monkeypatch.setattr(text_splitter, "batch_check_translations", failing)
+    lines = _split(client, _ndjson({'id': 1, 'source': "One. Two.", 'target': "Jedna. Dvě."}))
+
+    assert len(lines) == 1
+    assert 'error' in lines[0] and "checker crashed" in lines[0]['error']
+
+
+def test_metrics_are_served_in_the_prometheus_format(client):
+    client.get('/')
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'filesplitter_http_request_seconds_count{endpoint="index",method="GET",status="200"}' in \
+        response.get_data(as_text=True)
+
+
+def test_orphaned_jobs_are_failed_by_init_app_not_on_import(tmp_path):
+    ended = subprocess.Popen([sys.executable, "-c", "pass"])
+    ended.wait()
+    env = {**os.environ, 'JOBS_FOLDER': str(tmp_path / "jobs"), 'ARTIFACT_FOLDER': str(tmp_path / "artifacts"),
+           'RESULT_CACHE_FOLDER': str(tmp_path / "cache")}
+    script = (
+        "import json, job_queue\n"
+        "job_id = job_queue.record_job(None)\n"
+        "job_queue._update_job(job_id, status=job_queue.RUNNING, host=job_queue.socket.gethostname(), "
+        f"pid={ended.pid})\n"
+        "import app\n"
+        "statuses = [job_queue.get_job(job_id)['status']]\n"
+        "app.init_app()\n"
+        "print(json.dumps(statuses + [job_queue.get_job(job_id)['status']]))\n"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", script], env=env, cwd=os.path.dirname(os.path.abspath(app.__file__)),
+        capture_output=True, text=True, check=True
+    ).stdout
+    assert json.loads(output.splitlines()[-1]) == ['running', 'failed']
@@ -0,0 +1,107 @@
+import os
+import time
+
+import pytest
+
+import artifact_store
+import job_queue
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "ARTIFACT_FOLDER", str(tmp_path / "artifacts"))
+    monkeypatch.setattr(job_queue, "JOBS_FOLDER", str(tmp_path / "jobs"))
+    monkeypatch.setattr(artifact_store, "start_sweeper", lambda: None)
+    return tmp_path
+
+
+def _artifact(kind, name, size=10, age=0):
+    path = artifact_store.artifact_path(kind, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    used = time.time() - age
+    os.utime(path, (used, used))
+    return path
+
+
+def _job(status, artifacts, finished_age=None):
+    job_id = job_queue.record_job(None, artifacts=artifacts)
+    finished = None if finished_age is None else time.time() - finished_age
+    job_queue._update_job(job_id, status=status, finished=finished, created=finished or time.time())
+    return job_id
+
+
+def test_artifacts_of_queued_and_running_jobs_are_kept(store, monkeypatch):
+    monkeypatch.setattr(artifact_store, "ARTIFACT_MAX_BYTES", 15)
+    queued_input = _artifact('input', 'a_queued.xlsx', age=2 * artifact_store.UPLOAD_TTL)
+    running_output = _artifact('output', 'b_running.csv', age=10)
+    idle_input = _artifact('input', 'c_idle.xlsx', age=5)
+    _job(job_queue.QUEUED, [queued_input])
+    _job(job_queue.RUNNING, [running_output])
+
+    removed = artifact_store.sweep()
+
+    # Kept although expired and over the quota; the idle upload makes room instead
+    assert os.path.exists(queued_input) and os.path.exists(running_output)
+    assert not os.path.exists(idle_input)
+    assert removed['expired'] == 0 and removed['quota'] == 1
+
+
+def test_artifacts_of_finished_jobs_expire(store):
+    done_input = _artifact('input', 'a_done.xlsx', age=2 * artifact_store.UPLOAD_TTL)
+    _job(job_queue.DONE, [done_input], finished_age=2 * artifact_store.UPLOAD_TTL)
+
+    assert artifact_store.sweep()['expired'] == 1
+    assert not os.path.exists(done_input)
+
+
+def test_finished_jobs_expire_with_their_output(store):
+    ttl = artifact_store.OUTPUT_TTL
+    output = _artifact('output', 'a_out.csv')
+    kept = _job(job_queue.DONE, [output], finished_age=2 * ttl)
+    expired = _job(job_queue.FAILED, [], finished_age=2 * ttl)
+    recent = _job(job_queue.FAILED, [], finished_age=ttl / 2)
+    running = _job(job_queue.RUNNING, [])
+
+    assert artifact_store.sweep()['jobs'] == 1
+    assert job_queue.get_job(expired) is None
+    # Still downloadable, recently finished, or not finished at all
+    assert all(job_queue.get_job(job_id) for job_id in (kept, recent, running))
+
+    artifact_store.remove(output)
+    assert artifact_store.sweep()['jobs'] == 1
+    assert job_queue.get_job(kept) is None
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    monkeypatch.setattr(artifact_store, "_memory", artifact_store.OrderedDict())
+    monkeypatch.setattr(artifact_store, "_memory_bytes", 0)
+    monkeypatch.setattr(artifact_store, "MEMORY_ITEM_MAX_BYTES", 10)
+    monkeypatch.setattr(artifact_store, "MEMORY_MAX_BYTES", 25)
+
+
+def test_small_outputs_are_cached_in_memory_up_to_the_process_limit(store, memory):
+    outputs = [_artifact('output', f'{i}.csv', size=10) for i in range(3)]
+    large = _artifact('output', 'large.csv', size=11)
+
+    for path in outputs + [large]:
+        artifact_store.stored(path)
+
+    # The file stays on disk; the oldest output was evicted from memory
+    assert all(os.path.exists(path) for path in outputs + [large])
+    assert artifact_store.load(outputs[0]) is None
+    assert artifact_store.load(outputs[1]) == artifact_store.load(outputs[2]) == b'x' * 10
+    assert artifact_store.load(large) is None
+    assert artifact_store._memory_bytes == 20
+
+
+def test_outputs_served_from_disk_are_cached(store, memory):
+    path = _artifact('output', 'other_process.csv', size=5)
+    assert artifact_store.load(path) is None
+
+    assert artifact_store.remember(path) == b'x' * 5
+    assert artifact_store.load(path) == b'x' * 5
+
+    artifact_store.remove(path)
+    assert artifact_store.load(path) is None and artifact_store._memory_bytes == 0
@@ -0,0 +1,109 @@
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+import cli
+
+SETTINGS = {
+    'source_column': 'en-US',
+    'target_column': 'cs-CZ',
+    'check_alignment': True,
+    'alignment_checker': 'heuristic',
+    'output_format': 'csv',
+    'deduplicate': None,
+    'shard_rows': None,
+    'shard_mode': 'sheets'
+}
+
+
+def _workbook(path, rows=4, suffix=''):
+    pd.DataFrame({
+        'en-US': [f"Sentence {i} of the file{suffix}. It has two parts." for i in range(rows)],
+        'cs-CZ': [f"Věta {i} souboru{suffix}. Má dvě části." for i in range(rows)]
+    }).to_excel(path, index=False)
+    return str(path)
+
+
+def _statuses(results):
+    return {os.path.basename(path): result['status'] for path, result in results.items()}
+
+
+def test_find_inputs_expands_directories_and_patterns(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("a.xlsx", "b.XLS", "~$a.xlsx", "notes.txt", "sub/c.xlsx"):
+        (tmp_path / name).write_bytes(b'')
+
+    assert cli.find_inputs([str(tmp_path)]) == [str(tmp_path / "a.xlsx"), str(tmp_path / "b.XLS")]
+    assert cli.find_inputs([str(tmp_path / "**" / "*.xlsx"), str(tmp_path / "a.xlsx")]) == [
+        str(tmp_path / "a.xlsx"), str(tmp_path / "sub" / "c.xlsx")
+    ]
+    with pytest.raises(Exception, match="No such file"):
+        cli.find_inputs([str(tmp_path / "*.xlsm")])
+
+
+def test_unchanged_inputs_are_skipped_until_touched_edited_or_forced(tmp_path):
+    input_path = _workbook(tmp_path / "a.xlsx")
+    output_dir = str(tmp_path / "out")
+
+    assert _statuses(cli.run([input_path], output_dir, SETTINGS, jobs=1)) == {'a.xlsx': 'processed'}
+    assert _statuses(cli.run([input_path], output_dir, SETTINGS, jobs=1)) == {'a.xlsx': 'skipped'}
+
+    # Same content with a new modification time: the hash still matches
+    os.utime(input_path, (1, 1))
+    assert _statuses(cli.run([input_path], output_dir, SETTINGS, jobs=1)) == {'a.xlsx': 'skipped'}
+    assert cli.load_manifest(output_dir)['a.csv']['mtime'] == 1
+
+    assert _statuses(cli.run([input_path], output_dir, SETTINGS, jobs=1, force=True)) == {'a.xlsx': 'processed'}
+    _workbook(input_path, suffix=' edited')
+    assert _statuses(cli.run([input_path], output_dir, SETTINGS, jobs=1)) == {'a.xlsx': 'processed'}
+
+    # The sharding is part of the settings
+    sharded = {**SETTINGS, 'shard_rows': 100, 'shard_mode': 'files'}
+    assert _statuses(cli.run([input_path], output_dir, sharded, jobs=1)) == {'a.xlsx': 'processed'}
+
+
+def test_run_writes_outputs_and_sharded_archives(tmp_path):
+    inputs = [_workbook(tmp_path / "a.xlsx"), _workbook(tmp_path / "b.xlsx", rows=1)]
+    output_dir = tmp_path / "out"
+    sharded = {**SETTINGS, 'shard_rows': 3, 'shard_mode': 'files'}
+
+    results = cli.run(inputs, str(output_dir), sharded, jobs=2)
+
+    # a has 8 pairs in 3 shards, b fits in one file
+    assert sorted(os.listdir(output_dir)) == [cli.MANIFEST_NAME, 'a.zip', 'b.csv']
+    assert results[inputs[0]]['output'] == str(output_dir / "a.zip")
+    assert results[inputs[0]]['stats']['output_shards'] == 3
+    with zipfile.ZipFile(output_dir / "a.zip") as archive:
+        assert archive.namelist() == ['a_part001.csv', 'a_part002.csv', 'a_part003.csv']
+        assert archive.read('a_part003.csv').decode('utf-8').count('\n') == 1 + 2
+
+    assert _statuses(cli.run(inputs, str(output_dir), sharded, jobs=2)) == {'a.xlsx': 'skipped', 'b.xlsx': 'skipped'}
+
+    # Without sharding, the plain output replaces the archive
+    cli.run(inputs, str(output_dir), SETTINGS, jobs=2)
+    assert sorted(os.listdir(output_dir)) == [cli.MANIFEST_NAME, 'a.csv', 'b.csv']
+
+
+def test_failed_file_leaves_no_partial_output(tmp_path, monkeypatch):
+    output_path = str(tmp_path / "a.csv")
+
+    def failing(input_path, temp_path, **kwargs):
+        for path in (temp_path, f"{temp_path}.002.part", f"{temp_path}.zip.part"):
+            with open(path, 'w') as f:
+                f.write('partial')
+        raise Exception("disk full")
+
+    monkeypatch.setattr(cli, "process_excel_file", failing)
+    with pytest.raises(Exception, match="disk full"):
+        cli._process_file(str(tmp_path / "a.xlsx"), output_path, SETTINGS, streaming=False)
+    assert os.listdir(tmp_path) == []
+
+
+def test_main_reports_every_file(tmp_path, capsys):
+    input_path = _workbook(tmp_path / "a.xlsx")
+
+    assert cli.main([input_path, '-o', str(tmp_path / "out"), '--format', 'tsv', '-j', '1']) == 0
+    assert os.path.exists(tmp_path / "out" / "a.tsv")
+    assert "Files: 1 processed, 0 up to date, 0 failed" in capsys.readouterr().out
@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import job_queue
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOBS_FOLDER", str(tmp_path / "jobs"))
+
+
+def _ended_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _job(status, **owner):
+    job_id = job_queue.record_job(None)
+    job_queue._update_job(job_id, status=status, finished=None, **owner)
+    return job_id
+
+
+def test_jobs_of_ended_processes_are_failed(jobs):
+    host = job_queue.socket.gethostname()
+    queued = _job(job_queue.QUEUED, host=host, pid=_ended_pid())
+    running = _job(job_queue.RUNNING, host=host, pid=_ended_pid())
+    # A restarted process may get the pid of the one that accepted the job
+    reused_pid = _job(job_queue.RUNNING, host=host, pid=os.getpid())
+    done = _job(job_queue.DONE, host=host, pid=_ended_pid())
+
+    assert job_queue.fail_orphaned_jobs() == 3
+
+    for job_id in (queued, running, reused_pid):
+        job = job_queue.get_job(job_id)
+        assert job['status'] == job_queue.FAILED and job['finished'] and job['error']
+    assert job_queue.get_job(done)['status'] == job_queue.DONE
+
+
+def test_jobs_of_live_processes_and_other_hosts_are_kept(jobs):
+    live = _job(job_queue.RUNNING, host=job_queue.socket.gethostname(), pid=os.getppid())
+    other_host = _job(job_queue.QUEUED, host="other-host", pid=_ended_pid())
+
+    assert job_queue.fail_orphaned_jobs() == 0
+    assert job_queue.get_job(live)['status'] == job_queue.RUNNING
+    assert job_queue.get_job(other_host)['status'] == job_queue.QUEUED
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/stat"), reason="process start times are read from /proc")
+def test_a_reused_pid_is_told_apart_by_its_start_time(jobs):
+    host = job_queue.socket.gethostname()
+    parent_started = job_queue._process_start_time(os.getppid())
+    # A new process that got the pid of the one that accepted the job
+    reused = _job(job_queue.RUNNING, host=host, pid=os.getppid(), pid_started=parent_started - 1)
+    live = _job(job_queue.RUNNING, host=host, pid=os.getppid(), pid_started=parent_started)
+    # A job this process accepted itself
+    own = _job(job_queue.QUEUED, host=host, pid=os.getpid(), pid_started=job_queue._process_start_time(os.getpid()))
+
+    assert job_queue.fail_orphaned_jobs() == 1
+
+    assert job_queue.get_job(reused)['status'] == job_queue.FAILED
+    assert job_queue.get_job(live)['status'] == job_queue.RUNNING
+    assert job_queue.get_job(own)['status'] == job_queue.QUEUED
+
+
+def test_submitted_jobs_record_their_process(jobs):
+    job_id = job_queue.submit_job(lambda: 1, {})
+    deadline = time.time() + 5
+    while job_queue.get_job(job_id)['status'] != job_queue.DONE and time.time() < deadline:
+        time.sleep(0.01)
+
+    job = job_queue.get_job(job_id)
+    assert job['status'] == job_queue.DONE and job['result'] == 1
+    assert (job['host'], job['pid']) == (job_queue.socket.gethostname(), os.getpid())
+    assert job['pid_started'] == job_queue._process_start_time(os.getpid())
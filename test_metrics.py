@@ -0,0 +1,101 @@
+import pytest
+
+import metrics
+from metrics import Counter, Histogram, StageTimer
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Keep the metrics of a test out of the process-wide registry."""
+    monkeypatch.setattr(metrics, "_registry", [])
+
+
+def test_counter_counts_per_label_set(registry):
+    counter = Counter('test_files_total', 'Processed files.')
+    counter.inc()
+    counter.inc(2, mode='streaming', format='csv')
+    counter.inc(format='csv', mode='streaming')
+
+    assert counter.value() == 1
+    assert counter.value(mode='streaming', format='csv') == 3
+    assert counter.value(mode='in_memory') == 0
+    # Labels are sorted by name
+    assert metrics.render() == (
+        "# HELP test_files_total Processed files.\n"
+        "# TYPE test_files_total counter\n"
+        "test_files_total 1\n"
+        'test_files_total{format="csv",mode="streaming"} 3\n'
+    )
+
+
+def test_label_values_are_escaped(registry):
+    counter = Counter('test_errors_total', 'Errors.')
+    counter.inc(path='C:\\tmp\\"a"\nb')
+
+    assert counter.render()[-1] == 'test_errors_total{path="C:\\\\tmp\\\\\\"a\\"\\nb"} 1'
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = Histogram('test_seconds', 'Durations.', buckets=(1, 0.1, 10))
+    # A value equal to a bound is in that bucket
+    for value in (0.05, 0.1, 0.5, 5, 50):
+        histogram.observe(value, stage='split')
+    histogram.observe(2.0, stage='write')
+
+    assert histogram.count(stage='split') == 5
+    assert histogram.count(stage='read') == 0
+    assert histogram.render() == [
+        "# HELP test_seconds Durations.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="split",le="0.1"} 2',
+        'test_seconds_bucket{stage="split",le="1"} 3',
+        'test_seconds_bucket{stage="split",le="10"} 4',
+        'test_seconds_bucket{stage="split",le="+Inf"} 5',
+        'test_seconds_count{stage="split"} 5',
+        'test_seconds_sum{stage="split"} 55.65',
+        'test_seconds_bucket{stage="write",le="0.1"} 0',
+        'test_seconds_bucket{stage="write",le="1"} 0',
+        'test_seconds_bucket{stage="write",le="10"} 1',
+        'test_seconds_bucket{stage="write",le="+Inf"} 1',
+        'test_seconds_count{stage="write"} 1',
+        'test_seconds_sum{stage="write"} 2.0',
+    ]
+
+
+def test_histogram_times_a_block(registry):
+    histogram = Histogram('test_seconds', 'Durations.')
+    with pytest.raises(ValueError):
+        with histogram.time(stage='read'):
+            raise ValueError("failed")
+
+    # A failed block is observed too
+    assert histogram.count(stage='read') == 1
+
+
+def test_render_lists_every_metric(registry):
+    Counter('test_a_total', 'A.')
+    Histogram('test_b_seconds', 'B.').observe(1)
+
+    lines = metrics.render().splitlines()
+
+    assert [line for line in lines if line.startswith('# TYPE')] == [
+        "# TYPE test_a_total counter", "# TYPE test_b_seconds histogram"
+    ]
+    # A metric without observations has no samples
+    assert lines[2] == "# HELP test_b_seconds B."
+
+
+def test_stage_timer_observes_the_total_of_every_stage(monkeypatch, registry):
+    stages = Histogram('test_stage_seconds', 'Stages.')
+    monkeypatch.setattr(metrics, "STAGE_SECONDS", stages)
+    timer = StageTimer()
+    timer.add('split', 1.5)
+    timer.add('split', 2.5)
+    with timer.stage('write'):
+        pass
+
+    timer.observe()
+
+    assert stages.count(stage='split') == 1
+    assert 'test_stage_seconds_sum{stage="split"} 4.0' in stages.render()
+    assert stages.count(stage='write') == 1
@@ -0,0 +1,129 @@
+import os
+
+import pytest
+
+import result_cache
+import translation_check_tiered
+
+PARAMS = {
+    'source_column': 'en-US',
+    'target_column': 'cs-CZ',
+    'check_alignment': True,
+    'alignment_checker': 'heuristic',
+    'output_format': 'xlsx',
+    'deduplicate': None,
+    'shard_rows': None,
+    'shard_mode': 'sheets'
+}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_FOLDER", str(tmp_path / "cache"))
+
+
+def _file(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+
+def _output(tmp_path, name, size):
+    return _file(tmp_path / name, b'x' * size)
+
+
+@pytest.mark.parametrize("changed", [
+    {'source_column': 'en-GB'},
+    {'target_column': 'de-DE'},
+    {'check_alignment': False},
+    {'alignment_checker': 'llm'},
+    {'output_format': 'csv'},
+    {'deduplicate': 'collapse'},
+    {'shard_rows': 1000},
+    {'shard_mode': 'files'},
+])
+def test_cache_key_changes_with_every_parameter(tmp_path, changed):
+    input_path = _file(tmp_path / "a.xlsx", b'content')
+
+    assert result_cache.cache_key(input_path, **PARAMS) == result_cache.cache_key(input_path, **PARAMS)
+    assert result_cache.cache_key(input_path, **{**PARAMS, **changed}) != result_cache.cache_key(input_path, **PARAMS)
+
+
+def test_cache_key_changes_with_the_content_only(tmp_path):
+    first = _file(tmp_path / "a.xlsx", b'content')
+    same = _file(tmp_path / "b.xlsx", b'content')
+    edited = _file(tmp_path / "c.xlsx", b'content!')
+
+    assert result_cache.cache_key(first, **PARAMS) == result_cache.cache_key(same, **PARAMS)
+    assert result_cache.cache_key(first, **PARAMS) != result_cache.cache_key(edited, **PARAMS)
+
+
+@pytest.mark.parametrize("setting,value", [
+    ("UNCERTAIN_LOW", 0.4),
+    ("UNCERTAIN_HIGH", 0.9),
+    ("LLM_BUDGET", 10),
+])
+def test_cache_key_changes_with_the_tiered_configuration(tmp_path, monkeypatch, setting, value):
+    input_path = _file(tmp_path / "a.xlsx", b'content')
+    tiered = {**PARAMS, 'alignment_checker': 'tiered'}
+    keys = (result_cache.cache_key(input_path, **tiered), result_cache.cache_key(input_path, **PARAMS))
+
+    monkeypatch.setattr(translation_check_tiered, setting, value)
+
+    assert result_cache.cache_key(input_path, **tiered) != keys[0]
+    # The other checkers do not depend on it
+    assert result_cache.cache_key(input_path, **PARAMS) == keys[1]
+
+
+def test_version_bump_invalidates_earlier_entries(tmp_path, monkeypatch, cache):
+    input_path = _file(tmp_path / "a.xlsx", b'content')
+    key = result_cache.cache_key(input_path, **PARAMS)
+    result_cache.store(key, _output(tmp_path, "out.xlsx", 10), {'total_sentences': 1})
+
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_VERSION", result_cache.RESULT_CACHE_VERSION + 1)
+
+    new_key = result_cache.cache_key(input_path, **PARAMS)
+    assert new_key != key
+    assert result_cache.lookup(new_key, str(tmp_path / "restored.xlsx")) is None
+
+
+def test_lookup_restores_the_stored_output_and_stats(tmp_path, cache):
+    output_path = _file(tmp_path / "out.xlsx", b'output')
+    stats = {'total_sentences': 3, 'alignment_rate': 66.7}
+
+    assert result_cache.lookup("key", str(tmp_path / "missing.xlsx")) is None
+    result_cache.store("key", output_path, stats)
+    os.remove(output_path)
+
+    restored_path = str(tmp_path / "restored.xlsx")
+    assert result_cache.lookup("key", restored_path) == stats
+    with open(restored_path, 'rb') as f:
+        assert f.read() == b'output'
+
+
+def test_evict_removes_the_least_recently_used_entries_first(tmp_path, cache):
+    for age, key in enumerate(("newest", "used", "oldest")):
+        result_cache.store(key, _output(tmp_path, f"{key}.xlsx", 100), {'key': key})
+        meta_path, _ = result_cache._entry_paths(key)
+        os.utime(meta_path, (1000 - age, 1000 - age))
+    # A lookup makes an entry the most recently used
+    result_cache.lookup("used", str(tmp_path / "restored.xlsx"))
+
+    result_cache.evict(max_bytes=250)
+    assert sorted(name for name in os.listdir(result_cache.RESULT_CACHE_FOLDER)) == [
+        "newest.json", "newest.out", "used.json", "used.out"
+    ]
+
+    result_cache.evict(max_bytes=150)
+    assert sorted(os.listdir(result_cache.RESULT_CACHE_FOLDER)) == ["used.json", "used.out"]
+
+
+def test_store_evicts_above_the_size_cap(tmp_path, monkeypatch, cache):
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_MAX_BYTES", 150)
+    result_cache.store("old", _output(tmp_path, "old.xlsx", 100), {})
+    meta_path, _ = result_cache._entry_paths("old")
+    os.utime(meta_path, (1000, 1000))
+
+    result_cache.store("new", _output(tmp_path, "new.xlsx", 100), {})
+
+    assert result_cache.lookup("old", str(tmp_path / "a.xlsx")) is None
+    assert result_cache.lookup("new", str(tmp_path / "b.xlsx")) == {}
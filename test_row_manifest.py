@@ -0,0 +1,143 @@
+import pandas as pd
+import pytest
+
+import row_manifest
+import text_splitter
+
+SOURCES = [
+    "The meeting on April 15 was very productive. We agreed on the budget.",
+    "Mr. Smith arrived at 10 a.m. and left early",
+    "Is the report ready? Send it to Prague by Friday!",
+    "Profits rose by 15.5% in 2023. Costs fell. Staff numbers stayed the same.",
+    "",
+    "Short one.",
+    "She went to the shop to buy some bread. Then she went home and made dinner for the family.",
+    "It ended with three dots..",
+]
+TARGETS = [
+    "Schůzka dne 15. dubna byla velmi produktivní. Dohodli jsme se na rozpočtu.",
+    "Pan Smith přijel v 10 hodin a odešel brzy",
+    "Je zpráva hotová? Pošlete ji do Prahy do pátku!",
+    "Zisky v roce 2023 vzrostly o 15,5 %. Náklady klesly, počet zaměstnanců zůstal stejný.",
+    "Prázdný zdroj.",
+    "Krátká.",
+    "Šla do obchodu koupit chleba. Pak šla domů. Uvařila rodině večeři.",
+    "Skončilo to třemi tečkami..",
+]
+
+
+def _frame(sources=SOURCES, targets=TARGETS):
+    return pd.DataFrame({'en-US': sources, 'cs-CZ': targets})
+
+
+def _run(tmp_path, df, name, manifest_path=None, output_format='csv', **kwargs):
+    input_path = tmp_path / f"{name}.xlsx"
+    df.to_excel(input_path, index=False)
+    output_path = tmp_path / f"{name}.{output_format}"
+    stats = text_splitter.process_excel_file(
+        str(input_path), str(output_path), output_format=output_format, manifest_path=manifest_path, workers=1,
+        **kwargs
+    )
+    return output_path.read_bytes(), stats
+
+
+@pytest.fixture
+def split_rows(monkeypatch):
+    """The number of rows split by each run."""
+    calls = []
+    split = text_splitter._split_rows
+
+    def counting(source_texts, *args, **kwargs):
+        calls.append(len(source_texts))
+        return split(source_texts, *args, **kwargs)
+
+    monkeypatch.setattr(text_splitter, "_split_rows", counting)
+    return calls
+
+
+def _edited(df):
+    df = df.copy()
+    df.loc[2, 'cs-CZ'] = "Je zpráva hotová? Pošlete ji do Brna do pátku!"
+    return df, 1
+
+
+def _inserted(df):
+    row = _frame(["A new row was inserted here. It has two sentences."],
+                 ["Sem byl vložen nový řádek. Má dvě věty."])
+    return pd.concat([df[:3], row, df[3:]], ignore_index=True), 1
+
+
+def _deleted(df):
+    return df.drop(index=[1, 5]).reset_index(drop=True), 0
+
+
+def _appended(df):
+    rows = _frame(["Appended at the end.", "And another one!"], ["Přidáno na konec.", "A ještě jeden!"])
+    return pd.concat([df, rows], ignore_index=True), 2
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize("change", [_edited, _inserted, _deleted, _appended])
+def test_incremental_rerun_matches_a_full_run(tmp_path, split_rows, change, streaming):
+    manifest_path = str(tmp_path / "rows.json.gz")
+    _run(tmp_path, _frame(), "first", manifest_path, streaming=streaming)
+    changed, fresh_rows = change(_frame())
+
+    split_rows.clear()
+    incremental = _run(tmp_path, changed, "incremental", manifest_path, streaming=streaming)
+    assert sum(split_rows) == fresh_rows
+
+    full = _run(tmp_path, changed, "full", streaming=streaming)
+    assert incremental == full
+
+
+def _tiered_checker(low):
+    return lambda name: text_splitter.translation_check_tiered.TieredChecker(low=low, high=0.0, budget=0)
+
+
+@pytest.mark.parametrize("invalidate", [
+    lambda monkeypatch: monkeypatch.setattr(text_splitter, "CHECKER_VERSION", text_splitter.CHECKER_VERSION + 1),
+    lambda monkeypatch: monkeypatch.setattr(row_manifest, "MANIFEST_VERSION", row_manifest.MANIFEST_VERSION + 1),
+    lambda monkeypatch: monkeypatch.setattr(text_splitter, "_alignment_checker", _tiered_checker(0.0)),
+], ids=["checker_version", "manifest_format", "checker"])
+def test_changed_checker_or_manifest_format_reprocesses_every_row(tmp_path, split_rows, monkeypatch, invalidate):
+    manifest_path = str(tmp_path / "rows.json.gz")
+    _run(tmp_path, _frame(), "first", manifest_path)
+    invalidate(monkeypatch)
+
+    split_rows.clear()
+    incremental = _run(tmp_path, _frame(), "incremental", manifest_path)
+    assert sum(split_rows) == len(SOURCES)
+    assert incremental == _run(tmp_path, _frame(), "full")
+
+
+def test_changed_uncertainty_band_reprocesses_every_row(tmp_path, split_rows, monkeypatch):
+    manifest_path = str(tmp_path / "rows.json.gz")
+    monkeypatch.setattr(text_splitter, "_alignment_checker", _tiered_checker(0.0))
+    _run(tmp_path, _frame(), "first", manifest_path)
+    monkeypatch.setattr(text_splitter, "_alignment_checker", _tiered_checker(0.1))
+
+    split_rows.clear()
+    _run(tmp_path, _frame(), "incremental", manifest_path)
+    assert sum(split_rows) == len(SOURCES)
+
+
+@pytest.mark.parametrize("output_format", ['tsv', 'xlsx', 'tmx'])
+def test_rerun_in_another_output_format_matches_a_full_run(tmp_path, split_rows, output_format):
+    # The manifest holds offsets and scores, not output, so it stays valid across formats
+    manifest_path = str(tmp_path / "rows.json.gz")
+    _run(tmp_path, _frame(), "first", manifest_path)
+    changed, fresh_rows = _edited(_frame())
+
+    split_rows.clear()
+    output, stats = _run(tmp_path, changed, "incremental", manifest_path, output_format)
+    assert sum(split_rows) == fresh_rows
+
+    full_output, full_stats = _run(tmp_path, changed, "full", output_format=output_format)
+    assert stats == full_stats
+    if output_format == 'xlsx':
+        # Workbooks carry a creation time; compare their cells
+        output, full_output = (pd.read_excel(tmp_path / f"{name}.xlsx") for name in ("incremental", "full"))
+        pd.testing.assert_frame_equal(output, full_output)
+    else:
+        assert output == full_output
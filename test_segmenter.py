@@ -0,0 +1,137 @@
+import copy
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import segmenter
+from segmenter import Segmenter, get_segmenter, split_sentences
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    """Let a test register languages without changing the tables of the other tests."""
+    monkeypatch.setattr(segmenter, "ABBREVIATIONS", copy.deepcopy(segmenter.ABBREVIATIONS))
+    monkeypatch.setattr(segmenter, "SEGMENTERS", dict(segmenter.SEGMENTERS))
+
+
+@pytest.mark.parametrize("language,text,sentences", [
+    # Plain boundaries
+    ('en', "Hello world. How are you? Fine!", ["Hello world.", "How are you?", "Fine!"]),
+    ('en', "  Spaces around.   Next one.  ", ["Spaces around.", "Next one."]),
+    ('en', "Line one.\nLine two.", ["Line one.", "Line two."]),
+    ('en', "No final punctuation", ["No final punctuation"]),
+    ('en', "Wait... what?", ["Wait...", "what?"]),
+    ('en', "", []),
+    ('en', "   ", []),
+    # Numbers are not boundaries unless followed by whitespace
+    ('en', "It costs 1.5 million. Really.", ["It costs 1.5 million.", "Really."]),
+    ('en', "Version 2.0.4 is out. Get it.", ["Version 2.0.4 is out.", "Get it."]),
+    # Common titles, in every language
+    ('en', "Mr. Smith went to Washington. He stayed.", ["Mr. Smith went to Washington.", "He stayed."]),
+    ('cs', "Dr. Novák přišel. Prof. Svoboda také.", ["Dr. Novák přišel.", "Prof. Svoboda také."]),
+    # English abbreviations
+    ('en', "See p. 4 for details. Then stop.", ["See p. 4 for details.", "Then stop."]),
+    ('en', "Smith vs. Jones was long. It ended.", ["Smith vs. Jones was long.", "It ended."]),
+    ('en', "It was approx. ten days. Then rain.", ["It was approx. ten days.", "Then rain."]),
+    # Czech abbreviations
+    ('cs', "Viz str. 5 a č. 3. Konec.", ["Viz str. 5 a č. 3.", "Konec."]),
+    ('cs', "Ing. Novák přišel včas. Mgr. Dvořák ne.", ["Ing. Novák přišel včas.", "Mgr. Dvořák ne."]),
+    ('cs', "Je to např. tohle, tzv. řešení. Konec.", ["Je to např. tohle, tzv. řešení.", "Konec."]),
+    ('cs-CZ', "Bydlí v ul. Dlouhá 5. Tel. nemá.", ["Bydlí v ul. Dlouhá 5.", "Tel.", "nemá."]),
+    # Czech ordinals: a number, a period and a lower-case word
+    ('cs', "Schůzka dne 15. dubna byla dlouhá. Pak jsme šli domů.",
+     ["Schůzka dne 15. dubna byla dlouhá.", "Pak jsme šli domů."]),
+    ('cs', "Přišlo jich 15. Pak odešli.", ["Přišlo jich 15.", "Pak odešli."]),
+    # The tables are per language: 'Ing' is only Czech
+    ('en', "Ing. Smith came. He left.", ["Ing.", "Smith came.", "He left."]),
+    # Languages without a table use all the built-in tables
+    ('de', "Ing. Müller kam. Er ging.", ["Ing. Müller kam.", "Er ging."]),
+    # Initials are not boundaries while the text has regular ones
+    ('en', "The U.S. economy grew. Prices fell.", ["The U.S. economy grew.", "Prices fell."]),
+    ('en', "Hello there. We met in D.C. Then we left for home.",
+     ["Hello there.", "We met in D.C. Then we left for home."]),
+    # ... but are in a long text without any, before a capital or a digit
+    ('en', "We met in Washington D.C. Then we flew to New York",
+     ["We met in Washington D.C.", "Then we flew to New York"]),
+    ('en', "The flight left Washington D.C. 2 hours late",
+     ["The flight left Washington D.C.", "2 hours late"]),
+    ('en', "Open the U.S. Map", ["Open the U.S. Map"]),
+    # Unlike the old regex splitter, there is no last resort split at every '. ':
+    # a long text that only has abbreviations stays whole
+    ('en', "Mr. Smith met Dr. Jones at the station and they talked for hours",
+     ["Mr. Smith met Dr. Jones at the station and they talked for hours"]),
+])
+def test_split_sentences(language, text, sentences):
+    assert split_sentences(text, language) == sentences
+
+
+def test_second_chance_starts_above_the_minimum_length():
+    # 31 to 50 characters: the old splitter only looked again above 50
+    text = "Visit D.C. Then go to New York now"
+    assert segmenter.FALLBACK_MIN_LENGTH < len(text) <= 50
+    assert split_sentences(text) == ["Visit D.C.", "Then go to New York now"]
+
+    assert Segmenter('en', fallback_min_length=len(text)).split(text) == [text]
+    assert Segmenter('en', fallback_min_length=len(text) - 1).split(text) == ["Visit D.C.", "Then go to New York now"]
+
+
+def test_spans_and_spans_many_agree_with_split():
+    texts = ["Hello world.  How are you? ", "", "Mr. Smith. Dr. Jones.", "Jen jedna věta"]
+    seg = get_segmenter('en')
+
+    for text in texts:
+        assert [text[start:end] for start, end in seg.spans(text)] == seg.split(text)
+    text_index, starts, ends = seg.spans_many(texts)
+    assert [(texts[i][start:end]) for i, start, end in zip(text_index, starts, ends)] == [
+        sentence for text in texts for sentence in seg.split(text)
+    ]
+    assert seg.split_many(texts) == [seg.split(text) for text in texts]
+
+
+def test_language_tags_share_one_segmenter():
+    assert get_segmenter('cs-CZ') is get_segmenter('cs_cz') is get_segmenter('cs')
+    assert get_segmenter('en-US').abbreviations >= segmenter.COMMON_ABBREVIATIONS
+
+
+def test_register_language_extends_its_table(tables):
+    text = "Äpfel bzw. Birnen sind gut. Ende."
+    assert split_sentences(text, 'de') == ["Äpfel bzw.", "Birnen sind gut.", "Ende."]
+
+    segmenter.register_language('de-DE', ['bzw'])
+
+    assert split_sentences(text, 'de') == ["Äpfel bzw. Birnen sind gut.", "Ende."]
+    # A language with a table of its own no longer uses the other tables
+    assert split_sentences("Ing. Müller kam. Er ging.", 'de') == ["Ing.", "Müller kam.", "Er ging."]
+
+
+def test_abbreviations_file_extends_a_registered_language(tables, tmp_path):
+    path = tmp_path / "abbreviations.json"
+    path.write_text(json.dumps({"cs": ["odst"], "de": ["bzw"]}), encoding='utf-8')
+    text = "Podle odst. 2 platí. Viz str. 3 a dále."
+    assert split_sentences(text, 'cs') == ["Podle odst.", "2 platí.", "Viz str. 3 a dále."]
+
+    segmenter.load_abbreviations(str(path))
+
+    # The file adds to the built-in Czech table
+    assert split_sentences(text, 'cs') == ["Podle odst. 2 platí.", "Viz str. 3 a dále."]
+    assert split_sentences("Äpfel bzw. Birnen. Ende.", 'de') == ["Äpfel bzw. Birnen.", "Ende."]
+
+
+@pytest.mark.parametrize("content,sentences", [
+    (json.dumps({"cs": ["odst"]}), ["Podle odst. 2 platí."]),
+    ("not json", ["Podle odst.", "2 platí."]),
+])
+def test_abbreviations_file_is_loaded_on_import(tmp_path, content, sentences):
+    path = tmp_path / "abbreviations.json"
+    path.write_text(content, encoding='utf-8')
+    env = {**os.environ, segmenter.ABBREVIATIONS_FILE_ENV: str(path)}
+
+    # An unreadable file is logged, and the built-in tables are used
+    output = subprocess.run(
+        [sys.executable, "-c", "import json, segmenter; print(json.dumps(segmenter.split_sentences('Podle odst. 2 platí.', 'cs')))"],
+        env=env, cwd=os.path.dirname(os.path.abspath(segmenter.__file__)), capture_output=True, text=True, check=True
+    ).stdout
+    assert json.loads(output) == sentences
@@ -0,0 +1,57 @@
+import tracemalloc
+
+import numpy as np
+
+from sentence_aligner import align_many, align_sentences
+
+
+def test_equal_counts_align_one_to_one():
+    beads = align_many([[40, 12, 80]], [[44, 13, 85]])[0]
+    assert beads == [(0, 1, 0, 1), (1, 2, 1, 2), (2, 3, 2, 3)]
+
+
+def test_uneven_counts_cover_every_sentence_in_order():
+    beads = align_many([[40, 60]], [[42, 9, 63]])[0]
+    assert beads == [(0, 1, 0, 1), (1, 2, 1, 3)]
+
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        n, m = rng.integers(1, 12, 2)
+        beads = align_many([rng.integers(1, 200, n).tolist()], [rng.integers(1, 200, m).tolist()])[0]
+        assert beads[0][::2] == (0, 0) and beads[-1][1::2] == (n, m)
+        assert all(a[1] == b[0] and a[3] == b[2] for a, b in zip(beads, beads[1:]))
+
+
+def test_two_to_one_and_one_to_two_beads():
+    # A long source sentence translated as two, and two short ones translated as one
+    pairs = align_sentences(
+        ["The meeting was long but in the end we agreed on every point of the plan.", "Fine.", "Really fine."],
+        ["Schůzka byla dlouhá.", "Nakonec jsme se shodli na každém bodu plánu.", "V pořádku, opravdu v pořádku."]
+    )
+    assert pairs == [
+        ("The meeting was long but in the end we agreed on every point of the plan.",
+         "Schůzka byla dlouhá. Nakonec jsme se shodli na každém bodu plánu."),
+        ("Fine. Really fine.", "V pořádku, opravdu v pořádku.")
+    ]
+
+
+def test_rows_of_a_group_are_aligned_independently():
+    source = [[40, 60], [100, 5]]
+    target = [[42, 9, 63], [50, 52, 5]]
+    assert align_many(source, target) == [align_many([s], [t])[0] for s, t in zip(source, target)]
+
+
+def test_long_cell_memory_grows_with_the_band_only():
+    rng = np.random.default_rng(0)
+    n = 800
+    source = [rng.integers(10, 200, n).tolist()]
+    target = [rng.integers(10, 200, n + 1).tolist()]
+    tracemalloc.start()
+    try:
+        beads = align_many(source, target)[0]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # A full (n + 1) x (m + 1) grid of bead costs alone would take 5 * 801 * 802 * 8 bytes (25 MB)
+    assert peak < 4 * 1024 * 1024
+    assert beads[0][:3:2] == (0, 0) and beads[-1][1::2] == (n, n + 1)
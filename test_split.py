@@ -1,7 +1,14 @@
 import pandas as pd
+import numpy as np
+import random
 import tempfile
 import os
-from text_splitter import process_excel_file
+import pytest
+import text_splitter
+from segmenter import get_segmenter
+from sentence_aligner import align_many
+from translation_check_simple import ideal_length_ratio
+from text_splitter import process_excel_file, _split_rows
 
 def create_test_file():
     """Creates a simple test Excel file with some bilingual text."""
@@ -53,5 +60,323 @@ def run_test():
     except Exception as e:
         print(f"Error reading output file: {str(e)}")
 
+def split_rows_one_by_one(source_texts, target_texts, source_lang='en', target_lang='cs'):
+    """
+    Reference implementation of _split_rows: one row at a time, in plain Python.
+    
+    It uses the same segmenter and aligner, so it checks the batching, not the
+    splitting rules (see split_rows_like_baseline for those).
+    """
+    ratio = sum(ideal_length_ratio(source_lang, target_lang)) / 2
+    
+    def finish(text):
+        # Remove a double period left by the split, or add a missing final one
+        if text.endswith('..'):
+            return text[:-1]
+        return text if text[-1:] in ('.', '!', '?') else text + '.'
+    
+    pairs = []
+    for row, (source_text, target_text) in enumerate(zip(source_texts, target_texts), 1):
+        source_text, target_text = str(source_text), str(target_text)
+        if not source_text.strip() or not target_text.strip():
+            continue
+        source_spans = get_segmenter(source_lang).spans(source_text)
+        target_spans = get_segmenter(target_lang).spans(target_text)
+        if len(source_spans) == len(target_spans):
+            beads = [(i, i + 1, i, i + 1) for i in range(len(source_spans))]
+        else:
+            beads = align_many(
+                [[end - start for start, end in source_spans]], [[end - start for start, end in target_spans]], ratio
+            )[0]
+        for source_first, source_stop, target_first, target_stop in beads:
+            if source_first == source_stop or target_first == target_stop:
+                continue
+            pairs.append((
+                row,
+                finish(source_text[source_spans[source_first][0]:source_spans[source_stop - 1][1]]),
+                finish(target_text[target_spans[target_first][0]:target_spans[target_stop - 1][1]])
+            ))
+    return pairs
+
+def make_corpus(rows, seed=0):
+    """A fixed bilingual corpus with the cases the splitter treats specially."""
+    rng = random.Random(seed)
+    source_sentences = [
+        'This is a test sentence.', 'Mr. Smith went to Washington D.C. yesterday.', 'Is it ready?',
+        'Profits rose by 15.5% in Q2 2023!', 'See p. 4 for details', 'It ended..', 'Version 2.0.4 is out.',
+        'Dr. Novak, Prof. Brown et al. agreed.', 'A very long sentence that goes on and on, with commas, and more words.'
+    ]
+    target_sentences = [
+        'Toto je testovací věta.', 'Pan Smith jel včera do Washingtonu D.C.', 'Je to hotové?',
+        'Zisky vzrostly o 15,5 % ve 2. čtvrtletí 2023!', 'Viz str. 4 pro podrobnosti', 'Skončilo to..',
+        'Verze 2.0.4 je venku.', 'Dr. Novák, prof. Brown aj. souhlasili.', 'Schůzka dne 10. května byla dlouhá.',
+        'Velmi dlouhá věta, která pokračuje dál a dál, s čárkami a dalšími slovy.'
+    ]
+    sources, targets = [], []
+    for _ in range(rows):
+        kind = rng.random()
+        if kind < 0.05:
+            sources.append(rng.choice(['', '   ', np.nan, 'Only source.']))
+            targets.append(rng.choice(['', 'Jen cíl.', np.nan]))
+            continue
+        count = rng.randint(1, 6)
+        source = [rng.choice(source_sentences) for _ in range(count)]
+        target = [rng.choice(target_sentences) for _ in range(count)]
+        if kind < 0.35:
+            # Different sentence counts: aligned by length
+            if rng.random() < 0.5:
+                target.insert(rng.randint(0, count), rng.choice(target_sentences))
+            elif count > 1:
+                target[0:2] = [target[0].rstrip('.?!') + ', ' + target[1]]
+        sources.append(' '.join(source))
+        targets.append(' '.join(target))
+    return sources, targets
+
+# The splitting of the original per-row implementation
+BASELINE_PATTERN = r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s'
+BASELINE_FALLBACK_PATTERN = r'(?<!\bMr)(?<!\bMrs)(?<!\bDr)(?<!\bMs)(?<!\bProf)(?<!\bRev)(?<!\bSt)(?<!\bp)(?<!\bč)(?<!\bstr)(?<!\br)\.\s+[A-Z0-9]'
+
+def split_rows_like_baseline(source_texts, target_texts):
+    """Oracle: the row loop of the original process_excel_file, with its regex splitting."""
+    import re
+    
+    def split_at(text, matches):
+        sentences = []
+        previous = 0
+        for match in matches:
+            sentences.append(text[previous:match.start() + 1].strip())
+            previous = match.start() + 1
+        if previous < len(text):
+            sentences.append(text[previous:].strip())
+        return sentences
+    
+    def finish(text):
+        if text.endswith('..'):
+            return text[:-1]
+        return text if any(text.endswith(p) for p in ['.', '!', '?']) else text + '.'
+    
+    pairs = []
+    for row, (source_text, target_text) in enumerate(zip(source_texts, target_texts), 1):
+        source_text, target_text = str(source_text), str(target_text)
+        if source_text.strip() == '' or target_text.strip() == '':
+            continue
+        source = re.split(BASELINE_PATTERN, source_text)
+        target = re.split(BASELINE_PATTERN, target_text)
+        if len(source) <= 1 and len(source_text) > 50:
+            source_matches = list(re.finditer(BASELINE_FALLBACK_PATTERN, source_text))
+            target_matches = list(re.finditer(BASELINE_FALLBACK_PATTERN, target_text))
+            if source_matches and target_matches:
+                source = split_at(source_text, source_matches)
+                target = split_at(target_text, target_matches)
+            else:
+                source = [(s + ".").strip() for s in source_text.split('. ') if s.strip()]
+                target = [(s + ".").strip() for s in target_text.split('. ') if s.strip()]
+        source = [s.strip() for s in source if s.strip()]
+        target = [s.strip() for s in target if s.strip()]
+        if len(source) != len(target):
+            if abs(len(source) - len(target)) > 2:
+                continue
+            count = min(len(source), len(target))
+            source, target = source[:count], target[:count]
+        pairs.extend((row, finish(s), finish(t)) for s, t in zip(source, target) if s and t)
+    return pairs
+
+def make_baseline_corpus(rows, seed=0):
+    """
+    Rows on which the splitting is meant to be unchanged since the original implementation.
+    
+    Two later changes are left out on purpose: rows whose sentence counts differ are
+    now realigned by length instead of truncated, and texts of 31 to 50 characters
+    without a regular boundary now get the second look for initials. Every row here
+    has the same number of sentences on both sides, and short texts have a boundary.
+    'Prof.' is left out too: the original pattern split after it.
+    """
+    rng = random.Random(seed)
+    pairs = [
+        ('This is a test sentence.', 'Toto je testovací věta.'),
+        ('Mr. Smith went to Washington yesterday.', 'Pan Smith jel včera do Washingtonu.'),
+        ('Is it ready?', 'Je to hotové?'),
+        ('Profits rose by 15.5% in Q2 2023!', 'Zisky vzrostly o 15,5 % ve druhém čtvrtletí 2023!'),
+        ('Version 2.0.4 is out.', 'Verze 2.0.4 je venku.'),
+        ('Dr. Novak and Mr. Brown agreed.', 'Dr. Novák a Mr. Brown souhlasili.'),
+        ('It ended..', 'Skončilo to..'),
+        ('The U.S. economy grew fast.', 'Ekonomika USA rychle rostla.'),
+        ('Wait... what?', 'Počkej... cože?'),
+        ('A very long sentence that goes on and on, with commas, and more words.',
+         'Velmi dlouhá věta, která pokračuje dál a dál, s čárkami a dalšími slovy.'),
+    ]
+    sources, targets = [], []
+    for _ in range(rows):
+        kind = rng.random()
+        if kind < 0.05:
+            sources.append(rng.choice(['', '   ', np.nan, 'Only source.']))
+            targets.append(rng.choice(['', 'Jen cíl.', np.nan]))
+            continue
+        chosen = [rng.choice(pairs) for _ in range(rng.randint(1, 5))]
+        source = ' '.join(source for source, target in chosen)
+        target = ' '.join(target for source, target in chosen)
+        if kind < 0.2:
+            # A missing final period
+            source, target = source.rstrip('.'), target.rstrip('.')
+        elif kind < 0.3:
+            # A long text whose only boundaries are after initials
+            source = f"The delegation flew to Washington D.C. {rng.randint(2, 9)} hours later it landed"
+            target = f"Delegace letěla do Washingtonu D.C. {rng.randint(2, 9)} hodin poté přistála"
+        sources.append(source)
+        targets.append(target)
+    return sources, targets
+
+def test_split_rows_matches_the_original_splitter():
+    sources, targets = make_baseline_corpus(2000)
+    pairs, mismatched, dropped = _split_rows(sources, targets)
+    
+    batched = list(zip(pairs.original_rows(), pairs.sources(), pairs.targets()))
+    assert batched == split_rows_like_baseline(sources, targets)
+    assert len(batched) > 4000 and not mismatched.any()
+
+def test_split_rows_matches_per_row_loop():
+    sources, targets = make_corpus(2000)
+    pairs, mismatched, dropped = _split_rows(sources, targets)
+    
+    batched = list(zip(pairs.original_rows(), pairs.sources(), pairs.targets()))
+    assert batched == split_rows_one_by_one(sources, targets)
+    assert mismatched.any() and len(batched) > 4000
+
+def _failing_check(*args, **kwargs):
+    raise Exception("checker unavailable")
+
+@pytest.mark.parametrize("rows,check_alignment,failing", [
+    (300, True, False),
+    (300, False, False),
+    (300, True, True),
+    (0, True, False),
+    (0, True, True),
+], ids=["checked", "unchecked", "check_failed", "header_only", "header_only_check_failed"])
+def test_streaming_and_in_memory_outputs_match(tmp_path, monkeypatch, rows, check_alignment, failing):
+    if failing:
+        monkeypatch.setattr(text_splitter, "batch_check_translations", _failing_check)
+    sources, targets = make_corpus(rows, seed=1)
+    input_path = str(tmp_path / "in.xlsx")
+    pd.DataFrame({'en-US': sources, 'cs-CZ': targets}, dtype=object).to_excel(input_path, index=False)
+    
+    results = {}
+    for streaming in (False, True):
+        output_path = tmp_path / f"out_{streaming}.csv"
+        stats = process_excel_file(
+            input_path, str(output_path), check_alignment=check_alignment, streaming=streaming, output_format='csv',
+            chunk_size=100, workers=1
+        )
+        results[streaming] = (output_path.read_text(encoding='utf-8'), stats)
+    
+    assert results[False] == results[True]
+    header = results[False][0].splitlines()[0]
+    assert header.endswith('alignment_issues') is check_alignment
+    assert ('alignment_error_msg' in results[False][1]) is (failing and rows > 0)
+
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize("check_alignment", [True, False])
+def test_process_pool_output_matches_one_worker(tmp_path, streaming, check_alignment):
+    sources, targets = make_corpus(700, seed=2)
+    input_path = str(tmp_path / "in.xlsx")
+    pd.DataFrame({'en-US': sources, 'cs-CZ': targets}, dtype=object).to_excel(input_path, index=False)
+    
+    results = {}
+    for workers in (1, 2):
+        output_path = tmp_path / f"out_{workers}.csv"
+        stats = process_excel_file(
+            input_path, str(output_path), check_alignment=check_alignment, streaming=streaming, output_format='csv',
+            chunk_size=150, workers=workers
+        )
+        results[workers] = (output_path.read_bytes(), stats)
+    
+    assert results[1] == results[2]
+    assert ('alignment_checked_count' in results[2][1]) is check_alignment
+
+def test_parsed_workbook_is_reused_until_the_file_changes(tmp_path, monkeypatch):
+    input_path = str(tmp_path / "in.xlsx")
+    parsed_path = str(tmp_path / "in.pkl")
+    output_path = tmp_path / "out.csv"
+    pd.DataFrame({'en-US': ["One. Two."], 'cs-CZ': ["Jedna. Dvě."]}).to_excel(input_path, index=False)
+    
+    parses = []
+    read_excel = pd.read_excel
+    monkeypatch.setattr(pd, "read_excel", lambda *args, **kwargs: parses.append(args) or read_excel(*args, **kwargs))
+    
+    def process():
+        stats = process_excel_file(input_path, str(output_path), check_alignment=False, output_format='csv',
+                                   parsed_cache_path=parsed_path)
+        return stats['total_sentences'], output_path.read_text(encoding='utf-8')
+    
+    first = process()
+    assert len(parses) == 1 and os.path.exists(parsed_path)
+    # A touched upload is the same upload
+    os.utime(input_path, (1, 1))
+    assert process() == first
+    assert len(parses) == 1
+    
+    # A new workbook at the same path is parsed again
+    pd.DataFrame({'en-US': ["One. Two. Three."], 'cs-CZ': ["Jedna. Dvě. Tři."]}).to_excel(input_path, index=False)
+    assert process()[0] == 3
+    assert len(parses) == 2
+    assert process()[0] == 3
+    assert len(parses) == 2
+
+def _duplicated_workbook(path, rows=300, unique=40, seed=3):
+    """A workbook whose rows are copies of a few distinct ones, empty rows included; returns their texts."""
+    sources, targets = make_corpus(unique, seed=seed)
+    rng = random.Random(seed)
+    picks = [rng.randrange(unique) for _ in range(rows)]
+    pd.DataFrame({'en-US': [sources[i] for i in picks], 'cs-CZ': [targets[i] for i in picks]},
+                 dtype=object).to_excel(path, index=False)
+    # Empty strings are read back as empty cells
+    frame = pd.read_excel(path).fillna('')
+    return list(zip(frame['en-US'], frame['cs-CZ']))
+
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize("check_alignment", [True, False])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_fanout_output_matches_no_deduplication(tmp_path, streaming, check_alignment, workers):
+    input_path = str(tmp_path / "in.xlsx")
+    rows = _duplicated_workbook(input_path)
+    
+    results = {}
+    for deduplicate in (None, 'fanout'):
+        output_path = tmp_path / f"out_{deduplicate}.csv"
+        stats = process_excel_file(
+            input_path, str(output_path), check_alignment=check_alignment, streaming=streaming, output_format='csv',
+            chunk_size=70, workers=workers, deduplicate=deduplicate
+        )
+        results[deduplicate] = (output_path.read_bytes(), stats)
+    
+    assert results['fanout'][0] == results[None][0]
+    fanout_stats = dict(results['fanout'][1])
+    assert fanout_stats.pop('duplicate_rows') == len(rows) - len(set(rows))
+    assert fanout_stats == results[None][1]
+
+@pytest.mark.parametrize("check_alignment", [True, False])
+def test_collapse_keeps_the_first_copy_of_each_row(tmp_path, check_alignment):
+    input_path = str(tmp_path / "in.xlsx")
+    rows = _duplicated_workbook(input_path)
+    first_rows = {}
+    for number, texts in enumerate(rows, 1):
+        first_rows.setdefault(texts, number)
+    occurrences = {first_rows[texts]: rows.count(texts) for texts in first_rows}
+    
+    def process(deduplicate):
+        output_path = tmp_path / f"out_{deduplicate}.csv"
+        stats = process_excel_file(input_path, str(output_path), check_alignment=check_alignment,
+                                   output_format='csv', deduplicate=deduplicate)
+        return pd.read_csv(output_path, dtype=str, keep_default_na=False), stats
+    
+    plain, _ = process(None)
+    collapsed, stats = process('collapse')
+    
+    # The pairs of the first copies, in row order, with the number of copies
+    expected = plain[plain['original_row'].astype(int).isin(set(first_rows.values()))].reset_index(drop=True)
+    assert collapsed.drop(columns='occurrences').equals(expected)
+    assert (collapsed['occurrences'].astype(int) == collapsed['original_row'].astype(int).map(occurrences)).all()
+    assert stats['duplicate_rows'] == len(rows) - len(first_rows)
+    assert stats['total_rows'] == len(first_rows)
+
 if __name__ == "__main__":
     run_test()
\ No newline at end of file
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import translation_check
+
+
+class StubAPI:
+    """
+    Local stand-in for the chat completions endpoint.
+
+    respond(prompt, attempt) returns (status, content) for one request, where
+    attempt counts the requests made so far for the same prompt.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+        self.attempts = {}
+        self.times = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                prompt = body['messages'][-1]['content']
+                with stub.lock:
+                    stub.requests.append(prompt)
+                    attempt = stub.attempts[prompt] = stub.attempts.get(prompt, 0) + 1
+                    stub.times.setdefault(prompt, []).append(time.monotonic())
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    status, content = stub.respond(prompt, attempt)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+                if status == 200:
+                    data = json.dumps({
+                        "id": "stub", "object": "chat.completion", "created": 0, "model": translation_check.MODEL,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": content}}]
+                    }).encode()
+                else:
+                    data = json.dumps({"error": {"message": "stub error", "type": "server_error"}}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up waiting
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(translation_check, "RETRY_BACKOFF", 0.01)
+    apis = []
+
+    def start(respond):
+        api = StubAPI(respond)
+        apis.append(api)
+        # Same as starting the app with OPENAI_BASE_URL pointing at the stub
+        monkeypatch.setattr(translation_check, "API_BASE_URL", api.url)
+        return api
+
+    yield start
+    for api in apis:
+        api.close()
+
+
+def _sources(prompt):
+    return re.findall(r'^\s*English: (.*)$', prompt, re.MULTILINE)
+
+
+def _score(source):
+    # Sources are like "Sentence number 3 is here": the stub scores them by their number
+    return int(re.search(r'\d+', source).group()) / 100
+
+
+def _single_answer(prompt):
+    source = _sources(prompt)[0]
+    return json.dumps({"alignment_score": _score(source), "confidence": 0.9, "explanation": source})
+
+
+def _pairs(count):
+    return [(f"Sentence number {i} is here", f"Věta číslo {i} je tady") for i in range(count)]
+
+
+def _check(pairs, **kwargs):
+    return asyncio.run(translation_check.check_translations_concurrently(pairs, **kwargs))
+
+
+def test_results_come_back_in_input_order(stub_api):
+    def respond(prompt, attempt):
+        # Later pairs answer first
+        time.sleep(0.2 - _score(_sources(prompt)[0]))
+        return 200, _single_answer(prompt)
+
+    stub_api(respond)
+    results = translation_check.batch_check_translations(
+        [source for source, target in _pairs(10)], [target for source, target in _pairs(10)],
+        sample_size=10, include_details=False, concurrency=10, cache=False, batch_size=1
+    )
+
+    assert results["scores"] == [i / 100 for i in range(10)]
+    assert results["checked_count"] == 10
+
+
+@pytest.mark.parametrize("sample_size,checked", [(None, 25), (5, 5), (100, 25)])
+def test_sample_size_none_checks_every_pair(stub_api, sample_size, checked):
+    api = stub_api(lambda prompt, attempt: (200, _single_answer(prompt)))
+    sources, targets = zip(*_pairs(25))
+
+    results = translation_check.batch_check_translations(
+        list(sources), list(targets), sample_size=sample_size, include_details=False, cache=False, batch_size=1
+    )
+
+    assert results["checked_count"] == checked == len(api.requests)
+    assert sum(score >= 0 for score in results["scores"]) == checked
+
+
+def test_concurrency_stays_within_the_limit(stub_api):
+    def respond(prompt, attempt):
+        time.sleep(0.05)
+        return 200, _single_answer(prompt)
+
+    api = stub_api(respond)
+    results = _check(_pairs(20), concurrency=3, batch_size=1)
+
+    assert [result["alignment_score"] for result in results] == [i / 100 for i in range(20)]
+    assert api.max_in_flight == 3
+
+
+def test_requests_over_the_timeout_are_retried_then_fail(stub_api):
+    def respond(prompt, attempt):
+        # The first pair is always slow, the second one only on its first attempt
+        if _score(_sources(prompt)[0]) == 0 or attempt == 1:
+            time.sleep(0.5)
+        return 200, _single_answer(prompt)
+
+    api = stub_api(respond)
+    started = time.monotonic()
+    results = _check(_pairs(2), timeout=0.1, max_retries=1, batch_size=1)
+
+    assert time.monotonic() - started < 0.5
+    assert translation_check._is_error_result(results[0])
+    assert results[1]["alignment_score"] == 0.01
+    assert sorted(api.attempts.values()) == [2, 2]
+
+
+def test_transient_errors_are_retried_with_backoff(stub_api, monkeypatch):
+    monkeypatch.setattr(translation_check, "RETRY_BACKOFF", 0.05)
+
+    def respond(prompt, attempt):
+        if "number 1 " in prompt:
+            return 400, None  # not transient: fails at once
+        return {1: (429, None), 2: (500, None), 3: (503, None)}.get(attempt, (200, _single_answer(prompt)))
+
+    api = stub_api(respond)
+    results = _check(_pairs(2), max_retries=3, batch_size=1)
+
+    assert results[0]["alignment_score"] == 0.0 and not translation_check._is_error_result(results[0])
+    assert translation_check._is_error_result(results[1])
+    attempts = {_score(_sources(prompt)[0]): count for prompt, count in api.attempts.items()}
+    assert attempts == {0.0: 4, 0.01: 1}
+    # The delay before retry k is RETRY_BACKOFF * 2**k, with up to the same again as jitter
+    times = next(times for prompt, times in api.times.items() if "number 0 " in prompt)
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    for k, gap in enumerate(gaps):
+        assert 0.05 * 2 ** k <= gap < 0.05 * 2 ** (k + 1) * 2 + 0.1
+
+
+@pytest.mark.parametrize("explanation", [None, 0.5])
+def test_single_answer_with_a_non_string_explanation_is_an_error(stub_api, explanation):
+    stub_api(lambda prompt, attempt: (200, json.dumps(
+        {"alignment_score": 0.9, "confidence": 0.9, "explanation": explanation}
+    )))
+    results = _check(_pairs(1), batch_size=1)
+
+    assert translation_check._is_error_result(results[0])
+
+
+def test_retries_are_exhausted_into_an_error_result(stub_api):
+    api = stub_api(lambda prompt, attempt: (500, None))
+    results = _check(_pairs(1), max_retries=2, batch_size=1)
+
+    assert translation_check._is_error_result(results[0])
+    assert list(api.attempts.values()) == [3]
+
+
+@pytest.mark.parametrize("batch_answer", [
+    None,
+    "not json",
+    json.dumps(["results"]),
+    json.dumps({"results": [{"pair": 1, "alignment_score": 0.0, "confidence": 0.9, "explanation": "first"}]}),
+    # Non-string explanations, as JSON mode sometimes returns
+    json.dumps({"results": [
+        {"pair": i + 1, "alignment_score": 0.5, "confidence": 0.9, "explanation": explanation}
+        for i, explanation in enumerate([None, 3, ["list"], {"text": "dict"}])
+    ]}),
+])
+def test_malformed_or_short_batch_answers_fall_back_to_single_pairs(stub_api, batch_answer):
+    def respond(prompt, attempt):
+        if "Pair 1:" in prompt:
+            return 200, batch_answer
+        return 200, _single_answer(prompt)
+
+    api = stub_api(respond)
+    results = _check(_pairs(4), batch_size=4)
+
+    assert [result["alignment_score"] for result in results] == [0.0, 0.01, 0.02, 0.03]
+    assert not any(translation_check._is_error_result(result) for result in results)
+    batched = sum("Pair 1:" in prompt for prompt in api.requests)
+    assert batched == 1
+    # Only the pairs without a valid verdict in the batched answer are sent again
+    assert len(api.requests) - batched == (3 if batch_answer and "first" in batch_answer else 4)
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+import translation_check_simple
+from translation_check_simple import score_translation_pairs, simple_check_translation_alignment
+
+EDGE_CASES = [
+    ("", ""),
+    ("", "Prázdný zdroj."),
+    ("Empty target.", ""),
+    ("   ", "\t"),
+    ("42", "42"),
+    ("1 2 3", "3 2 1"),
+    ("12.5", "12,5"),
+    ("2023", "2024"),
+    ("...", "!!!"),
+    ("?", "."),
+    ("Hello, world; again.", "Ahoj světe."),
+    ("No final punctuation", "Bez interpunkce na konci"),
+    ("Is it?", "Je to tak!"),
+    ("Prague and Brno.", "Praha a Brno."),
+    ("Čeština in the source.", "Šílený Žluťoučký kůň."),
+    ("Tabs\tand\nnewlines.", "Tabulátory\ta\nnové řádky."),
+    ("\x00separator\x00", "oddělovač\x00"),
+    ("Emoji 🙂 here.", "Emoji 🙂 tady."),
+    ("a" * 500, "b"),
+    ("Smith paid $1,000,000 on 3/4/2023.", "Smith zaplatil 1 000 000 $ dne 3. 4. 2023."),
+]
+
+WORDS = ["The", "meeting", "Prague", "was", "42", "long", "Brno", "3.5", "and", "big", "zítra", "Šárka", "kůň", ""]
+
+
+def _random_sentence(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(0, 12))]
+    separators = [rng.choice([" ", " ", ", ", "; ", "  "]) for _ in words]
+    text = "".join(word + separator for word, separator in zip(words, separators)).strip()
+    return text + rng.choice(["", ".", "!", "?", ".."])
+
+
+def _scalar_results(sources, targets, source_lang="en", target_lang="cs"):
+    return [
+        simple_check_translation_alignment(source, target, source_lang, target_lang)
+        for source, target in zip(sources, targets)
+    ]
+
+
+def _assert_same_results(vectorized, scalar):
+    assert len(vectorized) == len(scalar)
+    for row, expected in zip(vectorized.to_dict('records'), scalar):
+        assert row["alignment_score"] == pytest.approx(expected["alignment_score"], abs=1e-12)
+        assert row["explanation"] == expected["explanation"]
+        assert bool(row["is_aligned"]) == expected["is_aligned"]
+        assert row["confidence"] == expected["confidence"]
+
+
+def test_edge_cases_match_the_single_pair_checker():
+    sources, targets = zip(*EDGE_CASES)
+    _assert_same_results(score_translation_pairs(list(sources), list(targets)), _scalar_results(sources, targets))
+
+
+def test_random_pairs_match_the_single_pair_checker(monkeypatch):
+    # Small blocks, so pairs on both sides of a block boundary are compared
+    monkeypatch.setattr(translation_check_simple, "SCORING_BLOCK_SIZE", 37)
+    rng = random.Random(5)
+    sources = [_random_sentence(rng) for _ in range(500)]
+    targets = [_random_sentence(rng) for _ in range(500)]
+
+    _assert_same_results(score_translation_pairs(sources, targets), _scalar_results(sources, targets))
+
+
+def test_language_pair_is_taken_into_account():
+    sources, targets = zip(*EDGE_CASES)
+    _assert_same_results(
+        score_translation_pairs(list(targets), list(sources), source_lang="cs", target_lang="en"),
+        _scalar_results(targets, sources, source_lang="cs", target_lang="en")
+    )
+
+
+def test_no_pairs():
+    assert len(score_translation_pairs([], [])) == 0
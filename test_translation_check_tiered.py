@@ -0,0 +1,86 @@
+import os
+
+import pandas as pd
+import pytest
+
+import text_splitter
+import translation_check
+import translation_check_simple
+from translation_check_tiered import TieredChecker
+
+SOURCES = [
+    "She went to the shop to buy some bread.",
+    "The meeting on April 15 was very productive.",
+    "Prague is a big and beautiful city in Europe.",
+]
+TARGETS = [
+    "Šla do obchodu koupit nějaký chleba.",
+    "Schůzka dne 15. dubna byla velmi produktivní.",
+    "Dnes je krásný den a svítí slunce.",
+]
+
+
+def _fake_llm(fail):
+    def batch_check_translations(sources, targets, **kwargs):
+        details = []
+        for index, source in enumerate(sources):
+            result = translation_check._error_result("stub outage") if fail else {
+                "alignment_score": 0.95, "confidence": 0.9, "explanation": "Fine", "is_aligned": True
+            }
+            details.append({**result, "index": index})
+        return {"details": details}
+    return batch_check_translations
+
+
+@pytest.fixture
+def heuristic_calls(monkeypatch):
+    calls = []
+    heuristic = translation_check_simple.batch_check_translations
+
+    def recording(*args, **kwargs):
+        calls.append(kwargs)
+        return heuristic(*args, **kwargs)
+
+    monkeypatch.setattr(translation_check_simple, "batch_check_translations", recording)
+    return calls
+
+
+def test_uncertain_pairs_go_to_the_llm_up_to_the_budget(monkeypatch, heuristic_calls):
+    monkeypatch.setattr(translation_check, "batch_check_translations", _fake_llm(fail=False))
+    checker = TieredChecker(low=0.0, high=1.01, budget=2)
+
+    results = checker.batch_check_translations(SOURCES, TARGETS)
+
+    assert results["tiers"] == {'heuristic': 0, 'llm': 2, 'over_budget': 1, 'llm_errors': 0}
+    assert sorted(results["scores"].tolist()).count(0.95) == 2
+    # The heuristics are recomputed rather than looked up in the alignment cache
+    assert [call["cache"] for call in heuristic_calls] == [None]
+
+
+def test_failed_llm_checks_keep_the_heuristic_verdict(monkeypatch, heuristic_calls):
+    monkeypatch.setattr(translation_check, "batch_check_translations", _fake_llm(fail=True))
+    heuristic = translation_check_simple.batch_check_translations(SOURCES, TARGETS, sample_size=None, cache=None)
+
+    results = TieredChecker(low=0.0, high=1.01).batch_check_translations(SOURCES, TARGETS)
+
+    assert results["tiers"]["llm_errors"] == 3
+    assert results["scores"].tolist() == heuristic["scores"].tolist()
+    assert results["issues"] == heuristic["issues"]
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_runs_with_failed_llm_checks_are_not_recorded(tmp_path, monkeypatch, fail):
+    monkeypatch.setattr(translation_check, "batch_check_translations", _fake_llm(fail))
+    monkeypatch.setattr(text_splitter, "_alignment_checker", lambda name: TieredChecker(low=0.0, high=1.01))
+    input_path = str(tmp_path / "in.xlsx")
+    pd.DataFrame({'en-US': SOURCES, 'cs-CZ': TARGETS}).to_excel(input_path, index=False)
+    manifest_path = str(tmp_path / "rows.json")
+
+    stats = text_splitter.process_excel_file(
+        input_path, str(tmp_path / "out.csv"), output_format='csv', manifest_path=manifest_path,
+        alignment_checker='tiered'
+    )
+
+    assert stats["alignment_tiers"]["llm_errors"] == (3 if fail else 0)
+    assert text_splitter.is_complete(stats) is not fail
+    assert any(name.startswith("rows.json") for name in os.listdir(tmp_path)) is not fail
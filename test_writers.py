@@ -0,0 +1,124 @@
+import io
+import zipfile
+
+import pytest
+from openpyxl import load_workbook
+
+import writers
+from writers import open_writer, available_output_formats
+
+HEADER = ['en-US', 'cs-CZ', 'original_row', 'alignment_score', 'alignment_issues']
+
+
+def test_parquet_schema_does_not_depend_on_the_first_row_group(tmp_path, monkeypatch):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(writers, "PARQUET_ROW_GROUP_SIZE", 2)
+    path = tmp_path / "out.parquet"
+
+    # The first row group has only unchecked pairs (integer -1 scores, no issues)
+    with open_writer('parquet', str(path), HEADER, shard_rows=0) as writer:
+        writer.write_rows([
+            ("One.", "Jedna.", 1, -1, None),
+            ("Two.", "Dvě.", 2, -1, None),
+            ("Three.", "Tři.", 3, 0.25, "Numbers differ"),
+            ("Four.", "Čtyři.", 4, 0.875, None),
+        ])
+
+    table = pyarrow_parquet.read_table(path)
+    assert [str(field.type) for field in table.schema] == ['string', 'string', 'int64', 'double', 'string']
+    assert table.column('alignment_score').to_pylist() == [-1.0, -1.0, 0.25, 0.875]
+    assert table.column('alignment_issues').to_pylist() == [None, None, "Numbers differ", None]
+
+
+def test_formats_with_missing_packages_are_not_offered(monkeypatch):
+    monkeypatch.setattr(writers, "find_spec", lambda name: None if name == 'pyarrow' else object())
+    formats = available_output_formats()
+    assert 'parquet' not in formats
+    assert {'xlsx', 'csv', 'tsv', 'tmx'} <= set(formats)
+
+
+# Data rows per shard when the Excel row limit is 4: one row is the header
+MAX_ROWS = 3
+
+
+def _rows(count):
+    return [(f"Sentence {i}.", f"Věta {i}.", i, 0.5, "Numbers differ") for i in range(1, count + 1)]
+
+
+def _write(writer, rows, batch_size):
+    with writer:
+        for start in range(0, len(rows), batch_size):
+            writer.write_rows(iter(rows[start:start + batch_size]))
+    return writer
+
+
+def _sheet_rows(sheet):
+    return [row for row in sheet.iter_rows(values_only=True)]
+
+
+def _expected_shards(rows):
+    # Every shard starts with the header
+    return [[tuple(HEADER)] + rows[start:start + MAX_ROWS] for start in range(0, len(rows), MAX_ROWS)]
+
+
+@pytest.fixture
+def excel_limit(monkeypatch):
+    monkeypatch.setattr(writers, "EXCEL_MAX_ROWS", MAX_ROWS + 1)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 100])
+@pytest.mark.parametrize("count,shards", [(MAX_ROWS, 1), (2 * MAX_ROWS, 2), (2 * MAX_ROWS + 1, 3)])
+def test_sheet_shards_split_at_the_excel_limit(tmp_path, excel_limit, count, shards, batch_size):
+    path = tmp_path / "out.xlsx"
+    rows = _rows(count)
+
+    writer = _write(open_writer('xlsx', str(path), HEADER, shard_mode='sheets'), rows, batch_size)
+
+    assert (writer.shard_count, writer.rows_written) == (shards, count)
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == [f"Sheet{number}" for number in range(1, shards + 1)]
+    assert [_sheet_rows(workbook[name]) for name in workbook.sheetnames] == _expected_shards(rows)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 100])
+@pytest.mark.parametrize("count,shards", [(2 * MAX_ROWS, 2), (2 * MAX_ROWS + 1, 3)])
+def test_file_shards_are_zipped_under_the_output_name(tmp_path, excel_limit, count, shards, batch_size):
+    # The output is written to a temporary path, and named after the final one
+    path = tmp_path / "upload.tmp"
+    rows = _rows(count)
+
+    writer = _write(open_writer('xlsx', str(path), HEADER, shard_mode='files', name="texts.xlsx"), rows, batch_size)
+
+    assert (writer.shard_count, writer.rows_written) == (shards, count)
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        contents = [_sheet_rows(load_workbook(io.BytesIO(archive.read(name)), read_only=True).active) for name in names]
+    assert names == [f"texts_part{number:03d}.xlsx" for number in range(1, shards + 1)]
+    assert contents == _expected_shards(rows)
+    # No shard file is left next to the archive
+    assert [p.name for p in tmp_path.iterdir()] == ["upload.tmp"]
+
+
+def test_a_single_file_shard_is_a_plain_file(tmp_path, excel_limit):
+    path = tmp_path / "out.xlsx"
+
+    writer = _write(open_writer('xlsx', str(path), HEADER, shard_mode='files'), _rows(MAX_ROWS), MAX_ROWS)
+
+    assert writer.shard_count == 1
+    # A workbook, not an archive of workbooks
+    with zipfile.ZipFile(path) as workbook:
+        assert "xl/workbook.xml" in workbook.namelist()
+    assert _sheet_rows(load_workbook(path, read_only=True).active) == _expected_shards(_rows(MAX_ROWS))[0]
+    assert [p.name for p in tmp_path.iterdir()] == ["out.xlsx"]
+
+
+def test_other_formats_shard_at_the_requested_size(tmp_path):
+    path = tmp_path / "out.csv"
+
+    _write(open_writer('csv', str(path), HEADER, shard_rows=2), _rows(4), 100)
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.namelist() == ["out_part001.csv", "out_part002.csv"]
+        assert archive.read("out_part002.csv").decode('utf-8').splitlines() == [
+            ",".join(HEADER), "Sentence 3.,Věta 3.,3,0.5,Numbers differ", "Sentence 4.,Věta 4.,4,0.5,Numbers differ"
+        ]
@@ -1,275 +1,1260 @@
-import pandas as pd
+import numpy as np
+import hashlib
+import itertools
 import logging
-import re
+import os
 import string
-from translation_check_simple import simple_check_translation_alignment, batch_check_translations
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from zipfile import BadZipFile
+from segmenter import get_segmenter
+from sentence_aligner import align_many
+from sentence_pairs import SentencePairs
+from row_manifest import row_key, load_manifest, save_manifest
+from writers import open_writer, DEFAULT_OUTPUT_FORMAT, ShardedWriter
+from metrics import StageTimer, FILES_PROCESSED, ROWS_PROCESSED, SENTENCES_PRODUCED, ROWS_PER_SECOND, \
+    ALIGNMENT_SECONDS, ALIGNMENT_PAIRS
+from translation_check_simple import simple_check_translation_alignment, batch_check_translations, \
+    ideal_length_ratio, CHECKER_NAME, CHECKER_VERSION
+import translation_check_tiered
 
-def process_excel_file(input_path, output_path, source_column='en-US', target_column='cs-CZ', check_alignment=True):
+# pandas and openpyxl are only imported by the functions that read workbooks: they take
+# longer to import than the rest of the app, which should start without waiting for them
+
+# Workbook formats that openpyxl can read row by row in streaming mode
+STREAMING_EXTENSIONS = {'.xlsx', '.xlsm'}
+
+# Rows per chunk and number of worker processes used to split a workbook
+DEFAULT_CHUNK_SIZE = int(os.environ.get("SPLITTER_CHUNK_SIZE", 10000))
+DEFAULT_WORKERS = int(os.environ.get("SPLITTER_WORKERS", 1))
+
+# How rows with the same source and target text can be processed once: 'fanout' writes the
+# pairs of every copy, 'collapse' writes them once with the number of occurrences
+DEDUPLICATE_MODES = ('fanout', 'collapse')
+
+# How sentence pairs are checked: 'heuristic' scores them all with translation_check_simple,
+# 'tiered' also sends the uncertain ones to the LLM checker, up to a per-job budget
+ALIGNMENT_CHECKERS = ('heuristic', 'tiered')
+DEFAULT_ALIGNMENT_CHECKER = os.environ.get("ALIGNMENT_CHECKER", "heuristic")
+
+# Log every sentence pair at debug level; off by default, as it is costly on big files
+LOG_SENTENCE_PAIRS = os.environ.get("LOG_SENTENCE_PAIRS", "").lower() in ("1", "true", "yes")
+
+
+def _realign_rows(rows, source_offsets, target_offsets, source_lengths, target_lengths, ratio):
     """
-    Process an Excel file containing bilingual text data and split it into sentence pairs.
+    Pair the sentences of rows with different sentence counts by their lengths.
     
     Args:
-        input_path (str): Path to the input Excel file
-        output_path (str): Path where the output Excel file will be saved
+        rows (np.ndarray): The mismatched rows
+        source_offsets (np.ndarray): Index of the first source sentence of every row (plus the total at the end)
+        target_offsets (np.ndarray): Index of the first target sentence of every row (plus the total at the end)
+        source_lengths (np.ndarray): Length of every source sentence
+        target_lengths (np.ndarray): Length of every target sentence
+        ratio (float): Expected target characters per source character
+        
+    Returns:
+        tuple: Arrays of the row, first and last source sentence and first and last
+               target sentence of every pair (sentences merged by a two-to-one bead
+               become one pair), and per row, the number of sentences left without a counterpart
+    """
+    alignments = align_many(
+        [source_lengths[source_offsets[row]:source_offsets[row + 1]].tolist() for row in rows],
+        [target_lengths[target_offsets[row]:target_offsets[row + 1]].tolist() for row in rows],
+        ratio
+    )
+    pairs = []
+    dropped = np.zeros(len(rows), dtype=np.int64)
+    for i, (row, beads) in enumerate(zip(rows.tolist(), alignments)):
+        source_first = source_offsets[row]
+        target_first = target_offsets[row]
+        for source_start, source_end, target_start, target_end in beads:
+            if source_start == source_end or target_start == target_end:
+                dropped[i] += (source_end - source_start) + (target_end - target_start)
+                continue
+            pairs.append((
+                row,
+                source_first + source_start, source_first + source_end - 1,
+                target_first + target_start, target_first + target_end - 1
+            ))
+    pairs = np.array(pairs, dtype=np.int64).reshape(-1, 5)
+    return (*pairs.T, dropped)
+
+
+def fix_punctuation(texts, rows, starts, ends):
+    """
+    Fix the final punctuation of sentences given as offsets.
+    
+    Don't add periods if already present, and remove any double periods
+    that might have been created by the split.
+    
+    Args:
+        texts (list): The cell texts
+        rows (np.ndarray): Cell of every sentence
+        starts (np.ndarray): Start offset of every sentence
+        ends (np.ndarray): End offset of every sentence
+        
+    Returns:
+        tuple: The fixed end offsets and whether a period is added to each sentence
+    """
+    endings = [texts[row][max(start, end - 2):end] for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist())]
+    double_period = np.array([ending == '..' for ending in endings], dtype=bool)
+    missing_period = ~double_period & ~np.array([ending[-1:] in ('.', '!', '?') for ending in endings], dtype=bool)
+    return ends - double_period, missing_period
+
+
+def _sentence_spans(texts, indices, language):
+    """Sentence offsets of some texts, as int arrays of (text index, start, end)."""
+    text_index, starts, ends = get_segmenter(language).spans_many(texts[i] for i in indices.tolist())
+    text_index = np.frombuffer(text_index, dtype=np.intc)
+    return (
+        indices[text_index] if len(text_index) else np.array([], dtype=np.int64),
+        np.frombuffer(starts, dtype=np.intc),
+        np.frombuffer(ends, dtype=np.intc)
+    )
+
+
+def _row_stats(total_rows, pair_rows, mismatched, dropped):
+    """
+    Processing statistics of split rows.
+    
+    Args:
+        total_rows (int): Number of rows
+        pair_rows (np.ndarray): Row of every sentence pair
+        mismatched (np.ndarray): Whether each row had different sentence counts
+        dropped (np.ndarray): Sentences of each row left without a counterpart
+    """
+    # A row gives no pairs if it is empty or none of its sentences could be aligned
+    has_pairs = np.bincount(pair_rows, minlength=total_rows).astype(bool)
+    skipped_rows = int(total_rows - has_pairs.sum())
+    return {
+        'total_rows': total_rows,
+        'processed_rows': total_rows - skipped_rows,
+        'skipped_rows': skipped_rows,
+        'total_sentences': len(pair_rows),
+        'mismatched_sentences': int(mismatched.sum()),
+        'realigned_rows': int((mismatched & has_pairs).sum()),
+        'dropped_sentences': int(dropped.sum())
+    }
+
+
+def split_sentence_columns(source_texts, target_texts, row_numbers=None, source_lang='en', target_lang='cs'):
+    """
+    Split whole columns of bilingual text into aligned sentence pairs.
+    
+    Each column is split in one batch by the shared segmenter of its language.
+    The pairs are offsets into the cell texts; their strings are only built
+    when they are checked or written.
+    
+    Args:
+        source_texts (iterable): Source language cell values, one per row
+        target_texts (iterable): Target language cell values, one per row
+        row_numbers (iterable): Row reference reported for each row (defaults to 1..n)
+        source_lang (str): ISO code for source language (en, cs, etc)
+        target_lang (str): ISO code for target language
+        
+    Returns:
+        tuple: SentencePairs and a dict with statistics about the processing
+    """
+    pairs, mismatched, dropped = _split_rows(source_texts, target_texts, row_numbers, source_lang, target_lang)
+    return pairs, _row_stats(len(mismatched), pairs.rows, mismatched, dropped)
+
+
+def _split_rows(source_texts, target_texts, row_numbers=None, source_lang='en', target_lang='cs'):
+    """
+    Split rows into sentence pairs, like split_sentence_columns.
+    
+    Returns:
+        tuple: SentencePairs, and per row whether its sentence counts differed
+               and how many of its sentences were left without a counterpart
+    """
+    # Get the text from both columns, ensuring they're strings
+    source = [str(value) for value in source_texts]
+    target = [str(value) for value in target_texts]
+    if len(source) != len(target):
+        raise ValueError("Source and target columns must have the same length")
+    
+    if row_numbers is None:
+        row_numbers = np.arange(1, len(source) + 1)
+    row_numbers = np.asarray(row_numbers)
+    
+    total_rows = len(source)
+    
+    # Skip empty rows
+    empty = np.array([not s.strip() or not t.strip() for s, t in zip(source, target)], dtype=bool)
+    kept = np.flatnonzero(~empty)
+    
+    source_rows, source_starts, source_ends = _sentence_spans(source, kept, source_lang)
+    target_rows, target_starts, target_ends = _sentence_spans(target, kept, target_lang)
+    
+    source_counts = np.bincount(source_rows, minlength=total_rows)
+    target_counts = np.bincount(target_rows, minlength=total_rows)
+    
+    # Check if sentence counts match
+    mismatched = (source_counts != target_counts) & ~empty
+    dropped = np.zeros(total_rows, dtype=np.int64)
+    
+    # Rows with equal counts pair up sentence by sentence
+    source_matched = np.flatnonzero(~mismatched[source_rows])
+    target_matched = np.flatnonzero(~mismatched[target_rows])
+    pair_rows = source_rows[source_matched]
+    source_first = source_last = source_matched
+    target_first = target_last = target_matched
+    
+    if mismatched.any():
+        logging.info(f"Mismatch in sentence count in {int(mismatched.sum())} rows, aligning them by length")
+        
+        # The others are aligned by sentence length
+        ratio = sum(ideal_length_ratio(source_lang, target_lang)) / 2
+        mismatched_rows = np.flatnonzero(mismatched)
+        realigned_rows, *realigned, realigned_dropped = _realign_rows(
+            mismatched_rows,
+            np.concatenate([[0], np.cumsum(source_counts)]),
+            np.concatenate([[0], np.cumsum(target_counts)]),
+            source_ends - source_starts,
+            target_ends - target_starts,
+            ratio
+        )
+        dropped[mismatched_rows] = realigned_dropped
+        order = np.argsort(np.concatenate([pair_rows, realigned_rows]), kind='stable')
+        pair_rows = np.concatenate([pair_rows, realigned_rows])[order]
+        source_first, source_last, target_first, target_last = (
+            np.concatenate([matched, part])[order]
+            for matched, part in zip((source_first, source_last, target_first, target_last), realigned)
+        )
+
+    
+    # Fix punctuation on both sides
+    source_end, source_period = fix_punctuation(
+        source, pair_rows, source_starts[source_last], source_ends[source_last]
+    )
+    target_end, target_period = fix_punctuation(
+        target, pair_rows, target_starts[target_last], target_ends[target_last]
+    )
+    pairs = SentencePairs(
+        source, target, row_numbers, pair_rows,
+        source_starts[source_first], source_end, target_starts[target_first], target_end,
+        source_period, target_period
+    )
+    
+    return pairs, mismatched, dropped
+
+
+def _split_incremental(source_texts, target_texts, row_numbers, source_column, target_column, check_alignment,
+                       previous, current, timer, checker=None):
+    """
+    Split and check rows, reusing the results of rows with the same texts.
+    
+    Only rows whose texts are in neither the manifest of an earlier run nor
+    an earlier row of this run are split and checked, each distinct text pair
+    once. Rows are matched by content, so moved and repeated rows are reused
+    too, and the result is the same as splitting and checking every row.
+    
+    Args:
+        source_texts (iterable): Source language cell values, one per row
+        target_texts (iterable): Target language cell values, one per row
+        row_numbers (iterable): Row reference reported for each row
         source_column (str): Name of the source language column
         target_column (str): Name of the target language column
+        check_alignment (bool): Whether to check the alignment of the sentence pairs
+        previous (dict): Row entries of the earlier run, from row_manifest.load_manifest
+        current (dict): Row entries of this run so far; receives the entries of these rows
+        timer (StageTimer): Collects the split and align times
+        checker (TieredChecker): Checker of the job, or None for the heuristic checker
         
     Returns:
-        dict: Statistics about the processing
+        tuple: SentencePairs, stats dict (with 'duplicate_rows', the rows whose texts
+               occurred earlier in this run) and alignment results (None if not checked)
     """
-    logging.debug(f"Processing file: {input_path}")
-    logging.debug(f"Using columns: {source_column} and {target_column}")
+    split_started = time.perf_counter()
+    source = [str(value) for value in source_texts]
+    target = [str(value) for value in target_texts]
+    row_numbers = np.asarray(row_numbers)
+    keys = [row_key(source_text, target_text) for source_text, target_text in zip(source, target)]
     
-    # Read the excel file
-    try:
-        df = pd.read_excel(input_path)
-    except Exception as e:
-        logging.error(f"Error reading Excel file: {str(e)}")
-        raise Exception(f"Could not read Excel file: {str(e)}")
+    fresh = []
+    duplicate_rows = 0
+    chunk_keys = set()
+    for i, key in enumerate(keys):
+        if key in current or key in chunk_keys:
+            duplicate_rows += 1
+        elif key not in previous:
+            fresh.append(i)
+        chunk_keys.add(key)
     
-    # Verify that the required columns exist
-    if source_column not in df.columns or target_column not in df.columns:
-        available_cols = ', '.join(df.columns)
+    fresh_pairs, fresh_mismatched, fresh_dropped = _split_rows(
+        [source[i] for i in fresh], [target[i] for i in fresh], row_numbers[fresh],
+        column_language(source_column, 'en'), column_language(target_column, 'cs')
+    )
+    timer.add('split', time.perf_counter() - split_started)
+    
+    error = None
+    fresh_scores = np.full(len(fresh_pairs), -1.0)
+    fresh_issues = {}
+    if check_alignment and len(fresh_pairs):
+        try:
+            with timer.stage('align'):
+                fresh_results = _run_alignment_check(fresh_pairs, source_column, target_column, checker)
+            fresh_scores = fresh_results['scores']
+            fresh_issues = fresh_results['issues']
+        except Exception as e:
+            logging.error(f"Error during alignment check: {str(e)}")
+            error = str(e)
+    
+    with timer.stage('split'):
+        # The pairs of a row are offsets into its own texts, so they stay valid wherever the row is
+        fresh_entries = list(zip(
+            fresh_pairs.source_start.tolist(), fresh_pairs.source_end.tolist(),
+            fresh_pairs.target_start.tolist(), fresh_pairs.target_end.tolist(),
+            fresh_pairs.source_period.tolist(), fresh_pairs.target_period.tolist(),
+            fresh_scores.tolist(), [fresh_issues.get(i) for i in range(len(fresh_pairs))]
+        ))
+        bounds = np.searchsorted(fresh_pairs.rows, np.arange(len(fresh) + 1)).tolist()
+        for j, i in enumerate(fresh):
+            current[keys[i]] = [bool(fresh_mismatched[j]), int(fresh_dropped[j]), fresh_entries[bounds[j]:bounds[j + 1]]]
+        
+        mismatched = np.zeros(len(source), dtype=bool)
+        dropped = np.zeros(len(source), dtype=np.int64)
+        rows = []
+        entries = []
+        for i, key in enumerate(keys):
+            entry = current.get(key)
+            if entry is None:
+                entry = current[key] = previous[key]
+            mismatched[i], dropped[i] = entry[0], entry[1]
+            rows.extend([i] * len(entry[2]))
+            entries.extend(entry[2])
+        
+        columns = list(zip(*entries)) if entries else [()] * 8
+        pairs = SentencePairs(source, target, row_numbers, rows, *columns[:6])
+        stats = _row_stats(len(source), pairs.rows, mismatched, dropped)
+        stats['duplicate_rows'] = duplicate_rows
+    
+    alignment_results = None
+    if error is not None:
+        stats['alignment_error_msg'] = error
+    elif check_alignment and len(pairs):
+        scores = np.array(columns[6], dtype=float)
+        issues = {i: issue for i, issue in enumerate(columns[7]) if issue is not None}
+        checked_count = int((scores >= 0).sum())
+        alignment_results = {
+            'checked_count': checked_count,
+            'aligned_count': checked_count - len(issues),
+            'scores': scores,
+            'issues': issues
+        }
+    return pairs, stats, alignment_results
+
+
+def _manifest_settings(source_column, target_column, check_alignment, checker=None):
+    """The settings a manifest is only valid for."""
+    settings = {
+        'source_column': source_column,
+        'target_column': target_column,
+        'check_alignment': check_alignment,
+        'checker': f"{CHECKER_NAME}/{CHECKER_VERSION}" if check_alignment else None
+    }
+    if check_alignment and checker is not None:
+        settings['checker'] = f"{translation_check_tiered.CHECKER_NAME}/{translation_check_tiered.CHECKER_VERSION}"
+        settings['uncertain_band'] = [checker.low, checker.high]
+    return settings
+
+
+def _alignment_checker(name):
+    """
+    Create the alignment checker of one job.
+    
+    Args:
+        name (str): One of ALIGNMENT_CHECKERS
+        
+    Returns:
+        TieredChecker: A checker holding the LLM budget of the job, or None for the heuristic checker
+    """
+    if name not in ALIGNMENT_CHECKERS:
+        raise Exception(f"Unknown alignment checker: {name}")
+    if name == 'tiered':
+        return translation_check_tiered.TieredChecker()
+    return None
+
+
+def is_complete(stats):
+    """
+    Whether every pair of a run was checked as requested.
+    
+    Results of incomplete runs, where the alignment check failed or some LLM
+    checks of the tiered checker failed, must not be reused by later runs.
+    """
+    return 'alignment_error_msg' not in stats and not stats.get('alignment_tiers', {}).get('llm_errors')
+
+
+def _save_row_manifest(path, settings, rows, stats):
+    """Save the manifest of a run, unless some rows could not be checked."""
+    if not is_complete(stats):
+        logging.warning(f"Not saving manifest {path}: the alignment check failed for some pairs")
+        return
+    save_manifest(path, settings, rows)
+
+
+def _collapse_duplicates(df, source_column, target_column):
+    """
+    Keep the first of the rows with the same source and target text.
+    
+    Returns:
+        tuple: The remaining rows, with their original index, and the number of occurrences of each
+    """
+    codes = df[[source_column, target_column]].astype(str).groupby(
+        [source_column, target_column], sort=False, dropna=False
+    ).ngroup().to_numpy()
+    # Groups are numbered in order of appearance, so the first rows come out in row order
+    first = np.unique(codes, return_index=True)[1]
+    return df.iloc[first], np.bincount(codes)
+
+
+def _log_pairs(pairs):
+    """Log each sentence pair, only when LOG_SENTENCE_PAIRS is set and debug logging is enabled."""
+    if not LOG_SENTENCE_PAIRS or not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    for start, stop in pairs.blocks():
+        for source, target, row in zip(pairs.sources(start, stop), pairs.targets(start, stop),
+                                       pairs.original_rows(start, stop)):
+            logging.debug(f"Row {row}: {source!r} -> {target!r}")
+
+
+def _record_file_metrics(stats, timer, started, mode, output_format):
+    """Record the stage timings and throughput of one processed file."""
+    elapsed = time.perf_counter() - started
+    timer.add('total', elapsed)
+    timer.observe()
+    FILES_PROCESSED.inc(mode=mode, format=output_format)
+    ROWS_PROCESSED.inc(stats['total_rows'])
+    SENTENCES_PRODUCED.inc(stats['total_sentences'])
+    if elapsed > 0:
+        ROWS_PER_SECOND.observe(stats['total_rows'] / elapsed)
+    logging.info(
+        f"Processed {stats['total_rows']} rows in {elapsed:.2f}s ("
+        + ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in timer.totals.items() if stage != 'total')
+        + ")"
+    )
+
+
+def column_language_tag(column, default):
+    """The full language tag of a column named like 'en-US', or default for other names."""
+    return column if '-' in column else default
+
+
+def column_language(column, default):
+    """Get the language code from a column name (assuming format like "en-US")."""
+    return column.split('-')[0].lower() if '-' in column else default
+
+
+def _require_columns(columns, source_column, target_column):
+    """Raise a readable error if the source or target column is missing."""
+    if source_column not in columns or target_column not in columns:
+        available_cols = ', '.join(str(c) for c in columns)
         logging.error(f"Required columns not found. Available columns: {available_cols}")
         raise Exception(f"Required columns ({source_column}, {target_column}) not found. Available columns: {available_cols}")
+
+
+def _run_alignment_check(pairs, source_column, target_column, checker=None):
+    """
+    Run the batch alignment check on every sentence pair.
+    
+    The sentences are materialized and checked one block at a time, by the
+    heuristic checker or, if given, by the tiered checker of the job.
+    
+    Returns:
+        dict: checked_count, aligned_count, 'scores' (array with the score of every
+              pair, -1 if not checked) and 'issues' (pair index -> explanation)
+    """
+    return _check_pairs(
+        pairs, column_language(source_column, 'en'), column_language(target_column, 'cs'), checker
+    )
+
+
+def _check_pairs(pairs, source_lang, target_lang, checker=None):
+    """
+    Run the batch alignment check on every sentence pair, like _run_alignment_check.
     
-    # Initialize lists to hold split data
-    source_sentences = []
-    target_sentences = []
-    row_references = []  # Keep track of original row for better traceability
-    
-    # Statistics tracking
-    stats = {
-        'total_rows': len(df),
-        'processed_rows': 0,
-        'skipped_rows': 0,
-        'total_sentences': 0,
-        'mismatched_sentences': 0
+    Returns:
+        dict: Like _run_alignment_check, plus 'batches': (seconds, checked pairs)
+              of every block, for recording the checks of worker processes
+    """
+    # Run batch alignment check on every sentence pair
+    logging.info(f"Checking translation alignment for {len(pairs)} sentence pairs")
+    
+    scores = np.full(len(pairs), -1.0)
+    issues = {}
+    checked_count = 0
+    aligned_count = 0
+    batches = []
+    check = batch_check_translations if checker is None else checker.batch_check_translations
+    for start, stop in pairs.blocks():
+        started = time.perf_counter()
+        block_results = check(
+            pairs.sources(start, stop),
+            pairs.targets(start, stop),
+            sample_size=None,
+            source_lang=source_lang,
+            target_lang=target_lang,
+            include_details=False
+        )
+        scores[start:stop] = block_results['scores']
+        issues.update((start + i, explanation) for i, explanation in block_results['issues'].items())
+        checked_count += block_results['checked_count']
+        aligned_count += block_results['aligned_count']
+        batches.append((time.perf_counter() - started, block_results['checked_count']))
+    
+    return {
+        'checked_count': checked_count, 'aligned_count': aligned_count, 'scores': scores, 'issues': issues,
+        'batches': batches
     }
+
+
+def _concat_alignment_results(partial_pairs, partial_results):
+    """Merge the alignment results of consecutive chunks of pairs, as if they had been checked at once."""
+    scores = []
+    issues = {}
+    offset = 0
+    for pairs, results in zip(partial_pairs, partial_results):
+        if results is None:
+            # Chunks without pairs are not checked
+            scores.append(np.full(len(pairs), -1.0))
+        else:
+            scores.append(np.asarray(results['scores'], dtype=float))
+            issues.update((offset + i, explanation) for i, explanation in results['issues'].items())
+        offset += len(pairs)
+    checked = [results for results in partial_results if results is not None]
+    return {
+        'checked_count': sum(results['checked_count'] for results in checked),
+        'aligned_count': sum(results['aligned_count'] for results in checked),
+        'scores': np.concatenate(scores) if scores else np.zeros(0),
+        'issues': issues
+    }
+
+
+def _alignment_totals(alignment_results, totals=None):
+    """Accumulate the raw alignment counters of one batch check into a totals dict."""
+    if totals is None:
+        totals = {'checked_count': 0, 'aligned_count': 0, 'score_sum': 0.0, 'poorly_aligned_count': 0}
     
-    # Regular expression for splitting sentences
-    # Enhanced to handle more edge cases:
-    # - Common abbreviations in English (Mr., Dr., etc.)
-    # - Common abbreviations in Czech (p., č., atd.)
-    # - Numeric expressions (1.5, 2.3.4)
-    # - Different punctuation marks
+    scores = np.asarray(alignment_results['scores'], dtype=float)
+    totals['checked_count'] += alignment_results['checked_count']
+    totals['aligned_count'] += alignment_results['aligned_count']
+    totals['score_sum'] += float(scores[scores >= 0].sum())
+    totals['poorly_aligned_count'] += len(alignment_results['issues'])
+    return totals
+
+
+def _add_alignment_stats(stats, totals, checker=None):
+    """Add alignment statistics computed from accumulated totals, and the tier counts of a tiered checker."""
+    checked_count = totals['checked_count']
+    stats['alignment_score'] = totals['score_sum'] / checked_count if checked_count > 0 else 0
+    stats['aligned_percentage'] = (totals['aligned_count'] / checked_count * 100) if checked_count > 0 else 0
+    stats['alignment_checked_count'] = checked_count
+    stats['poorly_aligned_count'] = totals['poorly_aligned_count']
+    # Pairs reused from a manifest were not checked by any tier in this run
+    if checker is not None and any(checker.tiers.values()):
+        stats['alignment_tiers'] = dict(checker.tiers)
+
+
+def _merge_stats(stats, part):
+    """Add the row and sentence counters of a partial result to the running stats."""
+    for key in ('total_rows', 'processed_rows', 'skipped_rows', 'total_sentences', 'mismatched_sentences',
+                'realigned_rows', 'dropped_sentences'):
+        stats[key] = stats.get(key, 0) + part[key]
+    if 'duplicate_rows' in part:
+        stats['duplicate_rows'] = stats.get('duplicate_rows', 0) + part['duplicate_rows']
+    return stats
+
+
+def _result_header(source_column, target_column, check_alignment, occurrences=False):
+    """The output column names."""
+    header = [source_column, target_column, 'original_row']
+    if occurrences:
+        header.append('occurrences')
+    if check_alignment:
+        header += ['alignment_score', 'alignment_issues']
+    return header
+
+
+def _build_result_data(pairs, alignment_results, source_column, target_column, start=0, stop=None,
+                       occurrences=None):
+    """
+    Build the output columns for a block of sentence pairs.
+    
+    Args:
+        pairs (SentencePairs): Sentence pairs from split_sentence_columns
+        alignment_results (dict): Batch alignment results, or None if not checked
+        source_column (str): Name of the source language column
+        target_column (str): Name of the target language column
+        start (int): First pair of the block
+        stop (int): End of the block (defaults to all pairs)
+        occurrences (np.ndarray): Occurrences of each input row, when duplicate rows were collapsed
+        
+    Returns:
+        dict: Output column name -> list of values
+    """
+    stop = len(pairs) if stop is None else stop
+    result_data = {
+        source_column: pairs.sources(start, stop),
+        target_column: pairs.targets(start, stop),
+        'original_row': pairs.original_rows(start, stop)  # Add reference to original row for traceability
+    }
+    if occurrences is not None:
+        result_data['occurrences'] = occurrences[pairs.rows[start:stop]].tolist()
     
-    # Simplified approach for better compatibility
-    # This pattern looks for sentence endings (., !, ?) followed by spaces or newlines
-    # while avoiding common abbreviations
-    sentence_pattern = r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s'
+    # Add alignment score column if available
+    if alignment_results:
+        # Scores are indexed by pair (-1 means not checked), issues only exist for poorly aligned pairs
+        issues = alignment_results['issues']
+        result_data['alignment_score'] = np.asarray(alignment_results['scores'], dtype=float)[start:stop].tolist()
+        result_data['alignment_issues'] = [issues.get(i, '') for i in range(start, stop)]
     
-    logging.debug(f"Using sentence pattern: {sentence_pattern}")
+    return result_data
+
+
+def _write_pairs(writer, pairs, alignment_results, source_column, target_column, check_alignment, timer,
+                 occurrences=None):
+    """Write sentence pairs block by block, so only one block of sentence strings exists at a time."""
+    for start, stop in pairs.blocks():
+        with timer.stage('build'):
+            result_data = _build_result_data(
+                pairs, alignment_results, source_column, target_column, start, stop, occurrences
+            )
+            if check_alignment and not alignment_results:
+                result_data['alignment_score'] = [-1] * (stop - start)
+                result_data['alignment_issues'] = [''] * (stop - start)
+        with timer.stage('write'):
+            writer.write_rows(zip(*result_data.values()))
+
+
+def iter_excel_rows(input_path, columns):
+    """
+    Lazily read some columns from the first sheet of an .xlsx workbook.
     
-    # No longer splitting long sentences as per user request
+    The workbook is opened in openpyxl read-only mode, so only the current row
+    is held in memory. Empty cells are returned as NaN, like pd.read_excel does,
+    and trailing blank rows are dropped.
     
-    # Iterate over each row and split the sentences
-    for index, row in df.iterrows():
-        try:
-            # Get the text from both columns, ensuring they're strings
-            source_text = str(row[source_column])
-            target_text = str(row[target_column])
-            
-            # Skip empty rows
-            if pd.isna(source_text) or pd.isna(target_text) or source_text.strip() == '' or target_text.strip() == '':
-                stats['skipped_rows'] += 1
-                logging.debug(f"Skipping empty row at index {index}")
+    Args:
+        input_path (str): Path to the input Excel file
+        columns (list): Names of the header columns to read
+        
+    Yields:
+        tuple: The values of the requested columns, one tuple per data row
+    """
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(input_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = ['' if value is None else str(value) for value in next(rows, ())]
+        _require_columns(header, *columns[:2])
+        positions = [header.index(column) for column in columns]
+        
+        blank_rows = 0
+        for row in rows:
+            if all(value is None for value in row):
+                blank_rows += 1
                 continue
+            # Blank rows inside the data are kept, only the trailing ones are dropped
+            for _ in range(blank_rows):
+                yield (np.nan,) * len(positions)
+            blank_rows = 0
             
-            # Debug the text we're trying to split
-            logging.debug(f"Source text length: {len(source_text)}")
-            logging.debug(f"Target text length: {len(target_text)}")
-            if len(source_text) < 100:  # Only log short texts to avoid log spam
-                logging.debug(f"Source text: {source_text}")
-                logging.debug(f"Target text: {target_text}")
-            
-            # Try two methods - first the regex approach
-            source_text_sentences = re.split(sentence_pattern, source_text)
-            target_text_sentences = re.split(sentence_pattern, target_text)
-            
-            # Debug
-            logging.debug(f"Sentences after regex split - source: {len(source_text_sentences)}, target: {len(target_text_sentences)}")
-            
-            # If regex didn't work well, try alternative splitting
-            if len(source_text_sentences) <= 1 and len(source_text) > 50:
-                logging.debug("Regex pattern didn't split sentences well, trying alternative splitting")
-                
-                # More elaborate sentence splitting - handles common abbreviations
-                # This regex looks for sentence boundaries while ignoring common abbreviations
-                alt_pattern = r'(?<!\bMr)(?<!\bMrs)(?<!\bDr)(?<!\bMs)(?<!\bProf)(?<!\bRev)(?<!\bSt)(?<!\bp)(?<!\bč)(?<!\bstr)(?<!\br)\.\s+[A-Z0-9]'
-                
-                # Find all matches and split based on positions
-                source_matches = list(re.finditer(alt_pattern, source_text))
-                target_matches = list(re.finditer(alt_pattern, target_text))
-                
-                # If we found sentence boundaries
-                if source_matches and target_matches:
-                    source_text_sentences = []
-                    prev_end = 0
-                    for match in source_matches:
-                        end_pos = match.start() + 1  # Include the period
-                        source_text_sentences.append(source_text[prev_end:end_pos].strip())
-                        prev_end = match.start() + 1
-                    # Add the last part
-                    if prev_end < len(source_text):
-                        source_text_sentences.append(source_text[prev_end:].strip())
-                        
-                    target_text_sentences = []
-                    prev_end = 0
-                    for match in target_matches:
-                        end_pos = match.start() + 1  # Include the period
-                        target_text_sentences.append(target_text[prev_end:end_pos].strip())
-                        prev_end = match.start() + 1
-                    # Add the last part
-                    if prev_end < len(target_text):
-                        target_text_sentences.append(target_text[prev_end:].strip())
-                else:
-                    # Fallback to simple splitting with period
-                    simple_splits = source_text.split('. ')
-                    source_text_sentences = [(s + ".").strip() for s in simple_splits if s.strip()]
-                    
-                    simple_splits = target_text.split('. ')
-                    target_text_sentences = [(s + ".").strip() for s in simple_splits if s.strip()]
-                
-                logging.debug(f"Sentences after alternative split - source: {len(source_text_sentences)}, target: {len(target_text_sentences)}")
-            
-            # Clean up the sentences (remove extra whitespace)
-            source_text_sentences = [s.strip() for s in source_text_sentences if s.strip()]
-            target_text_sentences = [s.strip() for s in target_text_sentences if s.strip()]
-            
-            logging.debug(f"Cleaned sentences - source: {len(source_text_sentences)}, target: {len(target_text_sentences)}")
-            
-            # No longer splitting long sentences
-            refined_source_sentences = source_text_sentences
-            refined_target_sentences = target_text_sentences
-            
-            # Check if sentence counts match
-            if len(refined_source_sentences) != len(refined_target_sentences):
-                logging.warning(f"Mismatch in sentence count at row {index}. Source: {len(refined_source_sentences)}, Target: {len(refined_target_sentences)}")
-                stats['mismatched_sentences'] += 1
-                
-                # Attempt to align sentences if possible 
-                # For simplicity, if counts don't match but are close, we take the smaller count
-                if abs(len(refined_source_sentences) - len(refined_target_sentences)) <= 2:
-                    min_count = min(len(refined_source_sentences), len(refined_target_sentences))
-                    refined_source_sentences = refined_source_sentences[:min_count]
-                    refined_target_sentences = refined_target_sentences[:min_count]
-                else:
-                    stats['skipped_rows'] += 1
-                    continue
-            
-            # Add sentences to the lists
-            for source_sent, target_sent in zip(refined_source_sentences, refined_target_sentences):
-                # Fix punctuation - don't add periods if already present
-                # Also remove any double periods that might have been created
-                if source_sent:
-                    if source_sent.endswith('..'):
-                        source_sent = source_sent[:-1]
-                    elif not any(source_sent.endswith(p) for p in ['.', '!', '?']):
-                        source_sent = source_sent + '.'
-                        
-                if target_sent:
-                    if target_sent.endswith('..'):
-                        target_sent = target_sent[:-1]
-                    elif not any(target_sent.endswith(p) for p in ['.', '!', '?']):
-                        target_sent = target_sent + '.'
-                    
-                source_sentences.append(source_sent)
-                target_sentences.append(target_sent)
-                row_references.append(index + 1)  # Excel rows are 1-indexed for users
-                stats['total_sentences'] += 1
-            
-            stats['processed_rows'] += 1
+            yield tuple(
+                row[p] if p < len(row) and row[p] is not None else np.nan
+                for p in positions
+            )
+    finally:
+        workbook.close()
+
+
+def read_excel_columns(input_path):
+    """
+    Read only the header row of every sheet of an Excel file.
+    
+    .xlsx/.xlsm workbooks are read in openpyxl read-only mode, which stops
+    after the first row of each sheet; other formats fall back to
+    pd.read_excel without data rows.
+    
+    Args:
+        input_path (str): Path to the Excel file
+        
+    Returns:
+        dict: Sheet name -> list of the non-empty column names, in sheet order
+    """
+    try:
+        if os.path.splitext(input_path)[1].lower() not in STREAMING_EXTENSIONS:
+            import pandas as pd
             
+            frames = pd.read_excel(input_path, sheet_name=None, nrows=0)
+            return {name: [str(column) for column in frame.columns] for name, frame in frames.items()}
+        
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(input_path, read_only=True, data_only=True)
+        try:
+            return {
+                sheet.title: [
+                    str(value)
+                    for value in next(sheet.iter_rows(max_row=1, values_only=True), ())
+                    if value is not None and str(value) != ''
+                ]
+                for sheet in workbook.worksheets
+            }
+        finally:
+            workbook.close()
+    except Exception as e:
+        logging.error(f"Error reading Excel header: {str(e)}")
+        raise Exception(f"Could not read Excel file: {str(e)}")
+
+
+def verify_excel_columns(input_path, source_column, target_column):
+    """
+    Check that the first sheet of an Excel file has the required columns, reading only its header.
+    
+    Raises:
+        Exception: If a column is missing or the file cannot be read
+    """
+    sheets = read_excel_columns(input_path)
+    columns = next(iter(sheets.values()), [])
+    _require_columns(columns, source_column, target_column)
+
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def _read_excel_frame(input_path, parsed_cache_path=None):
+    """
+    Read the first sheet of an Excel file into a DataFrame.
+    
+    With parsed_cache_path, the parsed frame is kept there as a pickle, with a
+    hash of the workbook, and later calls for the same upload load it instead of
+    parsing the workbook again as long as its content did not change.
+    """
+    import pandas as pd
+    
+    try:
+        digest = _file_digest(input_path) if parsed_cache_path else None
+    except OSError as e:
+        logging.error(f"Error reading Excel file: {str(e)}")
+        raise Exception(f"Could not read Excel file: {str(e)}")
+    if parsed_cache_path and os.path.exists(parsed_cache_path):
+        try:
+            cached_digest, df = pd.read_pickle(parsed_cache_path)
+            if cached_digest == digest:
+                logging.debug(f"Loaded parsed workbook from {parsed_cache_path}")
+                return df
+            logging.debug(f"Ignoring parsed workbook {parsed_cache_path} of an earlier version of the file")
         except Exception as e:
-            logging.error(f"Error processing row {index}: {str(e)}")
-            stats['skipped_rows'] += 1
+            logging.warning(f"Ignoring unreadable parsed workbook {parsed_cache_path}: {str(e)}")
     
-    # Check alignment of the sentence pairs
-    alignment_results = None
-    poorly_aligned_pairs = []
+    try:
+        df = pd.read_excel(input_path)
+    except Exception as e:
+        logging.error(f"Error reading Excel file: {str(e)}")
+        raise Exception(f"Could not read Excel file: {str(e)}")
     
-    if check_alignment and source_sentences and target_sentences:
-        # Get source language code from column name (assuming format like "en-US")
-        source_lang = source_column.split('-')[0].lower() if '-' in source_column else 'en'
-        target_lang = target_column.split('-')[0].lower() if '-' in target_column else 'cs'
-        
+    if parsed_cache_path:
         try:
-            # Run batch alignment check on the sentences
-            logging.info(f"Checking translation alignment for {len(source_sentences)} sentence pairs")
-            # Use a sample of sentences for efficiency (max 50)
-            sample_size = min(50, len(source_sentences))
-            
-            alignment_results = batch_check_translations(
-                source_sentences, 
-                target_sentences, 
-                sample_size=sample_size
-            )
-            
-            # Add alignment statistics
-            stats['alignment_score'] = alignment_results['overall_alignment_score']
-            stats['aligned_percentage'] = alignment_results['aligned_percentage']
-            stats['alignment_checked_count'] = alignment_results['checked_count']
-            
-            # Identify poorly aligned pairs
-            if 'details' in alignment_results:
-                for detail in alignment_results['details']:
-                    if not detail['is_aligned']:
-                        poorly_aligned_pairs.append({
-                            'index': detail['index'],
-                            'source': detail['source'],
-                            'target': detail['target'],
-                            'score': detail['alignment_score'],
-                            'explanation': detail['explanation']
-                        })
-                        
-            stats['poorly_aligned_count'] = len(poorly_aligned_pairs)
-            
+            temp_path = f"{parsed_cache_path}.{os.getpid()}.tmp"
+            pd.to_pickle((digest, df), temp_path)
+            os.replace(temp_path, parsed_cache_path)
+        except OSError as e:
+            logging.warning(f"Could not cache parsed workbook: {str(e)}")
+    return df
+
+
+def _iter_chunks(iterable, chunk_size):
+    """Yield lists of up to chunk_size consecutive items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _split_chunk(chunk, source_lang, target_lang, check_alignment=False):
+    """
+    Split one (source_texts, target_texts, row_numbers) chunk, and check its pairs
+    with the heuristic checker if requested; runs in worker processes.
+    """
+    source_texts, target_texts, row_numbers = chunk
+    pairs, stats = split_sentence_columns(
+        source_texts, target_texts, row_numbers=row_numbers, source_lang=source_lang, target_lang=target_lang
+    )
+    if not check_alignment:
+        return pairs, stats
+    
+    alignment_results = None
+    if len(pairs):
+        try:
+            alignment_results = _check_pairs(pairs, source_lang, target_lang)
         except Exception as e:
             logging.error(f"Error during alignment check: {str(e)}")
-            # Don't fail the whole process if alignment check fails
             stats['alignment_error_msg'] = str(e)
+    return pairs, stats, alignment_results
+
+
+def _record_worker_checks(result):
+    """Record the alignment checks a worker process ran in the metrics of this process."""
+    alignment_results = result[2] if len(result) > 2 else None
+    for seconds, checked_count in (alignment_results or {}).get('batches', ()):
+        ALIGNMENT_SECONDS.observe(seconds, checker=CHECKER_NAME)
+        ALIGNMENT_PAIRS.inc(checked_count, checker=CHECKER_NAME, source="checked")
+    return result
+
+
+def _resolve_workers(workers):
+    """Turn the workers setting into a process count (0 or None means one per CPU)."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def iter_split_chunks(chunks, workers=1, source_lang='en', target_lang='cs', check_alignment=False):
+    """
+    Split chunks of rows, in a process pool when more than one worker is requested.
     
-    # Create a new DataFrame with the split sentences
-    result_data = {
-        source_column: source_sentences, 
-        target_column: target_sentences,
-        'original_row': row_references  # Add reference to original row for traceability
-    }
+    Results are yielded in the order of the input chunks. At most two chunks
+    per worker are in flight, so a lazy input is never read far ahead.
     
-    # Add alignment score column if available
-    if alignment_results:
-        # For each sentence pair, calculate individual alignment score
-        alignment_scores = []
-        alignment_issues = []
+    Args:
+        chunks (iterable): (source_texts, target_texts, row_numbers) tuples
+        workers (int): Number of worker processes (0 or None means one per CPU)
+        source_lang (str): ISO code for source language (en, cs, etc)
+        target_lang (str): ISO code for target language
+        check_alignment (bool): Also check the pairs of every chunk with the heuristic
+                                checker, in the same worker that split it
         
-        for i in range(len(source_sentences)):
-            # Default values
-            score = -1  # -1 means not checked
-            issues = ""
-            
-            # Check if we have checked this pair
-            for detail in alignment_results.get('details', []):
-                if detail['index'] == i:
-                    score = detail['alignment_score']
-                    issues = detail['explanation'] if not detail['is_aligned'] else ''
-                    break
-                    
-            alignment_scores.append(score)
-            alignment_issues.append(issues)
+    Yields:
+        tuple: (pairs DataFrame, stats dict) for every chunk, as split_sentence_columns returns,
+               plus the alignment results of the chunk (None if it has no pairs) when checking
+               alignment; a failed check is reported in the 'alignment_error_msg' of the stats
+    """
+    workers = _resolve_workers(workers)
+    if workers == 1:
+        for chunk in chunks:
+            yield _split_chunk(chunk, source_lang, target_lang, check_alignment)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_split_chunk, chunk, source_lang, target_lang, check_alignment))
+            if len(pending) >= workers * 2:
+                yield _record_worker_checks(pending.popleft().result())
+        while pending:
+            yield _record_worker_checks(pending.popleft().result())
+
+
+def iter_split_records(records, source_lang='en', target_lang='cs', check_alignment=True, batch_size=100, stats=None):
+    """
+    Split a stream of bilingual records into aligned sentence pairs, batch by batch.
+    
+    Records are consumed lazily, batch_size at a time, with the same splitting
+    and alignment check as process_excel_file, so the first pairs are yielded
+    before the whole input has been read and memory stays bounded.
+    
+    Args:
+        records (iterable): Dicts with 'id', 'source' and 'target' keys
+        source_lang (str): ISO code for source language (en, cs, etc)
+        target_lang (str): ISO code for target language
+        check_alignment (bool): Whether to check the alignment of the sentence pairs
+        batch_size (int): Number of records split and checked together
+        stats (dict): If given, filled with the processing statistics once the stream is exhausted
         
-        result_data['alignment_score'] = alignment_scores
-        result_data['alignment_issues'] = alignment_issues
+    Yields:
+        dict: One sentence pair with 'id' (of its record), 'source' and 'target',
+              plus 'alignment_score' and 'alignment_issues' when checking alignment
+    """
+    if stats is None:
+        stats = {}
+    alignment_totals = None
     
-    # Create the result DataFrame 
-    new_df = pd.DataFrame(result_data)
+    for batch in _iter_chunks(records, batch_size):
+        pairs, batch_stats = split_sentence_columns(
+            [record.get('source') or '' for record in batch],
+            [record.get('target') or '' for record in batch],
+            row_numbers=np.array([record.get('id') for record in batch], dtype=object),
+            source_lang=source_lang,
+            target_lang=target_lang
+        )
+        _merge_stats(stats, batch_stats)
+        
+        result = {
+            'id': pairs.original_rows(),
+            'source': pairs.sources(),
+            'target': pairs.targets()
+        }
+        if check_alignment and len(pairs):
+            alignment_results = batch_check_translations(
+                result['source'],
+                result['target'],
+                sample_size=None,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                include_details=False
+            )
+            alignment_totals = _alignment_totals(alignment_results, alignment_totals)
+            issues = alignment_results['issues']
+            result['alignment_score'] = [float(score) for score in alignment_results['scores']]
+            result['alignment_issues'] = [issues.get(i, '') for i in range(len(pairs))]
+        
+        keys = list(result)
+        for values in zip(*result.values()):
+            yield dict(zip(keys, values))
     
-    # Save to a new excel file
+    if not stats:
+        stats.update(split_sentence_columns([], [])[1])
+    if alignment_totals:
+        _add_alignment_stats(stats, alignment_totals)
+
+
+def _open_output(output_path, output_format, header, source_column, target_column, shard_rows=None,
+                 shard_mode=None, output_name=None):
+    try:
+        return open_writer(
+            output_format,
+            output_path,
+            header,
+            source_lang=column_language_tag(source_column, 'en'),
+            target_lang=column_language_tag(target_column, 'cs'),
+            shard_rows=shard_rows,
+            name=output_name,
+            **({'shard_mode': shard_mode} if shard_mode else {})
+        )
+    except Exception as e:
+        logging.error(f"Error creating output file: {str(e)}")
+        raise Exception(f"Could not save output file: {str(e)}")
+
+
+def _close_output(writer, stats):
     try:
-        new_df.to_excel(output_path, index=False)
-        logging.info(f"Saved processed file to {output_path} with {stats['total_sentences']} sentence pairs")
+        writer.close()
+        logging.info(f"Saved processed file to {writer.path} with {stats['total_sentences']} sentence pairs")
     except Exception as e:
-        logging.error(f"Error saving Excel file: {str(e)}")
+        logging.error(f"Error saving output file: {str(e)}")
         raise Exception(f"Could not save output file: {str(e)}")
     
+    # Outputs too long for one sheet or file are split into shards
+    if isinstance(writer, ShardedWriter) and writer.shard_count > 1:
+        stats['output_shards'] = writer.shard_count
+        stats['output_shard_mode'] = writer.mode
+
+
+def _process_excel_file_streaming(input_path, output_path, source_column, target_column, check_alignment,
+                                  chunk_size, workers, output_format, shard_rows=None, shard_mode=None, timer=None,
+                                  previous=None, current=None, checker=None, output_name=None):
+    """
+    Constant-memory variant of process_excel_file.
+    
+    Rows are read lazily in chunks, split (in worker processes if requested),
+    checked and appended to a streaming output writer, so peak memory depends on
+    chunk_size and workers only. With the previous rows of a manifest, or when
+    duplicate rows are fanned out, chunks are processed in this process by
+    _split_incremental, which keeps the results of every distinct row.
+    """
+    timer = timer or StageTimer()
+    stats = {}
+    alignment_totals = None
+    
+    header = _result_header(source_column, target_column, check_alignment)
+    
+    # Validate the input before creating the output
+    with timer.stage('read'):
+        rows = iter_excel_rows(input_path, [source_column, target_column])
+        first_rows = list(itertools.islice(rows, 1))
+        rows = itertools.chain(first_rows, rows)
+    
+    with timer.stage('write'):
+        writer = _open_output(
+            output_path, output_format, header, source_column, target_column, shard_rows, shard_mode, output_name
+        )
+    
+    def row_chunks():
+        first_row = 1
+        chunks = _iter_chunks(rows, chunk_size)
+        while True:
+            with timer.stage('read'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            source_texts, target_texts = zip(*chunk)
+            yield source_texts, target_texts, np.arange(first_row, first_row + len(chunk))
+            first_row += len(chunk)
+    
+    source_lang = column_language(source_column, 'en')
+    target_lang = column_language(target_column, 'cs')
+    if previous is None:
+        # The heuristic check runs in the workers with the splitting; the tiered
+        # checker holds the LLM budget of the job, so its checks run here
+        check_in_workers = check_alignment and checker is None and _resolve_workers(workers) > 1
+        split_chunks = iter_split_chunks(row_chunks(), workers, source_lang, target_lang, check_in_workers)
+    else:
+        split_chunks = (
+            _split_incremental(*chunk, source_column, target_column, check_alignment, previous, current, timer, checker)
+            for chunk in row_chunks()
+        )
+    while True:
+        # Rows are read while waiting for the next split chunk; that time counts as reading
+        measured_before = timer.totals.get('read', 0.0) + timer.totals.get('split', 0.0) + timer.totals.get('align', 0.0)
+        started = time.perf_counter()
+        result = next(split_chunks, None)
+        measured = timer.totals.get('read', 0.0) + timer.totals.get('split', 0.0) + timer.totals.get('align', 0.0)
+        timer.add('split', time.perf_counter() - started - (measured - measured_before))
+        if result is None:
+            break
+        pairs, chunk_stats, *checked = result
+        _merge_stats(stats, chunk_stats)
+        _log_pairs(pairs)
+        
+        alignment_results = None
+        if checked:
+            # Already checked incrementally or by a worker
+            alignment_results = checked[0]
+            if 'alignment_error_msg' in chunk_stats:
+                stats['alignment_error_msg'] = chunk_stats['alignment_error_msg']
+        elif check_alignment and len(pairs):
+            try:
+                with timer.stage('align'):
+                    alignment_results = _run_alignment_check(pairs, source_column, target_column, checker)
+            except Exception as e:
+                logging.error(f"Error during alignment check: {str(e)}")
+                # Don't fail the whole process if alignment check fails
+                stats['alignment_error_msg'] = str(e)
+        if alignment_results:
+            alignment_totals = _alignment_totals(alignment_results, alignment_totals)
+        
+        _write_pairs(writer, pairs, alignment_results, source_column, target_column, check_alignment, timer)
+    
+    if not stats:
+        stats = split_sentence_columns([], [])[1]
+    if alignment_totals:
+        _add_alignment_stats(stats, alignment_totals, checker)
+    
+    # Finish the output file
+    with timer.stage('write'):
+        _close_output(writer, stats)
+    
+    return stats
+
+
+def process_excel_file(input_path, output_path, source_column='en-US', target_column='cs-CZ', check_alignment=True,
+                       streaming=False, chunk_size=None, workers=None, parsed_cache_path=None,
+                       output_format=DEFAULT_OUTPUT_FORMAT, shard_rows=None, shard_mode=None, manifest_path=None,
+                       deduplicate=None, alignment_checker=None, output_name=None):
+    """
+    Process an Excel file containing bilingual text data and split it into sentence pairs.
+    
+    Args:
+        input_path (str): Path to the input Excel file
+        output_path (str): Path where the output file will be saved
+        source_column (str): Name of the source language column
+        target_column (str): Name of the target language column
+        check_alignment (bool): Whether to check the alignment of the sentence pairs
+        streaming (bool): Read, split and write the workbook in chunks with constant memory (.xlsx only)
+        chunk_size (int): Number of rows per chunk (defaults to SPLITTER_CHUNK_SIZE)
+        workers (int): Number of processes splitting chunks in parallel, 0 for one per CPU
+                       (defaults to SPLITTER_WORKERS)
+        parsed_cache_path (str): Where to keep the parsed workbook, so that processing the
+                                 same upload again skips parsing it (not used in streaming mode)
+        output_format (str): Format of the output file (xlsx, csv, tsv, parquet or tmx, see writers.OUTPUT_FORMATS)
+        shard_rows (int): Start a new output sheet or file after this many sentence pairs
+                          (defaults to OUTPUT_SHARD_ROWS; xlsx is always sharded at the Excel row limit)
+        shard_mode (str): 'sheets' to shard into sheets of one workbook (xlsx only) or 'files' to
+                          write a zip archive of shard files (defaults to OUTPUT_SHARD_MODE)
+        manifest_path (str): Incremental mode: reuse the results of the rows listed in this
+                             manifest by an earlier run, split and check only the added or
+                             changed rows, and save the manifest of this run there
+        deduplicate (str): Split and check rows with the same source and target text once:
+                           'fanout' writes the pairs for every copy, like a normal run, and
+                           'collapse' writes them once, at the first copy, with an 'occurrences'
+                           column (read in memory; the row counters count distinct rows)
+        alignment_checker (str): 'heuristic' or 'tiered', which also checks the pairs with an
+                                 uncertain heuristic score with the LLM, up to ALIGNMENT_LLM_BUDGET
+                                 pairs per file (defaults to ALIGNMENT_CHECKER); the number of
+                                 pairs decided by each tier is reported in 'alignment_tiers'
+        output_name (str): File name the shards of a sharded output are named after
+                           (defaults to the name of output_path, which may be a temporary name)
+        
+    Returns:
+        dict: Statistics about the processing
+    """
+    if deduplicate is not None and deduplicate not in DEDUPLICATE_MODES:
+        raise Exception(f"Unknown deduplication mode: {deduplicate}")
+    checker = _alignment_checker(alignment_checker or DEFAULT_ALIGNMENT_CHECKER)
+    
+    logging.debug(f"Processing file: {input_path}")
+    logging.debug(f"Using columns: {source_column} and {target_column}")
+    
+    started = time.perf_counter()
+    timer = StageTimer()
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    workers = DEFAULT_WORKERS if workers is None else workers
+    
+    previous = current = None
+    if manifest_path:
+        manifest_settings = _manifest_settings(source_column, target_column, check_alignment, checker)
+        previous = load_manifest(manifest_path, manifest_settings)
+        current = {}
+    elif deduplicate == 'fanout':
+        # Repeated rows reuse the results of their first copy, as rows of a manifest would
+        previous, current = {}, {}
+    
+    if streaming and deduplicate == 'collapse':
+        logging.info("Collapsing duplicate rows needs the whole file, reading it at once")
+        streaming = False
+    
+    if streaming:
+        if os.path.splitext(input_path)[1].lower() in STREAMING_EXTENSIONS:
+            from openpyxl.utils.exceptions import InvalidFileException
+            
+            try:
+                stats = _process_excel_file_streaming(
+                    input_path, output_path, source_column, target_column, check_alignment, chunk_size, workers,
+                    output_format, shard_rows, shard_mode, timer, previous, current, checker, output_name
+                )
+            except (InvalidFileException, BadZipFile) as e:
+                logging.error(f"Error reading Excel file: {str(e)}")
+                raise Exception(f"Could not read Excel file: {str(e)}")
+            if manifest_path:
+                _save_row_manifest(manifest_path, manifest_settings, current, stats)
+            if not deduplicate:
+                stats.pop('duplicate_rows', None)
+            _record_file_metrics(stats, timer, started, 'streaming', output_format)
+            return stats
+        logging.info(f"Streaming is not supported for {input_path}, reading the whole file")
+    
+    # Read the excel file
+    with timer.stage('read'):
+        df = _read_excel_frame(input_path, parsed_cache_path)
+    
+    # Verify that the required columns exist
+    _require_columns(df.columns, source_column, target_column)
+    
+    occurrences = None
+    if deduplicate == 'collapse':
+        df, occurrences = _collapse_duplicates(df, source_column, target_column)
+    
+    # Split every row at once, column by column
+    source_lang = column_language(source_column, 'en')
+    target_lang = column_language(target_column, 'cs')
+    split_started = time.perf_counter()
+    alignment_results = None
+    # The pairs of a manifest run or of a process pool are checked while splitting
+    checked = previous is not None
+    if previous is not None:
+        pairs, stats, alignment_results = _split_incremental(
+            df[source_column], df[target_column], df.index + 1, source_column, target_column, check_alignment,
+            previous, current, timer, checker
+        )
+        if alignment_results:
+            _add_alignment_stats(stats, _alignment_totals(alignment_results), checker)
+    elif _resolve_workers(workers) == 1 or len(df) <= chunk_size:
+        pairs, stats = split_sentence_columns(
+            df[source_column],
+            df[target_column],
+            row_numbers=df.index + 1,  # Excel rows are 1-indexed for users
+            source_lang=source_lang,
+            target_lang=target_lang
+        )
+    else:
+        source_texts = df[source_column].tolist()
+        target_texts = df[target_column].tolist()
+        row_numbers = np.asarray(df.index + 1)
+        chunks = (
+            (source_texts[i:i + chunk_size], target_texts[i:i + chunk_size], row_numbers[i:i + chunk_size])
+            for i in range(0, len(df), chunk_size)
+        )
+        
+        # The heuristic check runs in the workers with the splitting (and is timed
+        # with it); the tiered checker holds the LLM budget of the job, so it runs here
+        checked = check_alignment and checker is None
+        
+        # Merge the partial results in original row order
+        stats = {}
+        partial_pairs = []
+        partial_results = []
+        error = None
+        for chunk_pairs, chunk_stats, *chunk_results in iter_split_chunks(
+                chunks, workers, source_lang, target_lang, checked):
+            partial_pairs.append(chunk_pairs)
+            partial_results.extend(chunk_results)
+            _merge_stats(stats, chunk_stats)
+            error = error or chunk_stats.get('alignment_error_msg')
+        pairs = SentencePairs.concat(partial_pairs)
+        
+        if error is not None:
+            stats['alignment_error_msg'] = error
+        elif checked and len(pairs):
+            alignment_results = _concat_alignment_results(partial_pairs, partial_results)
+            _add_alignment_stats(stats, _alignment_totals(alignment_results), checker)
+    if previous is None:
+        timer.add('split', time.perf_counter() - split_started)
+    _log_pairs(pairs)
+    
+    # Check alignment of the sentence pairs
+    if check_alignment and len(pairs) and not checked:
+        try:
+            with timer.stage('align'):
+                alignment_results = _run_alignment_check(pairs, source_column, target_column, checker)
+            _add_alignment_stats(stats, _alignment_totals(alignment_results), checker)
+            
+        except Exception as e:
+            logging.error(f"Error during alignment check: {str(e)}")
+            # Don't fail the whole process if alignment check fails
+            stats['alignment_error_msg'] = str(e)
+    
+    if occurrences is not None:
+        stats['duplicate_rows'] = int(occurrences.sum()) - len(occurrences)
+    elif not deduplicate:
+        stats.pop('duplicate_rows', None)
+    
+    # Write the result columns row by row; like in streaming mode, the alignment columns
+    # depend on the request only, and pairs the check did not score get -1
+    header = _result_header(source_column, target_column, check_alignment, occurrences is not None)
+    with timer.stage('write'):
+        writer = _open_output(
+            output_path, output_format, header, source_column, target_column, shard_rows, shard_mode, output_name
+        )
+    _write_pairs(writer, pairs, alignment_results, source_column, target_column, check_alignment, timer, occurrences)
+    with timer.stage('write'):
+        _close_output(writer, stats)
+    
+    if manifest_path:
+        _save_row_manifest(manifest_path, manifest_settings, current, stats)
+    _record_file_metrics(stats, timer, started, 'in_memory', output_format)
     return stats
+
+
+def warm_up(languages=('en', 'cs')):
+    """
+    Load everything the first file would otherwise load.
+    
+    Imports pandas and openpyxl and runs a sample row through the segmenter
+    of each language, the length-based realignment and the heuristic scorer,
+    so their lazy imports, regex caches and first-call costs are paid before
+    serving. Meant for the gunicorn master or workers (see gunicorn.conf.py).
+    
+    Args:
+        languages (iterable): Languages whose segmenters are exercised
+    """
+    started = time.perf_counter()
+    import pandas  # noqa: F401
+    import openpyxl  # noqa: F401
+    from openpyxl.utils.exceptions import InvalidFileException  # noqa: F401
+    from translation_check_simple import score_translation_pairs
+    
+    # The target has one sentence more than the source, so the row is realigned too
+    source = "Mr. Smith arrived on Jan. 5. He sat down."
+    target = "Pan Smith přišel 5. ledna. Posadil se. Pak odešel."
+    for language in languages:
+        pairs, _ = split_sentence_columns([source], [target], source_lang=language, target_lang=language)
+        score_translation_pairs(pairs.sources(), pairs.targets(), language, language)
+    logging.info(f"Warmed up in {time.perf_counter() - started:.2f}s")
@@ -1,6 +1,49 @@
 import re
 import random
 import logging
+import numpy as np
+from alignment_cache import make_key, resolve_cache
+from metrics import ALIGNMENT_SECONDS, ALIGNMENT_PAIRS
+
+# Identify this checker in the alignment cache; bump the version when the scoring changes
+CHECKER_NAME = "heuristic"
+CHECKER_VERSION = 1
+
+# Weights of the individual heuristics in the total score
+WEIGHTS = {
+    'ratio_score': 0.15,
+    'punct_score': 0.10, 
+    'comma_score': 0.10,
+    'numbers_score': 0.30,  # Strong signal
+    'capitals_score': 0.25,
+    'word_ratio_score': 0.10
+}
+
+# Patterns shared by the single-pair and the batch checks
+END_PUNCT_PATTERN = r'[.!?]$'
+NUMBER_PATTERN = r'\d+'
+CAPITAL_CHARS = 'A-Z'
+SOURCE_LOWER_CHARS = 'a-z'
+TARGET_LOWER_CHARS = 'a-zščřžýáíéěóúůďťňŠČŘŽÝÁÍÉĚÓÚŮĎŤŇ'
+SOURCE_CAPITAL_PATTERN = rf'\b[{CAPITAL_CHARS}][{SOURCE_LOWER_CHARS}]+\b'
+TARGET_CAPITAL_PATTERN = rf'\b[{CAPITAL_CHARS}][{TARGET_LOWER_CHARS}]+\b'
+WORD_PATTERN = r'\b\w+\b'
+
+def ideal_length_ratio(source_lang, target_lang):
+    """
+    Typical target/source length ratio range for a language pair.
+    
+    English and Czech typically have around 1:1.1 to 1:1.3 ratio
+    (Czech tends to be 10-30% longer than English)
+    
+    Returns:
+        tuple: (minimum, maximum) ratio
+    """
+    # Typical en-cs length ratio range (may vary by language pair)
+    if source_lang == "en" and target_lang == "cs":
+        return 0.9, 1.5
+    # Generic case for unknown language pairs
+    return 0.6, 1.6
 
 def simple_check_translation_alignment(source_text, target_text, source_lang="en", target_lang="cs"):
     """
@@ -24,14 +67,7 @@ def simple_check_translation_alignment(source_text, target_text, source_lang="en
     
     length_ratio = target_length / source_length if source_length > 0 else 0
     
-    # Typical en-cs length ratio range (may vary by language pair)
-    if source_lang == "en" and target_lang == "cs":
-        ideal_ratio_min = 0.9
-        ideal_ratio_max = 1.5
-    else:
-        # Generic case for unknown language pairs
-        ideal_ratio_min = 0.6
-        ideal_ratio_max = 1.6
+    ideal_ratio_min, ideal_ratio_max = ideal_length_ratio(source_lang, target_lang)
         
     ratio_score = 0.0
     if length_ratio >= ideal_ratio_min and length_ratio <= ideal_ratio_max:
@@ -43,8 +79,8 @@ def simple_check_translation_alignment(source_text, target_text, source_lang="en
         ratio_score = 1.0 - ratio_distance
     
     # 2. Check sentence structure - do both end with similar punctuation?
-    source_end_punct = re.search(r'[.!?]$', source_text)
-    target_end_punct = re.search(r'[.!?]$', target_text)
+    source_end_punct = re.search(END_PUNCT_PATTERN, source_text)
+    target_end_punct = re.search(END_PUNCT_PATTERN, target_text)
     
     punct_score = 1.0 if bool(source_end_punct) == bool(target_end_punct) else 0.5
     
@@ -56,8 +92,8 @@ def simple_check_translation_alignment(source_text, target_text, source_lang="en
     comma_score = 1.0 if comma_diff == 0 else (0.8 if comma_diff == 1 else 0.6)
     
     # 4. Numbers check - translations should have the same numbers
-    source_numbers = re.findall(r'\d+', source_text)
-    target_numbers = re.findall(r'\d+', target_text)
+    source_numbers = re.findall(NUMBER_PATTERN, source_text)
+    target_numbers = re.findall(NUMBER_PATTERN, target_text)
     
     numbers_score = 1.0
     if source_numbers or target_numbers:
@@ -65,16 +101,16 @@ def simple_check_translation_alignment(source_text, target_text, source_lang="en
             numbers_score = 0.0  # Mismatch in numbers is a strong signal of misalignment
     
     # 5. Named entities (simplified - check for capitalized words)
-    source_capitals = re.findall(r'\b[A-Z][a-z]+\b', source_text)
-    target_capitals = re.findall(r'\b[A-Z][a-zščřžýáíéěóúůďťňŠČŘŽÝÁÍÉĚÓÚŮĎŤŇ]+\b', target_text)
+    source_capitals = re.findall(SOURCE_CAPITAL_PATTERN, source_text)
+    target_capitals = re.findall(TARGET_CAPITAL_PATTERN, target_text)
     
     # Similar number of capitalized words is a good sign
     capitals_diff = abs(len(source_capitals) - len(target_capitals))
     capitals_score = 1.0 if capitals_diff <= 1 else (0.7 if capitals_diff <= 2 else 0.4)
     
     # 6. Check for extreme differences in the number of words
-    source_words = len(re.findall(r'\b\w+\b', source_text))
-    target_words = len(re.findall(r'\b\w+\b', target_text))
+    source_words = len(re.findall(WORD_PATTERN, source_text))
+    target_words = len(re.findall(WORD_PATTERN, target_text))
     
     word_ratio = target_words / source_words if source_words > 0 else 0
     word_ratio_score = 1.0
@@ -84,14 +120,7 @@ def simple_check_translation_alignment(source_text, target_text, source_lang="en
         word_ratio_score = 0.2
     
     # Calculate weighted total score
-    weights = {
-        'ratio_score': 0.15,
-        'punct_score': 0.10, 
-        'comma_score': 0.10,
-        'numbers_score': 0.30,  # Strong signal
-        'capitals_score': 0.25,
-        'word_ratio_score': 0.10
-    }
+    weights = WEIGHTS
     
     total_score = (
         weights['ratio_score'] * ratio_score +
@@ -129,63 +158,342 @@ def simple_check_translation_alignment(source_text, target_text, source_lang="en
         "is_aligned": total_score >= 0.7  # Consider 0.7+ as reasonably aligned
     }
 
-def batch_check_translations(source_sentences, target_sentences, sample_size=5):
+# Number of pairs scored together by score_translation_pairs (bounds its memory use)
+SCORING_BLOCK_SIZE = 100000
+
+# Ends every sentence of a column that is scanned as one array of code points
+SEPARATOR = '\x00'
+
+# Character class bits, matching the regex classes used by the single-pair check
+_WORD = 1
+_DIGIT = 2
+_CAPITAL = 4
+_SOURCE_LOWER = 8
+_TARGET_LOWER = 16
+_CLASS_PATTERNS = [
+    (_WORD, r'\w'),
+    (_DIGIT, r'\d'),
+    (_CAPITAL, f'[{CAPITAL_CHARS}]'),
+    (_SOURCE_LOWER, f'[{SOURCE_LOWER_CHARS}]'),
+    (_TARGET_LOWER, f'[{TARGET_LOWER_CHARS}]'),
+]
+_END_PUNCT_CODES = [ord('.'), ord('!'), ord('?')]
+_NUMBER_REGEX = re.compile(NUMBER_PATTERN)
+_COMMA_CODES = [ord(','), ord(';')]
+
+# Explanation parts in flag-bit order; the ratio parts are filled in per pair
+EXPLANATION_PARTS = [
+    "Unusual length ratio ({0:.2f})",
+    "Ending punctuation mismatch",
+    "Different sentence structure (commas)",
+    "Numbers don't match",
+    "Capitalized words don't match",
+    "Suspicious word count ratio ({1:.2f})"
+]
+
+def _explanation_template(flags):
+    """Explanation text for a combination of flag bits."""
+    parts = [part for bit, part in enumerate(EXPLANATION_PARTS) if flags & (1 << bit)]
+    return "; ".join(parts) if parts else "Sentences appear well-aligned"
+
+EXPLANATION_TEMPLATES = np.array([_explanation_template(flags) for flags in range(1 << len(EXPLANATION_PARTS))], dtype=object)
+
+_bmp_classes = None
+
+def _char_classes(chars):
+    """Class bits of every character in a string."""
+    classes = np.zeros(len(chars), dtype=np.uint8)
+    for bit, pattern in _CLASS_PATTERNS:
+        matches = [m.start() for m in re.finditer(pattern, chars)]
+        classes[matches] |= bit
+    return classes
+
+def _classify(code_points):
+    """Class bits of every code point, from a lookup table built on first use."""
+    global _bmp_classes
+    if _bmp_classes is None:
+        _bmp_classes = _char_classes(''.join(map(chr, range(0x10000))))
+    
+    astral = code_points > 0xFFFF
+    if not astral.any():
+        return _bmp_classes[code_points]
+    
+    # Characters outside the Basic Multilingual Plane are rare, classify them one by one
+    classes = _bmp_classes[np.where(astral, 0, code_points)]
+    unique = np.unique(code_points[astral])
+    unique_classes = _char_classes(''.join(map(chr, unique.tolist())))
+    classes[astral] = unique_classes[np.searchsorted(unique, code_points[astral])]
+    return classes
+
+def _column_features(sentences, lower_class):
+    """
+    Compute the per-sentence counts used by the heuristics for a whole column.
+    
+    The column is joined into one string and converted to an array of code
+    points, so every feature is a few NumPy passes over that array.
+    
+    Args:
+        sentences (list): The sentences of the column
+        lower_class (int): Class bit of the letters allowed after a capital
+        
+    Returns:
+        dict: NumPy arrays with one value per sentence
+    """
+    count = len(sentences)
+    joined = SEPARATOR.join(sentences) + SEPARATOR
+    if joined.count(SEPARATOR) != count:
+        # The separator itself counts as a plain non-word character
+        joined = SEPARATOR.join(s.replace(SEPARATOR, ' ') for s in sentences) + SEPARATOR
+    
+    code_points = np.frombuffer(joined.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+    classes = _classify(code_points)
+    is_separator = code_points == 0
+    separators = np.flatnonzero(is_separator)
+    lengths = np.diff(np.concatenate(([-1], separators))) - 1
+    
+    def sentence_ids(positions):
+        """Index of the sentence each character position belongs to."""
+        return np.searchsorted(separators, positions)
+    
+    # Words are maximal runs of word characters
+    is_word = (classes & _WORD) > 0
+    word_starts = np.flatnonzero(is_word & ~np.concatenate(([False], is_word[:-1])))
+    word_ends = np.flatnonzero(is_word & ~np.concatenate((is_word[1:], [False])))
+    
+    # A capitalized word is a capital followed only by allowed letters (at least one)
+    not_lower = np.cumsum(is_word & ((classes & lower_class) == 0), dtype=np.int32)
+    capitalized = (
+        ((classes[word_starts] & _CAPITAL) > 0)
+        & (word_ends > word_starts)
+        & (not_lower[word_ends] == not_lower[word_starts])
+    )
+    
+    # Ending punctuation, also before one final newline (like '$' in a regex)
+    last = np.maximum(separators - 1, 0)
+    before_last = np.maximum(separators - 2, 0)
+    end_punct = (lengths > 0) & np.isin(code_points[last], _END_PUNCT_CODES)
+    end_punct |= (lengths > 1) & (code_points[last] == ord('\n')) & np.isin(code_points[before_last], _END_PUNCT_CODES)
+    
+    return {
+        'length': lengths,
+        'end_punct': end_punct,
+        'commas': np.bincount(sentence_ids(np.flatnonzero(np.isin(code_points, _COMMA_CODES))), minlength=count),
+        'digits': np.bincount(sentence_ids(np.flatnonzero(classes & _DIGIT)), minlength=count),
+        'capitals': np.bincount(sentence_ids(word_starts[capitalized]), minlength=count),
+        'words': np.bincount(sentence_ids(word_starts), minlength=count),
+    }
+
+def score_translation_pairs(source_sentences, target_sentences, source_lang="en", target_lang="cs"):
+    """
+    Score many sentence pairs at once with the same heuristics as
+    simple_check_translation_alignment.
+    
+    The features are computed for whole columns with NumPy, in blocks of
+    SCORING_BLOCK_SIZE pairs. The results are identical to calling the
+    single-pair function on each pair.
+    
+    Args:
+        source_sentences (list): List of source language sentences
+        target_sentences (list): List of target language sentences
+        source_lang (str): ISO code for source language (en, cs, etc)
+        target_lang (str): ISO code for target language
+        
+    Returns:
+        pd.DataFrame: One row per pair with alignment_score, confidence, explanation and is_aligned
+    """
+    # Imported on first use, so that importing the checker stays cheap
+    import pandas as pd
+    
+    source_sentences = list(source_sentences)
+    target_sentences = list(target_sentences)
+    if len(source_sentences) > SCORING_BLOCK_SIZE:
+        return pd.concat([
+            score_translation_pairs(
+                source_sentences[i:i + SCORING_BLOCK_SIZE], target_sentences[i:i + SCORING_BLOCK_SIZE],
+                source_lang, target_lang
+            )
+            for i in range(0, len(source_sentences), SCORING_BLOCK_SIZE)
+        ], ignore_index=True)
+    
+    count = len(source_sentences)
+    source = _column_features(source_sentences, _SOURCE_LOWER)
+    target = _column_features(target_sentences, _TARGET_LOWER)
+    
+    # 1. Check length ratios
+    source_length = source['length'].astype(float)
+    target_length = target['length'].astype(float)
+    length_ratio = np.divide(target_length, source_length, out=np.zeros(count), where=source_length > 0)
+    
+    ideal_ratio_min, ideal_ratio_max = ideal_length_ratio(source_lang, target_lang)
+    ratio_distance = np.minimum(
+        np.abs(length_ratio - ideal_ratio_min) / (ideal_ratio_max - ideal_ratio_min),
+        np.abs(length_ratio - ideal_ratio_max) / (ideal_ratio_max - ideal_ratio_min)
+    )
+    in_range = (length_ratio >= ideal_ratio_min) & (length_ratio <= ideal_ratio_max)
+    ratio_score = np.where(in_range, 1.0 - ratio_distance, 0.0)
+    
+    # 2. Check sentence structure - do both end with similar punctuation?
+    punct_score = np.where(source['end_punct'] == target['end_punct'], 1.0, 0.5)
+    
+    # 3. Similar number of sentence components (commas+semicolons)
+    comma_diff = np.abs(source['commas'] - target['commas'])
+    comma_score = np.select([comma_diff == 0, comma_diff == 1], [1.0, 0.8], 0.6)
+    
+    # 4. Numbers check - translations should have the same numbers
+    # Pairs where only one side has digits never match; only pairs where
+    # both sides have digits need their numbers compared
+    numbers_match = (source['digits'] > 0) == (target['digits'] > 0)
+    both = np.flatnonzero((source['digits'] > 0) & (target['digits'] > 0))
+    numbers_match[both] = [
+        _NUMBER_REGEX.findall(source_sentences[i]) == _NUMBER_REGEX.findall(target_sentences[i])
+        for i in both.tolist()
+    ]
+    numbers_score = np.where(numbers_match, 1.0, 0.0)
+    
+    # 5. Named entities (simplified - count capitalized words)
+    capitals_diff = np.abs(source['capitals'] - target['capitals'])
+    capitals_score = np.select([capitals_diff <= 1, capitals_diff <= 2], [1.0, 0.7], 0.4)
+    
+    # 6. Check for extreme differences in the number of words
+    source_words = source['words'].astype(float)
+    target_words = target['words'].astype(float)
+    word_ratio = np.divide(target_words, source_words, out=np.zeros(count), where=source_words > 0)
+    word_ratio_score = np.where((word_ratio < 0.5) | (word_ratio > 2.0), 0.2, 1.0)
+    
+    # Calculate weighted total score
+    weights = WEIGHTS
+    
+    total_score = (
+        weights['ratio_score'] * ratio_score +
+        weights['punct_score'] * punct_score +
+        weights['comma_score'] * comma_score +
+        weights['numbers_score'] * numbers_score +
+        weights['capitals_score'] * capitals_score +
+        weights['word_ratio_score'] * word_ratio_score
+    )
+    
+    # Generate explanations from the combination of flags, formatting ratios only where reported
+    flags = (
+        (ratio_score < 0.7) * 1 +
+        (punct_score < 1.0) * 2 +
+        (comma_score < 0.8) * 4 +
+        (numbers_score < 1.0) * 8 +
+        (capitals_score < 0.7) * 16 +
+        (word_ratio_score < 0.5) * 32
+    )
+    explanation = EXPLANATION_TEMPLATES[flags]
+    with_ratios = (flags & (1 | 32)) > 0
+    explanation[with_ratios] = [
+        template.format(ratio, words)
+        for template, ratio, words in zip(
+            explanation[with_ratios], length_ratio[with_ratios].tolist(), word_ratio[with_ratios].tolist()
+        )
+    ]
+    
+    return pd.DataFrame({
+        "alignment_score": total_score,
+        "confidence": 0.6,  # Simple heuristics have limited confidence
+        "explanation": explanation,
+        "is_aligned": total_score >= 0.7  # Consider 0.7+ as reasonably aligned
+    })
+
+def _score_with_cache(sources, targets, source_lang, target_lang, cache):
+    """score_translation_pairs, reusing the verdicts found in the cache and storing the new ones."""
+    import pandas as pd
+    
+    keys = [
+        make_key(source, target, source_lang, target_lang, CHECKER_NAME, CHECKER_VERSION)
+        for source, target in zip(sources, targets)
+    ]
+    cached = cache.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    
+    fresh = score_translation_pairs(
+        [sources[i] for i in missing], [targets[i] for i in missing], source_lang, target_lang
+    ).to_dict("records")
+    cache.put_many({keys[i]: result for i, result in zip(missing, fresh)})
+    
+    records = [cached.get(key) for key in keys]
+    for i, result in zip(missing, fresh):
+        records[i] = result
+    return pd.DataFrame(records, columns=["alignment_score", "confidence", "explanation", "is_aligned"])
+
+def batch_check_translations(source_sentences, target_sentences, sample_size=5, source_lang="en", target_lang="cs",
+                             include_details=True, cache=None):
     """
     Check a random sample of sentence pairs to evaluate overall alignment quality.
     
     Args:
         source_sentences (list): List of source language sentences
         target_sentences (list): List of target language sentences
-        sample_size (int): Number of random pairs to check
+        sample_size (int): Number of random pairs to check, or None to check every pair
+        source_lang (str): ISO code for source language (en, cs, etc)
+        target_lang (str): ISO code for target language
+        include_details (bool): Also return a list with one result dict per checked pair
+        cache: An AlignmentCache to reuse verdicts from, True for the default cache, or None
         
     Returns:
-        dict: Overall alignment statistics
+        dict: Overall alignment statistics, plus per-pair results addressable by pair index:
+              'scores' (array with the score of every pair, -1 if not checked) and
+              'issues' (dict of pair index -> explanation for the poorly aligned pairs)
     """
-    # Ensure we don't try to sample more than we have
-    actual_sample_size = min(sample_size, len(source_sentences), len(target_sentences))
+    import pandas as pd
     
-    # If we have fewer than 10 sentences, check all of them
-    if len(source_sentences) <= 10:
+    # If we have fewer than 10 sentences (or no sample size), check all of them
+    if sample_size is None or len(source_sentences) <= 10:
         indices = list(range(len(source_sentences)))
     else:
+        # Ensure we don't try to sample more than we have
+        actual_sample_size = min(sample_size, len(source_sentences), len(target_sentences))
         # Sample random indices without replacement
         indices = random.sample(range(len(source_sentences)), actual_sample_size)
     
-    results = []
-    total_score = 0
-    aligned_count = 0
+    sources = pd.Series([source_sentences[idx] for idx in indices], dtype=object)
+    targets = pd.Series([target_sentences[idx] for idx in indices], dtype=object)
     
-    for idx in indices:
-        source = source_sentences[idx]
-        target = target_sentences[idx]
-        
-        # Skip very short sentences which might be headers or similar
-        if len(source.split()) < 3 or len(target.split()) < 3:
-            continue
-            
-        result = simple_check_translation_alignment(source, target)
-        result["source"] = source
-        result["target"] = target
-        result["index"] = idx
-        
-        results.append(result)
-        total_score += result["alignment_score"]
-        
-        if result["is_aligned"]:
-            aligned_count += 1
+    # Skip very short sentences which might be headers or similar
+    long_enough = (sources.str.split().str.len() >= 3) & (targets.str.split().str.len() >= 3)
+    long_enough = long_enough.to_numpy(dtype=bool)
+    checked_indices = np.asarray(indices, dtype=int)[long_enough]
+    
+    cache = resolve_cache(cache)
+    with ALIGNMENT_SECONDS.time(checker=CHECKER_NAME):
+        if cache is not None:
+            results = _score_with_cache(
+                sources[long_enough].tolist(), targets[long_enough].tolist(), source_lang, target_lang, cache
+            )
+        else:
+            results = score_translation_pairs(sources[long_enough], targets[long_enough], source_lang, target_lang)
+    ALIGNMENT_PAIRS.inc(len(results), checker=CHECKER_NAME, source="checked")
     
     # Calculate overall stats
     checked_count = len(results)
+    total_score = float(results["alignment_score"].sum())
+    aligned_count = int(results["is_aligned"].sum())
     avg_score = total_score / checked_count if checked_count > 0 else 0
     aligned_pct = (aligned_count / checked_count * 100) if checked_count > 0 else 0
     
-    return {
+    scores = np.full(len(source_sentences), -1.0)  # -1 means not checked
+    scores[checked_indices] = results["alignment_score"].to_numpy()
+    poorly_aligned = ~results["is_aligned"].to_numpy(dtype=bool)
+    issues = dict(zip(checked_indices[poorly_aligned].tolist(), results["explanation"].to_numpy()[poorly_aligned].tolist()))
+    
+    batch_results = {
         "overall_alignment_score": avg_score,
         "aligned_percentage": aligned_pct,
         "checked_count": checked_count,
         "aligned_count": aligned_count,
-        "details": results
+        "scores": scores,
+        "issues": issues
     }
+    
+    if include_details:
+        results["source"] = sources[long_enough].to_numpy()
+        results["target"] = targets[long_enough].to_numpy()
+        results["index"] = checked_indices
+        batch_results["details"] = results.to_dict("records")
+    
+    return batch_results
 
 # Simple test function
 def test_alignment_check():
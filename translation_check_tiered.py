@@ -0,0 +1,161 @@
+import os
+import logging
+import numpy as np
+import translation_check
+import translation_check_simple
+
+# Identify this checker in row manifests; bump the version when the tiering changes
+CHECKER_NAME = "tiered"
+CHECKER_VERSION = 1
+
+# Heuristic scores in [ALIGNMENT_UNCERTAIN_LOW, ALIGNMENT_UNCERTAIN_HIGH) are too close
+# to the heuristic threshold to be trusted, and those pairs are checked by the LLM
+UNCERTAIN_LOW = float(os.environ.get("ALIGNMENT_UNCERTAIN_LOW", 0.5))
+UNCERTAIN_HIGH = float(os.environ.get("ALIGNMENT_UNCERTAIN_HIGH", 0.85))
+
+# Maximum number of pairs one job may send to the LLM; the rest keep their heuristic verdict
+LLM_BUDGET = int(os.environ.get("ALIGNMENT_LLM_BUDGET", 200))
+
+# Score from which the heuristic checker considers a pair aligned
+HEURISTIC_THRESHOLD = 0.7
+
+# The heuristic checker takes ISO codes, the LLM checker language names
+LANGUAGE_NAMES = {
+    'cs': 'Czech', 'de': 'German', 'en': 'English', 'es': 'Spanish', 'fr': 'French',
+    'it': 'Italian', 'pl': 'Polish', 'sk': 'Slovak'
+}
+
+
+def language_name(code):
+    """The English name of a language code, or the code itself if it is unknown."""
+    return LANGUAGE_NAMES.get(code, code)
+
+
+def settings():
+    """The configuration that changes the verdicts of a TieredChecker, e.g. for cache keys."""
+    return {'uncertain_low': UNCERTAIN_LOW, 'uncertain_high': UNCERTAIN_HIGH, 'llm_budget': LLM_BUDGET}
+
+
+class TieredChecker:
+    """
+    Two-tier alignment check of the sentence pairs of one job.
+
+    Every pair is scored by the heuristics of translation_check_simple. Pairs
+    whose score falls in the uncertainty band are sent to the LLM checker of
+    translation_check, the ones closest to the heuristic threshold first, until
+    the job's budget is spent. The LLM verdict replaces the heuristic one; if
+    the LLM check of a pair fails, the heuristic verdict is kept. Only LLM
+    verdicts go through the alignment cache: the heuristics are cheaper to
+    recompute than to look up.
+
+    The number of pairs decided by each tier is accumulated in 'tiers':
+    'heuristic' (outside the band), 'llm', 'over_budget' (in the band, but the
+    budget was spent) and 'llm_errors' (in the band, but the LLM check failed).
+    """
+
+    def __init__(self, low=UNCERTAIN_LOW, high=UNCERTAIN_HIGH, budget=LLM_BUDGET, cache=True):
+        """
+        Args:
+            low (float): Lowest heuristic score of the uncertainty band
+            high (float): Heuristic score above the uncertainty band
+            budget (int): Maximum number of pairs sent to the LLM
+            cache: Alignment cache of the LLM verdicts, as in translation_check.batch_check_translations
+        """
+        self.low = low
+        self.high = high
+        self.remaining = budget
+        self.cache = cache
+        self.tiers = {'heuristic': 0, 'llm': 0, 'over_budget': 0, 'llm_errors': 0}
+
+    def _check_with_llm(self, sources, targets, source_lang, target_lang):
+        """LLM verdicts of the given pairs, None for the pairs whose check failed."""
+        try:
+            results = translation_check.batch_check_translations(
+                sources, targets, sample_size=len(sources), include_details=True,
+                source_lang=language_name(source_lang), target_lang=language_name(target_lang), cache=self.cache
+            )
+        except Exception as e:
+            logging.error(f"Error during LLM alignment check: {str(e)}")
+            return [None] * len(sources)
+
+        verdicts = [None] * len(sources)
+        for result in results['details']:
+            if not translation_check._is_error_result(result):
+                verdicts[result['index']] = result
+        return verdicts
+
+    def batch_check_translations(self, source_sentences, target_sentences, sample_size=None, source_lang="en",
+                                 target_lang="cs", include_details=False):
+        """
+        Check sentence pairs with the heuristics, and the uncertain ones with the LLM.
+
+        Args:
+            source_sentences (list): List of source language sentences
+            target_sentences (list): List of target language sentences
+            sample_size (int): Number of random pairs to check, or None to check every pair
+            source_lang (str): ISO code for source language (en, cs, etc)
+            target_lang (str): ISO code for target language
+            include_details (bool): Also return a list with one result dict per checked pair
+
+        Returns:
+            dict: Like translation_check_simple.batch_check_translations, plus 'tiers'
+                  (the number of pairs decided by each tier in this call)
+        """
+        results = translation_check_simple.batch_check_translations(
+            source_sentences, target_sentences, sample_size=sample_size, source_lang=source_lang,
+            target_lang=target_lang, include_details=include_details, cache=None
+        )
+        scores = results['scores']
+        issues = results['issues']
+
+        uncertain = np.flatnonzero((scores >= self.low) & (scores < self.high))
+        uncertain = uncertain[np.argsort(np.abs(scores[uncertain] - HEURISTIC_THRESHOLD), kind='stable')]
+        escalated = uncertain[:max(self.remaining, 0)].tolist()
+        self.remaining -= len(escalated)
+
+        verdicts = []
+        if escalated:
+            verdicts = self._check_with_llm(
+                [source_sentences[idx] for idx in escalated], [target_sentences[idx] for idx in escalated],
+                source_lang, target_lang
+            )
+
+        llm_verdicts = {}
+        for idx, verdict in zip(escalated, verdicts):
+            if verdict is None:
+                continue
+            llm_verdicts[idx] = verdict
+            scores[idx] = verdict['alignment_score']
+            if verdict['is_aligned']:
+                issues.pop(idx, None)
+            else:
+                issues[idx] = verdict['explanation']
+
+        tiers = {
+            'heuristic': results['checked_count'] - len(uncertain),
+            'llm': len(llm_verdicts),
+            'over_budget': len(uncertain) - len(escalated),
+            'llm_errors': len(escalated) - len(llm_verdicts)
+        }
+        for tier, count in tiers.items():
+            self.tiers[tier] += count
+        if escalated:
+            logging.info(f"Checked {tiers['llm']} of {len(uncertain)} uncertain pairs with the LLM "
+                         f"({tiers['llm_errors']} failed, {tiers['over_budget']} over the budget)")
+
+        checked_count = results['checked_count']
+        aligned_count = checked_count - len(issues)
+        results.update({
+            "overall_alignment_score": float(scores[scores >= 0].sum()) / checked_count if checked_count > 0 else 0,
+            "aligned_percentage": (aligned_count / checked_count * 100) if checked_count > 0 else 0,
+            "aligned_count": aligned_count,
+            "tiers": tiers
+        })
+        if include_details:
+            for detail in results['details']:
+                verdict = llm_verdicts.get(int(detail['index']))
+                detail['tier'] = 'heuristic' if verdict is None else 'llm'
+                if verdict is not None:
+                    detail.update({key: verdict[key] for key in ('alignment_score', 'confidence', 'explanation', 'is_aligned')})
+
+        return results
@@ -0,0 +1,363 @@
+import os
+import csv
+import logging
+import zipfile
+import itertools
+from importlib.util import find_spec
+from xml.sax.saxutils import escape, quoteattr
+
+# Rows buffered by writers that write in blocks (Parquet)
+PARQUET_ROW_GROUP_SIZE = 50000
+
+# Parquet types of the non-text output columns; any other column is a string
+PARQUET_COLUMN_TYPES = {'original_row': 'int64', 'occurrences': 'int64', 'alignment_score': 'float64'}
+
+# An Excel sheet holds at most this many rows, the header included
+EXCEL_MAX_ROWS = 1048576
+
+# Data rows per output shard (sheet or file); by default only xlsx output is sharded, at the Excel limit
+SHARD_ROWS = int(os.environ["OUTPUT_SHARD_ROWS"]) if os.environ.get("OUTPUT_SHARD_ROWS") else None
+
+# 'sheets' adds sheets to one workbook (xlsx only), 'files' writes one file per shard, zipped together
+SHARD_MODE = os.environ.get("OUTPUT_SHARD_MODE", "sheets")
+
+
+class SheetWriter:
+    """
+    Base class of the streaming output writers.
+
+    A writer is created with the output path and the header, receives the
+    rows in order through write_rows() and must be closed to finish the file.
+    Writers are context managers.
+    """
+
+    def __init__(self, path, header, source_lang=None, target_lang=None):
+        """
+        Args:
+            path (str): Path of the output file
+            header (list): Column names; the first two are the source and target columns
+            source_lang (str): Language tag of the source column (used by TMX)
+            target_lang (str): Language tag of the target column (used by TMX)
+        """
+        self.path = path
+        self.header = list(header)
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.rows_written = 0
+
+    def write_rows(self, rows):
+        """Append rows (sequences of values in header order) to the output."""
+        for row in rows:
+            self._write_row(row)
+            self.rows_written += 1
+
+    def _write_row(self, row):
+        raise NotImplementedError
+
+    def close(self):
+        """Finish and close the output file."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class XlsxWriter(SheetWriter):
+    """Excel workbook written with openpyxl in write-only mode."""
+
+    def __init__(self, path, header, source_lang=None, target_lang=None, sheet_name='Sheet1'):
+        super().__init__(path, header, source_lang, target_lang)
+        from openpyxl import Workbook
+
+        self.workbook = Workbook(write_only=True)
+        self.add_sheet(sheet_name)
+
+    def add_sheet(self, sheet_name):
+        """Continue writing on a new sheet, which starts with the header."""
+        self.sheet = self.workbook.create_sheet(sheet_name)
+        self.sheet.append(self.header)
+
+    def _write_row(self, row):
+        self.sheet.append(row)
+
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.save(self.path)
+            self.workbook = None
+
+
+class CsvWriter(SheetWriter):
+    """Comma-separated values, UTF-8."""
+
+    delimiter = ','
+
+    def __init__(self, path, header, source_lang=None, target_lang=None):
+        super().__init__(path, header, source_lang, target_lang)
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file, delimiter=self.delimiter)
+        self.writer.writerow(self.header)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.writer.writerow(row)
+            self.rows_written += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class TsvWriter(CsvWriter):
+    """Tab-separated values, UTF-8 (values with tabs or newlines are quoted)."""
+
+    delimiter = '\t'
+
+
+class ParquetWriter(SheetWriter):
+    """Apache Parquet written in row groups; requires the optional pyarrow package."""
+
+    def __init__(self, path, header, source_lang=None, target_lang=None):
+        super().__init__(path, header, source_lang, target_lang)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise Exception("Parquet output requires the pyarrow package (install the 'parquet' extra)")
+
+        self.pyarrow = pyarrow
+        # Declared up front: inferred from the first row group, all -1 scores would make an integer column
+        self.schema = pyarrow.schema([
+            (name, getattr(pyarrow, PARQUET_COLUMN_TYPES.get(name, 'string'))()) for name in self.header
+        ])
+        self.writer = None
+        self.buffer = []
+
+    def _write_row(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= PARQUET_ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer and self.writer is not None:
+            return
+        columns = list(zip(*self.buffer)) if self.buffer else [[] for _ in self.header]
+        table = self.pyarrow.Table.from_arrays(
+            [self.pyarrow.array(list(values), type=field.type) for field, values in zip(self.schema, columns)],
+            schema=self.schema
+        )
+        if self.writer is None:
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table)
+        self.buffer = []
+
+    def close(self):
+        if self.pyarrow is not None:
+            self._flush()
+            self.writer.close()
+            self.pyarrow = None
+
+
+class TmxWriter(SheetWriter):
+    """
+    Translation memory in TMX 1.4 for CAT tools.
+
+    Every row becomes a translation unit with the source and target sentence;
+    the other columns (original row, alignment score, ...) become x- properties.
+    """
+
+    def __init__(self, path, header, source_lang=None, target_lang=None):
+        super().__init__(path, header, source_lang or header[0], target_lang or header[1])
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<tmx version="1.4">\n'
+            f'  <header creationtool="filesplitter" creationtoolversion="1.0" segtype="sentence" '
+            f'o-tmf="xlsx" adminlang="en" srclang={quoteattr(self.source_lang)} datatype="plaintext"/>\n'
+            '  <body>\n'
+        )
+        self.properties = [f"x-{name.replace('_', '-')}" for name in self.header[2:]]
+
+    def _write_row(self, row):
+        lines = ['    <tu>\n']
+        for name, value in zip(self.properties, row[2:]):
+            if value is not None and value != '':
+                lines.append(f'      <prop type={quoteattr(name)}>{escape(str(value))}</prop>\n')
+        lines.append(f'      <tuv xml:lang={quoteattr(self.source_lang)}><seg>{escape(str(row[0]))}</seg></tuv>\n')
+        lines.append(f'      <tuv xml:lang={quoteattr(self.target_lang)}><seg>{escape(str(row[1]))}</seg></tuv>\n')
+        lines.append('    </tu>\n')
+        self.file.write(''.join(lines))
+
+    def close(self):
+        if not self.file.closed:
+            self.file.write('  </body>\n</tmx>\n')
+            self.file.close()
+
+
+class ShardedWriter(SheetWriter):
+    """
+    Writer that starts a new shard every max_rows rows.
+
+    In 'sheets' mode (xlsx only) the shards are sheets of one workbook. In
+    'files' mode every shard is a file of its own; once a second shard is
+    needed the output becomes a zip archive, and every shard is moved into
+    it as soon as it is full. A single shard is written as a plain file.
+    Every row keeps all its columns, original_row included, in every shard.
+    Shard files are named after name (defaults to the name of path), so a
+    temporary path does not leak into the names in the archive.
+    """
+
+    def __init__(self, output_format, path, header, source_lang=None, target_lang=None, max_rows=None,
+                 mode=SHARD_MODE, name=None):
+        super().__init__(path, header, source_lang, target_lang)
+        if mode not in ('sheets', 'files'):
+            raise Exception(f"Unknown shard mode: {mode}")
+        if mode == 'sheets' and output_format != 'xlsx':
+            mode = 'files'
+        self.output_format = output_format
+        self.max_rows = max_rows
+        self.mode = mode
+        self.name = name or os.path.basename(path)
+        self.shard_count = 1
+        self.shard_rows = 0
+        self.archive = None
+
+        if mode == 'sheets':
+            self.current = XlsxWriter(path, header, source_lang, target_lang)
+        else:
+            self.current = self._open_shard()
+
+    def _shard_name(self, number):
+        extension = OUTPUT_FORMATS[self.output_format]['extension']
+        stem = os.path.splitext(self.name)[0]
+        return f"{stem}_part{number:03d}.{extension}"
+
+    def _open_shard(self):
+        shard_path = f"{self.path}.{self.shard_count:03d}.part"
+        return OUTPUT_FORMATS[self.output_format]['writer'](shard_path, self.header, self.source_lang, self.target_lang)
+
+    def _store_shard(self, writer, number):
+        # Move a finished shard file into the archive
+        writer.close()
+        self.archive.write(writer.path, self._shard_name(number))
+        os.remove(writer.path)
+
+    def _next_shard(self):
+        self.shard_count += 1
+        self.shard_rows = 0
+        logging.debug(f"Starting output shard {self.shard_count} of {self.path}")
+
+        if self.mode == 'sheets':
+            self.current.add_sheet(f"Sheet{self.shard_count}")
+            return
+
+        if self.archive is None:
+            self.archive = zipfile.ZipFile(f"{self.path}.zip.part", 'w', zipfile.ZIP_DEFLATED)
+        self._store_shard(self.current, self.shard_count - 1)
+        self.current = self._open_shard()
+
+    def write_rows(self, rows):
+        rows = iter(rows)
+        for first_row in rows:
+            # A new shard is only started once there is a row to put in it
+            if self.max_rows and self.shard_rows >= self.max_rows:
+                self._next_shard()
+            capacity = self.max_rows - self.shard_rows if self.max_rows else None
+            before = self.current.rows_written
+            self.current.write_rows(itertools.chain(
+                [first_row], itertools.islice(rows, capacity - 1 if capacity else None)
+            ))
+            written = self.current.rows_written - before
+            self.shard_rows += written
+            self.rows_written += written
+
+    def close(self):
+        if self.current is None:
+            return
+        if self.archive is None:
+            self.current.close()
+            if self.mode == 'files':
+                os.replace(self.current.path, self.path)
+        else:
+            self._store_shard(self.current, self.shard_count)
+            self.archive.close()
+            os.replace(self.archive.filename, self.path)
+        self.current = None
+
+
+# Output format -> writer class, file extension, MIME type and the optional packages it requires
+OUTPUT_FORMATS = {
+    'xlsx': {
+        'writer': XlsxWriter,
+        'extension': 'xlsx',
+        'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    },
+    'csv': {'writer': CsvWriter, 'extension': 'csv', 'mimetype': 'text/csv'},
+    'tsv': {'writer': TsvWriter, 'extension': 'tsv', 'mimetype': 'text/tab-separated-values'},
+    'parquet': {
+        'writer': ParquetWriter,
+        'extension': 'parquet',
+        'mimetype': 'application/vnd.apache.parquet',
+        'requires': ('pyarrow',)
+    },
+    'tmx': {'writer': TmxWriter, 'extension': 'tmx', 'mimetype': 'application/x-tmx+xml'},
+}
+
+DEFAULT_OUTPUT_FORMAT = 'xlsx'
+
+
+def available_output_formats():
+    """The output formats whose optional packages are installed, without importing them."""
+    return [
+        name for name, output_format in OUTPUT_FORMATS.items()
+        if all(find_spec(package) is not None for package in output_format.get('requires', ()))
+    ]
+
+
+def shard_size(output_format, shard_rows=None):
+    """
+    The data rows per shard of an output.
+
+    Args:
+        output_format (str): One of OUTPUT_FORMATS
+        shard_rows (int): Requested rows per shard (defaults to OUTPUT_SHARD_ROWS)
+
+    Returns:
+        int: Rows per shard, capped at the Excel row limit for xlsx; 0 or None if the output is not sharded
+    """
+    if shard_rows is None:
+        shard_rows = SHARD_ROWS
+    if output_format == 'xlsx':
+        # A sheet can never hold more data rows than Excel allows below the header
+        shard_rows = min(shard_rows or EXCEL_MAX_ROWS - 1, EXCEL_MAX_ROWS - 1)
+    return shard_rows
+
+
+def open_writer(output_format, path, header, source_lang=None, target_lang=None, shard_rows=None,
+                shard_mode=SHARD_MODE, name=None):
+    """
+    Create the streaming writer of an output format.
+
+    Args:
+        output_format (str): One of OUTPUT_FORMATS
+        path (str): Path of the output file
+        header (list): Column names; the first two are the source and target columns
+        source_lang (str): Language tag of the source column (used by TMX)
+        target_lang (str): Language tag of the target column (used by TMX)
+        shard_rows (int): Data rows per shard (defaults to OUTPUT_SHARD_ROWS, or the Excel
+                          row limit for xlsx; 0 disables sharding of other formats)
+        shard_mode (str): 'sheets' (xlsx only) or 'files' (a zip archive of shard files)
+        name (str): File name the shard files are named after (defaults to the name of path)
+
+    Returns:
+        SheetWriter: The writer, to be closed when all rows are written
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise Exception(f"Unknown output format: {output_format}. Available formats: {', '.join(OUTPUT_FORMATS)}")
+    logging.debug(f"Writing {output_format} output to {path}")
+
+    shard_rows = shard_size(output_format, shard_rows)
+    if shard_rows:
+        return ShardedWriter(output_format, path, header, source_lang, target_lang, shard_rows, shard_mode, name)
+    return OUTPUT_FORMATS[output_format]['writer'](path, header, source_lang, target_lang)